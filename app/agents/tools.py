@@ -3,6 +3,7 @@
 from datetime import datetime
 from typing import Any
 from sqlalchemy.orm import Session
+from app.db import bulk_insert
 from app.models.database import Channel, ChannelDetail
 from app.models.schemas import Citation
 from app.services.intent import intent_detection_service
@@ -24,6 +25,23 @@ class RetrieverTool:
             "citations": [c.model_dump() for c in citations],
         }
 
+    def run_many(
+        self,
+        queries: list[str],
+        tenant: str,
+        filters: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Run retrieval for several queries in one batch."""
+        return [
+            {
+                "results": results,
+                "citations": [c.model_dump() for c in citations],
+            }
+            for results, citations in retrieval_service.retrieve_many(
+                queries, tenant, filters=filters
+            )
+        ]
+
 
 class IntentDetectorTool:
     """Tool for detecting intent."""
@@ -115,7 +133,15 @@ class ChannelWriterTool:
         db.add(channel)
         db.flush()
 
+        # Find relevant citation
+        citation_text = None
+        if citations:
+            citation_text = f"{citations[0].doc}"
+            if citations[0].page:
+                citation_text += f" (page {citations[0].page})"
+
         # Add channel details
+        details = []
         for key, value in entities.items():
             if value is not None:
                 # Handle list values
@@ -124,23 +150,18 @@ class ChannelWriterTool:
                 else:
                     value_str = str(value)
 
-                # Find relevant citation
-                citation_text = None
-                if citations:
-                    citation_text = f"{citations[0].doc}"
-                    if citations[0].page:
-                        citation_text += f" (page {citations[0].page})"
-
-                detail = ChannelDetail(
-                    channel_id=channel_id,
-                    key=key,
-                    value=value_str,
-                    source_doc=citations[0].doc if citations else None,
-                    citation=citation_text,
+                details.append(
+                    {
+                        "channel_id": channel_id,
+                        "key": key,
+                        "value": value_str,
+                        "source_doc": citations[0].doc if citations else None,
+                        "citation": citation_text,
+                    }
                 )
-                db.add(detail)
 
-        db.flush()
+        # Inserted in bulk rather than one unit-of-work object per entity
+        bulk_insert(db, ChannelDetail, details)
         return channel
 
     def run(
@@ -3,5 +3,7 @@
 from app.api.intent import router as intent_router
 from app.api.channels import router as channels_router
 from app.api.ingest import router as ingest_router
+from app.api.search import router as search_router
+from app.api.admin import router as admin_router
 
-__all__ = ["intent_router", "channels_router", "ingest_router"]
+__all__ = ["intent_router", "channels_router", "ingest_router", "search_router", "admin_router"]
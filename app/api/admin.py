@@ -0,0 +1,43 @@
+"""Operational API endpoints."""
+
+from fastapi import APIRouter, HTTPException, status
+from app.models.schemas import EmbeddingStatsResponse, VectorStoresResponse
+from app.rag.embeddings import embedding_service
+from app.rag.vector_store import vector_store_service
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/vector-stores", response_model=VectorStoresResponse)
+async def list_vector_stores() -> VectorStoresResponse:
+    """List resident tenant vector stores with their memory accounting."""
+    return VectorStoresResponse(
+        stores=vector_store_service.resident_stores(),
+        memory_bytes=vector_store_service.memory_bytes,
+        memory_budget_bytes=vector_store_service.memory_budget_bytes,
+        eviction_policy=vector_store_service.eviction_policy,
+        evictions=vector_store_service.evictions,
+    )
+
+
+@router.delete("/vector-stores/{tenant}", status_code=status.HTTP_204_NO_CONTENT)
+async def evict_vector_store(tenant: str) -> None:
+    """Evict a tenant's vector store from memory."""
+    if not vector_store_service.evict(tenant):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No resident vector store for tenant {tenant}",
+        )
+
+
+@router.get("/embeddings", response_model=EmbeddingStatsResponse)
+async def embedding_stats() -> EmbeddingStatsResponse:
+    """Report embedding cache sizes, hit rates and saved latency."""
+    cache = embedding_service.cache
+    query_cache = embedding_service.query_cache
+    micro_batcher = embedding_service.micro_batcher
+    return EmbeddingStatsResponse(
+        cache=cache.stats() if cache is not None else None,
+        query_cache=query_cache.stats() if query_cache is not None else None,
+        micro_batches=micro_batcher.stats() if micro_batcher is not None else None,
+    )
@@ -1,19 +1,46 @@
 """Document ingestion API endpoints."""
 
-import os
 import shutil
+import uuid
 from pathlib import Path
 from fastapi import APIRouter, Depends, File, UploadFile, Form, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from app.config import settings
 from app.db import get_db_session
-from app.models.schemas import IngestResponse
+from app.models.schemas import (
+    DocumentDeleteResponse,
+    IngestJobProgress,
+    IngestJobResponse,
+    IngestJobStatus,
+    IngestResponse,
+)
+from app.services.ingest_jobs import ingest_job_runner
 from app.services.ingestion import ingestion_service
 from app.utils import generate_trace_id
 
 router = APIRouter(prefix="/ingest", tags=["ingestion"])
 
+SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".doc", ".md", ".markdown", ".txt"]
 
-@router.post("/", response_model=IngestResponse)
+
+def save_upload(file: UploadFile, upload_dir: Path) -> str:
+    """Validate an uploaded file's type and save it under upload_dir."""
+    ext = Path(file.filename).suffix.lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file type: {ext}. Supported: .pdf, .docx, .doc, .md, .txt",
+        )
+
+    file_path = upload_dir / file.filename
+    with open(file_path, "wb") as f:
+        shutil.copyfileobj(file.file, f)
+
+    return str(file_path)
+
+
+@router.post("/", response_model=IngestJobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def ingest_documents(
     files: list[UploadFile] = File(...),
     tenant: str = Form(...),
@@ -21,16 +48,25 @@ async def ingest_documents(
     department: str | None = Form(default=None),
     country: str | None = Form(default=None),
     version: str | None = Form(default=None),
-    db: Session = Depends(get_db_session),
-) -> IngestResponse:
-    """Ingest documents into knowledge base."""
+    prune: bool = Form(default=False),
+) -> IngestJobResponse:
+    """Queue documents for ingestion into knowledge base.
+
+    Uploads are stored and ingested by a background job; poll
+    GET /ingest/jobs/{job_id} for its progress and result. Documents are
+    identified by filename: unchanged files are skipped and modified ones
+    re-index only their changed chunks. With prune, the tenant's documents
+    not among the uploads are deleted.
+    """
     trace_id = generate_trace_id()
+    job_id = uuid.uuid4().hex
 
-    # Create temp directory for uploads
-    upload_dir = Path("./data/uploads") / trace_id
+    # Kept until the job has run
+    upload_dir = Path("./data/uploads") / job_id
     upload_dir.mkdir(parents=True, exist_ok=True)
 
     file_paths = []
+    source_paths = []
 
     try:
         # Save uploaded files
@@ -38,19 +74,8 @@ async def ingest_documents(
             if not file.filename:
                 continue
 
-            # Validate file type
-            ext = Path(file.filename).suffix.lower()
-            if ext not in [".pdf", ".docx", ".doc", ".md", ".markdown", ".txt"]:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Unsupported file type: {ext}. Supported: .pdf, .docx, .doc, .md, .txt",
-                )
-
-            file_path = upload_dir / file.filename
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
-
-            file_paths.append(str(file_path))
+            file_paths.append(await run_in_threadpool(save_upload, file, upload_dir))
+            source_paths.append(file.filename)
 
         if not file_paths:
             raise HTTPException(
@@ -58,7 +83,6 @@ async def ingest_documents(
                 detail="No valid files provided",
             )
 
-        # Ingest documents
         metadata = {
             "doc_type": doc_type,
             "department": department,
@@ -66,27 +90,137 @@ async def ingest_documents(
             "version": version,
         }
 
-        total_docs, total_chunks, index_path = ingestion_service.ingest_documents(
+        job = await run_in_threadpool(
+            ingest_job_runner.submit,
+            job_id=job_id,
+            tenant=tenant,
             file_paths=file_paths,
+            source_paths=source_paths,
+            metadata=metadata,
+            prune=prune,
+            upload_dir=str(upload_dir),
+        )
+
+        return IngestJobResponse(
+            jobId=job_id,
+            status=job["status"],
+            files=len(file_paths),
+            traceId=trace_id,
+        )
+
+    except HTTPException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    except Exception as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to queue ingestion: {str(e)}",
+        )
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str) -> IngestJobStatus:
+    """Get an ingestion job's status and progress."""
+    job = await run_in_threadpool(ingest_job_runner.queue.get, job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Ingestion job {job_id} not found",
+        )
+
+    return IngestJobStatus(
+        jobId=job["id"],
+        tenant=job["tenant"],
+        status=job["status"],
+        progress=IngestJobProgress(**(job["progress"] or {})),
+        result=IngestResponse(**job["result"], traceId=job_id) if job["result"] else None,
+        error=job["error"],
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+        finished_at=job["finished_at"],
+    )
+
+
+@router.put("/documents/{doc_id}", response_model=IngestResponse)
+async def replace_document(
+    doc_id: int,
+    file: UploadFile = File(...),
+    tenant: str = Form(...),
+    doc_type: str | None = Form(default=None),
+    department: str | None = Form(default=None),
+    country: str | None = Form(default=None),
+    version: str | None = Form(default=None),
+    db: Session = Depends(get_db_session),
+) -> IngestResponse:
+    """Replace a document with a new version, re-indexing only its chunks."""
+    trace_id = generate_trace_id()
+
+    upload_dir = Path("./data/uploads") / trace_id
+    upload_dir.mkdir(parents=True, exist_ok=True)
+
+    try:
+        if not file.filename:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No valid files provided",
+            )
+
+        file_path = save_upload(file, upload_dir)
+        metadata = {
+            "doc_type": doc_type,
+            "department": department,
+            "country": country,
+            "version": version,
+        }
+
+        _, chunk_count = ingestion_service.replace_document(
+            doc_id=doc_id,
+            file_path=file_path,
             tenant=tenant,
             db=db,
             metadata=metadata,
         )
+        db.commit()
 
         return IngestResponse(
-            docs=total_docs,
-            chunks=total_chunks,
-            index_path=index_path,
+            docs=1,
+            chunks=chunk_count,
+            index_path=str(Path(settings.vector_dir) / tenant),
             traceId=trace_id,
         )
 
+    except HTTPException:
+        raise
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Ingestion failed: {str(e)}",
+            detail=f"Replace failed: {str(e)}",
         )
 
     finally:
-        # Cleanup temp files
         if upload_dir.exists():
             shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+@router.delete("/documents/{doc_id}", response_model=DocumentDeleteResponse)
+async def delete_document(
+    doc_id: int,
+    tenant: str,
+    db: Session = Depends(get_db_session),
+) -> DocumentDeleteResponse:
+    """Delete a document and its vectors from the knowledge base."""
+    trace_id = generate_trace_id()
+
+    try:
+        chunks = ingestion_service.delete_document(doc_id=doc_id, tenant=tenant, db=db)
+        db.commit()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    return DocumentDeleteResponse(docId=doc_id, chunks=chunks, traceId=trace_id)
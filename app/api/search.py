@@ -0,0 +1,35 @@
+"""Knowledge base search API endpoints."""
+
+from fastapi import APIRouter, HTTPException, status
+from app.models.schemas import BatchSearchRequest, BatchSearchResponse, QueryResults
+from app.services.retrieval import retrieval_service
+from app.utils import generate_trace_id
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.post("/batch", response_model=BatchSearchResponse)
+async def batch_search(request: BatchSearchRequest) -> BatchSearchResponse:
+    """Search the knowledge base for several queries in one round trip."""
+    trace_id = generate_trace_id()
+
+    try:
+        batches = retrieval_service.retrieve_many(
+            queries=request.queries,
+            tenant=request.tenant,
+            k=request.k,
+            filters=request.filters,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Search failed: {str(e)}",
+        )
+
+    return BatchSearchResponse(
+        results=[
+            QueryResults(query=query, citations=citations)
+            for query, (_, citations) in zip(request.queries, batches)
+        ],
+        traceId=trace_id,
+    )
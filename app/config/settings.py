@@ -19,12 +19,64 @@ class Settings(BaseSettings):
     openai_api_key: str = Field(..., description="OpenAI API Key")
     openai_model: str = Field(default="gpt-4o-mini", description="OpenAI model for LLM")
     openai_embedding_model: str = Field(default="text-embedding-3-small", description="OpenAI embedding model")
+    embedding_backend: Literal["openai", "hashing"] = Field(
+        default="openai",
+        description="Embedding backend: the OpenAI API, or local hashed n-gram features (offline)",
+    )
+    local_embedding_dimension: int = Field(
+        default=512, description="Output dimension of the local backend"
+    )
+    embedding_dimensions: int | None = Field(
+        default=None,
+        description="Shortened output dimensions for text-embedding-3 models (None = full size)",
+    )
+    embedding_batch_tokens: int = Field(
+        default=100_000, description="Max tokens per embedding request"
+    )
+    embedding_batch_size: int = Field(default=512, description="Max texts per embedding request")
+    embedding_concurrency: int = Field(
+        default=4, description="Embedding requests in flight at once"
+    )
+    embedding_tokens_per_minute: int = Field(
+        default=1_000_000,
+        description="Embedding token rate limit to stay under (0 = unlimited)",
+    )
+    embedding_max_retries: int = Field(
+        default=6,
+        description="Retries with jittered backoff for rate-limited embedding requests",
+    )
+    embedding_cache_path: str | None = Field(
+        default="./data/embedding_cache.db",
+        description="SQLite cache of document embeddings (empty to disable)",
+    )
+    embedding_cache_max_mb: int = Field(
+        default=1024,
+        description="Cache size above which least recently used entries are evicted (0 = no limit)",
+    )
+    embedding_microbatch_wait_ms: float = Field(
+        default=5.0,
+        description="Wait to collect concurrent queries into one request (0 = disabled)",
+    )
+    embedding_microbatch_size: int = Field(default=64, description="Max queries per micro-batch")
+    query_embedding_cache_size: int = Field(
+        default=2048,
+        description="Query embeddings kept in memory (0 = disabled)",
+    )
+    query_embedding_cache_ttl: float = Field(
+        default=3600.0,
+        description="Seconds a cached query embedding stays valid",
+    )
 
     # Database
     db_url: str = Field(
         default="sqlite:///./data/app.db",
         description="Database connection URL",
     )
+    db_bulk_batch_size: int = Field(
+        default=1000,
+        ge=1,
+        description="Rows per multi-row insert when bulk writing chunks and channel details",
+    )
 
     # Vector Store
     vector_dir: str = Field(
@@ -61,7 +113,127 @@ class Settings(BaseSettings):
     # RAG
     chunk_size: int = Field(default=800, description="Text chunk size")
     chunk_overlap: int = Field(default=120, description="Chunk overlap")
+    ingest_batch_size: int = Field(
+        default=256, description="Chunks embedded and indexed together during ingestion"
+    )
+    ingest_max_inflight_batches: int = Field(
+        default=2,
+        description="Chunk batches embedded ahead of indexing before extraction waits",
+    )
+    ingest_workers: int = Field(
+        default=1,
+        description="Processes extracting and chunking files in parallel (1 = in-process)",
+    )
+    ingest_pages_per_task: int = Field(
+        default=50, description="PDF pages per parallel extraction task"
+    )
+    ingest_job_queue: Literal["database", "memory"] = Field(
+        default="database",
+        description="Ingestion job queue: the ingest_jobs table, or in memory (lost on restart)",
+    )
+    ingest_job_workers: int = Field(
+        default=1,
+        ge=0,
+        description="Threads running queued ingestion jobs (0 = only enqueue)",
+    )
+    ingest_job_poll_seconds: float = Field(
+        default=2.0,
+        gt=0.0,
+        description="Interval at which idle job workers check the queue",
+    )
+    ingest_job_stale_seconds: float = Field(
+        default=600.0,
+        gt=0.0,
+        description="Running jobs without progress this long are requeued on startup",
+    )
+    dedup_enabled: bool = Field(
+        default=True,
+        description="Collapse near-duplicate chunks into one vector citing every source",
+    )
+    dedup_max_distance: int = Field(
+        default=3,
+        ge=0,
+        le=15,
+        description="Max differing SimHash bits (of 64) for chunks to count as duplicates",
+    )
     retrieval_top_k: int = Field(default=6, description="Top K retrievals")
+    retrieval_mode: Literal["auto", "dense", "lexical", "hybrid"] = Field(
+        default="auto",
+        description="Retrieval mode; auto answers short keyword queries lexically, fuses otherwise",
+    )
+    hybrid_candidates: int = Field(default=30, description="Candidates per ranking before fusion")
+    rrf_k: int = Field(default=60, description="Reciprocal rank fusion constant")
+    lexical_max_terms: int = Field(
+        default=3,
+        description="Max query terms for the lexical-only fast path in auto mode",
+    )
+
+    # Vector Index
+    vector_index_type: Literal["auto", "flat", "hnsw", "ivf_flat", "ivf_pq"] = Field(
+        default="auto",
+        description="FAISS index type, or auto to select by size and recall target",
+    )
+    vector_recall_target: float = Field(
+        default=0.95,
+        gt=0.0,
+        lt=1.0,
+        description="Target recall@k for approximate indexes",
+    )
+    vector_ann_min_vectors: int = Field(
+        default=50_000,
+        description="Vector count at which auto selection leaves flat search",
+    )
+    vector_pq_min_vectors: int = Field(
+        default=2_000_000,
+        description="Vector count at which auto selection may use IVF-PQ",
+    )
+    vector_train_sample: int = Field(default=100_000, description="Max IVF training sample")
+    vector_exact_filter_max: int = Field(
+        default=4096,
+        description="Filtered subsets up to this size are searched exactly",
+    )
+    hnsw_m: int = Field(default=32, description="HNSW graph degree")
+    hnsw_ef_construction: int = Field(default=80, description="HNSW construction depth")
+    vector_read_only: bool = Field(
+        default=False,
+        description="Serve memory-mapped, read-only vector stores (API workers)",
+    )
+    vector_compression: Literal["none", "float16", "sq8", "pq"] = Field(
+        default="none",
+        description="Default vector codec for new tenant indexes (stored per tenant)",
+    )
+    vector_compression_min_vectors: int = Field(
+        default=10_000,
+        description="Vector count below which indexes stay uncompressed",
+    )
+    vector_rescore_factor: int = Field(
+        default=4,
+        description="Compressed searches re-rank k * factor candidates exactly (0 = off)",
+    )
+    vector_memory_budget_mb: int = Field(
+        default=4096,
+        description="Memory budget for resident tenant vector stores (0 = unlimited)",
+    )
+    vector_eviction_policy: Literal["lru", "lfu"] = Field(
+        default="lru",
+        description="Eviction policy for tenant vector stores over budget",
+    )
+    vector_tail_vectors: int = Field(
+        default=10_000,
+        description="Recently added vectors searched exactly before merging into the index",
+    )
+    vector_purge_ratio: float = Field(
+        default=0.2,
+        description="Deleted fraction of a tenant index at which deleted vectors are purged",
+    )
+    vector_compaction_segments: int = Field(
+        default=8,
+        description="Delta segments per tenant that trigger background compaction",
+    )
+    vector_compaction_ratio: float = Field(
+        default=0.5,
+        description="Delta/base size ratio at which deltas are folded into the base",
+    )
 
     # Redis (optional)
     redis_url: str | None = Field(default=None, description="Redis URL")
@@ -1,5 +1,21 @@
 """Database module."""
 
-from app.db.database import engine, SessionLocal, init_db, get_db, get_db_session
+from app.db.database import (
+    engine,
+    SessionLocal,
+    add_missing_columns,
+    bulk_insert,
+    init_db,
+    get_db,
+    get_db_session,
+)
 
-__all__ = ["engine", "SessionLocal", "init_db", "get_db", "get_db_session"]
+__all__ = [
+    "engine",
+    "SessionLocal",
+    "add_missing_columns",
+    "bulk_insert",
+    "init_db",
+    "get_db",
+    "get_db_session",
+]
@@ -1,12 +1,15 @@
 """Database session and initialization."""
 
+import logging
 from contextlib import contextmanager
-from typing import Generator
-from sqlalchemy import create_engine
+from typing import Any, Generator
+from sqlalchemy import create_engine, insert, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
 from app.models.database import Base
 
+logger = logging.getLogger(__name__)
 
 # Create engine
 engine = create_engine(
@@ -22,6 +25,56 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def init_db() -> None:
     """Initialize database tables."""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns(engine)
+
+
+def add_missing_columns(bind: Engine) -> None:
+    """Add nullable model columns missing from existing tables.
+
+    create_all only creates missing tables, so columns added to a model
+    since its table was created are added here with ALTER TABLE.
+    """
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+                logger.info(f"Added column {table.name}.{column.name}")
+
+
+def bulk_insert(
+    db: Session,
+    model: type[Base],
+    rows: list[dict[str, Any]],
+    batch_size: int | None = None,
+) -> list[int]:
+    """Insert rows of a model with Core statements, returning their ids in row order.
+
+    Skips the ORM unit of work, so no instances are loaded into the session.
+    Rows are sent batch_size at a time as multi-row inserts with RETURNING
+    where the dialect supports it (SQLite 3.35+, PostgreSQL), otherwise one
+    insert per row to read back its id. Every row must have the same keys.
+    """
+    batch_size = batch_size or settings.db_bulk_batch_size
+    table = model.__table__
+    returning = db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order
+    ids: list[int] = []
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        if returning:
+            statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+            ids.extend(db.execute(statement, batch).scalars())
+        else:
+            ids.extend(db.execute(insert(table), row).inserted_primary_key[0] for row in batch)
+    return ids
 
 
 @contextmanager
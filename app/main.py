@@ -7,7 +7,8 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.db import init_db
-from app.api import intent_router, channels_router, ingest_router
+from app.api import intent_router, channels_router, ingest_router, search_router, admin_router
+from app.services.ingest_jobs import ingest_job_runner
 from app.utils import generate_trace_id, set_trace_id
 
 # Configure logging
@@ -31,10 +32,14 @@ async def lifespan(app: FastAPI):
     init_db()
     logger.info("Database initialized")
 
+    # Run queued ingestion jobs, including any left by a previous run
+    ingest_job_runner.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Intent Detection System...")
+    ingest_job_runner.stop(timeout=5.0)
 
 
 # Create FastAPI app
@@ -92,6 +97,8 @@ async def global_exception_handler(request: Request, exc: Exception):
 app.include_router(intent_router)
 app.include_router(channels_router)
 app.include_router(ingest_router)
+app.include_router(search_router)
+app.include_router(admin_router)
 
 
 # Health check
@@ -1,17 +1,31 @@
 """Data models module."""
 
-from app.models.database import Base, Channel, ChannelDetail, Event, KbDoc, KbChunk
+from app.models.database import Base, Channel, ChannelDetail, Event, IngestJob, KbDoc, KbChunk
 from app.models.schemas import (
     IntentRequest,
     IntentResult,
     EntitySchema,
     Citation,
+    CitationSource,
     UnderstandAndOpenRequest,
     UnderstandAndOpenResponse,
     ChannelRecord,
     IngestRequest,
     IngestResponse,
+    IngestJobResponse,
+    IngestJobProgress,
+    IngestJobStatus,
+    DocumentDeleteResponse,
+    BatchSearchRequest,
+    QueryResults,
+    BatchSearchResponse,
     ChannelResponse,
+    VectorStoreStatus,
+    VectorStoresResponse,
+    EmbeddingCacheStats,
+    QueryEmbeddingCacheStats,
+    MicroBatchStats,
+    EmbeddingStatsResponse,
     SimulateRequest,
     ErrorResponse,
 )
@@ -21,18 +35,33 @@ __all__ = [
     "Channel",
     "ChannelDetail",
     "Event",
+    "IngestJob",
     "KbDoc",
     "KbChunk",
     "IntentRequest",
     "IntentResult",
     "EntitySchema",
     "Citation",
+    "CitationSource",
     "UnderstandAndOpenRequest",
     "UnderstandAndOpenResponse",
     "ChannelRecord",
     "IngestRequest",
     "IngestResponse",
+    "IngestJobResponse",
+    "IngestJobProgress",
+    "IngestJobStatus",
+    "DocumentDeleteResponse",
+    "BatchSearchRequest",
+    "QueryResults",
+    "BatchSearchResponse",
     "ChannelResponse",
+    "VectorStoreStatus",
+    "VectorStoresResponse",
+    "EmbeddingCacheStats",
+    "QueryEmbeddingCacheStats",
+    "MicroBatchStats",
+    "EmbeddingStatsResponse",
     "SimulateRequest",
     "ErrorResponse",
 ]
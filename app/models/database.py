@@ -5,6 +5,7 @@ from sqlalchemy import (
     Column,
     String,
     Integer,
+    BigInteger,
     Float,
     DateTime,
     Text,
@@ -85,6 +86,8 @@ class KbDoc(Base):
     department = Column(String(100), nullable=True)
     country = Column(String(10), nullable=True)
     version = Column(String(50), nullable=True)
+    source_path = Column(String(500), nullable=True, index=True)  # Identity across re-ingestions
+    content_hash = Column(String(64), nullable=True)  # sha256 of the ingested file
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -100,11 +103,36 @@ class KbChunk(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     doc_id = Column(Integer, ForeignKey("kb_docs.id"), nullable=False, index=True)
     content = Column(Text, nullable=False)
-    embedding = Column(LargeBinary, nullable=True)  # Stored in FAISS primarily
+    embedding = Column(LargeBinary, nullable=True)  # float16, source for index rebuilds
     chunk_index = Column(Integer, nullable=False)
     page_number = Column(Integer, nullable=True)
     chunk_metadata = Column(JSON, nullable=True)  # Renamed from 'metadata' to avoid SQLAlchemy conflict
+    fingerprint = Column(BigInteger, nullable=True)  # SimHash of the content
+    # Canonical chunk this near-duplicate was collapsed into
+    duplicate_of = Column(
+        Integer,
+        ForeignKey("kb_chunks.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+    )
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     doc = relationship("KbDoc", back_populates="chunks")
+
+
+class IngestJob(Base):
+    """Background ingestion job model."""
+
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(50), primary_key=True)
+    tenant = Column(String(100), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    request = Column(JSON, nullable=False)  # Files, metadata and options to ingest with
+    progress = Column(JSON, nullable=True)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
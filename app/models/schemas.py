@@ -34,6 +34,13 @@ class EntitySchema(BaseModel):
     locale: str | None = Field(None, description="Locale")
 
 
+class CitationSource(BaseModel):
+    """Another document containing a cited passage."""
+
+    doc: str = Field(..., description="Document name")
+    page: int | None = Field(None, description="Page number")
+
+
 class Citation(BaseModel):
     """Knowledge base citation."""
 
@@ -41,6 +48,10 @@ class Citation(BaseModel):
     page: int | None = Field(None, description="Page number")
     snippet: str = Field(..., description="Relevant snippet")
     score: float | None = Field(None, description="Relevance score")
+    sources: list[CitationSource] = Field(
+        default_factory=list,
+        description="Other documents containing the same passage",
+    )
 
 
 class IntentResult(BaseModel):
@@ -101,6 +112,83 @@ class IngestResponse(BaseModel):
     docs: int = Field(..., description="Number of documents processed")
     chunks: int = Field(..., description="Number of chunks created")
     index_path: str = Field(..., description="FAISS index path")
+    added: int = Field(0, description="New documents")
+    updated: int = Field(0, description="Modified documents re-indexed")
+    unchanged: int = Field(0, description="Documents skipped as unchanged")
+    removed: int = Field(0, description="Documents pruned as no longer present")
+    chunks_unchanged: int = Field(0, description="Chunks of modified documents kept as they were")
+    chunks_removed: int = Field(0, description="Chunks retired")
+    failed: dict[str, str] = Field(
+        default_factory=dict, description="Files that failed, with their errors"
+    )
+    trace_id: str = Field(..., alias="traceId", description="Trace ID")
+
+
+class IngestJobResponse(BaseModel):
+    """Queued ingestion job response."""
+
+    job_id: str = Field(..., alias="jobId", description="Job ID to poll for progress")
+    status: str = Field(..., description="Job status")
+    files: int = Field(..., description="Number of files queued")
+    trace_id: str = Field(..., alias="traceId", description="Trace ID")
+
+
+class IngestJobProgress(BaseModel):
+    """Progress of an ingestion job."""
+
+    files: int = Field(0, description="Files to ingest")
+    files_done: int = Field(0, description="Files ingested, skipped as unchanged or failed")
+    pages: int = Field(0, description="Pages extracted")
+    chunks: int = Field(0, description="Chunks extracted")
+    embedded: int = Field(0, description="Chunks embedded")
+    indexed: int = Field(0, description="Chunks stored and indexed")
+
+
+class IngestJobStatus(BaseModel):
+    """Ingestion job status."""
+
+    job_id: str = Field(..., alias="jobId", description="Job ID")
+    tenant: str = Field(..., description="Tenant")
+    status: str = Field(..., description="Job status (queued, running, completed, failed)")
+    progress: IngestJobProgress = Field(..., description="Progress so far")
+    result: IngestResponse | None = Field(None, description="Outcome, once completed")
+    error: str | None = Field(None, description="Error, if the job failed")
+    created_at: datetime = Field(..., description="Submission timestamp")
+    updated_at: datetime = Field(..., description="Last progress timestamp")
+    finished_at: datetime | None = Field(None, description="Completion timestamp")
+
+
+class DocumentDeleteResponse(BaseModel):
+    """Document deletion response."""
+
+    doc_id: int = Field(..., alias="docId", description="Deleted document ID")
+    chunks: int = Field(..., description="Number of chunks removed from the index")
+    trace_id: str = Field(..., alias="traceId", description="Trace ID")
+
+
+class BatchSearchRequest(BaseModel):
+    """Batch knowledge base search request."""
+
+    queries: list[str] = Field(..., min_items=1, description="Queries to search")
+    tenant: str = Field(..., description="Tenant identifier")
+    k: int = Field(default=6, ge=1, description="Results per query")
+    filters: dict[str, Any] | None = Field(
+        None,
+        description="Metadata filters: a value for equality or a list for membership",
+    )
+
+
+class QueryResults(BaseModel):
+    """Search results for one query."""
+
+    query: str = Field(..., description="Query text")
+    citations: list[Citation] = Field(..., description="Matching chunks, best first")
+
+
+class BatchSearchResponse(BaseModel):
+    """Batch knowledge base search response."""
+
+    results: list[QueryResults] = Field(..., description="Results per query, in request order")
     trace_id: str = Field(..., alias="traceId", description="Trace ID")
 
 
@@ -117,6 +205,89 @@ class ChannelResponse(BaseModel):
     details: list[dict[str, Any]] = Field(default_factory=list, description="Channel details")
 
 
+class VectorStoreStatus(BaseModel):
+    """Resident tenant vector store."""
+
+    tenant: str = Field(..., description="Tenant")
+    vectors: int = Field(..., description="Number of live vectors")
+    dimension: int = Field(..., description="Vector dimension")
+    embedding_model: str | None = Field(None, description="Embedding model the vectors came from")
+    projection: str | None = Field(None, description="Dimension reduction method (truncate, pca)")
+    index_type: str = Field(..., description="FAISS index type")
+    compression: str = Field(..., description="Vector codec (none, float16, sq8, pq)")
+    read_only: bool = Field(..., description="Serving read-only from mapped files")
+    index_bytes: int = Field(..., description="Estimated index bytes")
+    metadata_bytes: int = Field(..., description="Metadata table bytes")
+    content_bytes: int = Field(..., description="Unsaved chunk content bytes")
+    memory_bytes: int = Field(..., description="Estimated total bytes")
+    segments: int = Field(..., description="Persisted segments")
+    deleted: int = Field(..., description="Deleted vectors awaiting purge")
+    hits: int = Field(..., description="Requests since the store was loaded")
+    last_access: float | None = Field(None, description="Last access time (epoch seconds)")
+
+
+class VectorStoresResponse(BaseModel):
+    """Resident vector stores and memory budget."""
+
+    stores: list[VectorStoreStatus] = Field(..., description="Resident stores, most recent first")
+    memory_bytes: int = Field(..., description="Estimated bytes of all resident stores")
+    memory_budget_bytes: int = Field(..., description="Memory budget (0 = unlimited)")
+    eviction_policy: str = Field(..., description="Eviction policy")
+    evictions: int = Field(..., description="Stores evicted since startup")
+
+
+class EmbeddingCacheStats(BaseModel):
+    """Persistent embedding cache counters."""
+
+    entries: int = Field(..., description="Cached embeddings")
+    bytes: int = Field(..., description="Stored vector bytes")
+    max_bytes: int = Field(..., description="Size budget (0 = unlimited)")
+    hits: int = Field(..., description="Texts served from the cache since startup")
+    misses: int = Field(..., description="Texts sent to the embedding API since startup")
+    hit_rate: float = Field(..., description="Hits / lookups")
+    evictions: int = Field(..., description="Entries evicted since startup")
+
+
+class QueryEmbeddingCacheStats(BaseModel):
+    """In-memory query embedding cache counters."""
+
+    entries: int = Field(..., description="Cached query embeddings")
+    max_entries: int = Field(..., description="Capacity")
+    ttl_seconds: float = Field(..., description="Entry lifetime")
+    hits: int = Field(..., description="Queries served from the cache")
+    misses: int = Field(..., description="Queries sent to the embedding API")
+    coalesced: int = Field(..., description="Queries that waited on an identical in-flight request")
+    hit_rate: float = Field(..., description="(Hits + coalesced) / lookups")
+    mean_miss_ms: float = Field(..., description="Mean embedding request latency")
+    saved_ms: float = Field(..., description="Estimated latency saved by hits and coalescing")
+
+
+class MicroBatchStats(BaseModel):
+    """Query embedding micro-batching counters."""
+
+    requests: int = Field(..., description="Query embeddings requested")
+    batches: int = Field(..., description="Backend requests made for them")
+    mean_batch_size: float = Field(..., description="Requests / batches")
+    max_wait_ms: float = Field(..., description="Batching window")
+    max_batch_size: int = Field(..., description="Max queries per batch")
+
+
+class EmbeddingStatsResponse(BaseModel):
+    """Embedding service cache statistics."""
+
+    cache: EmbeddingCacheStats | None = Field(
+        None, description="Persistent cache, None when disabled"
+    )
+    query_cache: QueryEmbeddingCacheStats | None = Field(
+        None,
+        description="Query embedding cache, None when disabled",
+    )
+    micro_batches: MicroBatchStats | None = Field(
+        None,
+        description="Query micro-batching, None when disabled",
+    )
+
+
 class SimulateRequest(BaseModel):
     """Simulate intent detection request."""
 
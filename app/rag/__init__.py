@@ -1,12 +1,22 @@
 """RAG (Retrieval-Augmented Generation) module."""
 
 from app.rag.embeddings import embedding_service, EmbeddingService
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.embedding_backends import (
+    EmbeddingBackend,
+    HashingEmbeddingBackend,
+    OpenAIEmbeddingBackend,
+)
 from app.rag.chunking import chunking_service, ChunkingService
 from app.rag.vector_store import vector_store_service, VectorStoreService, FAISSVectorStore
 
 __all__ = [
     "embedding_service",
     "EmbeddingService",
+    "EmbeddingCache",
+    "EmbeddingBackend",
+    "HashingEmbeddingBackend",
+    "OpenAIEmbeddingBackend",
     "chunking_service",
     "ChunkingService",
     "vector_store_service",
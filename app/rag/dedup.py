@@ -0,0 +1,92 @@
+"""Near-duplicate detection of chunks by SimHash fingerprints."""
+
+import hashlib
+import re
+from typing import Any
+import numpy as np
+
+FINGERPRINT_BITS = 64
+
+# Words per shingle; boilerplate matches on phrases rather than single words
+SHINGLE_WORDS = 3
+
+WORD_PATTERN = re.compile(r"\w+")
+
+_BIT_POSITIONS = np.arange(FINGERPRINT_BITS, dtype=np.uint64)
+
+
+def simhash(text: str) -> int:
+    """Compute a 64-bit SimHash of a text's word shingles, as a signed int64.
+
+    Each shingle's hash votes on every bit; a bit is set when most
+    shingles set it. Texts sharing most of their shingles get
+    fingerprints differing in few bits. Signed so it fits a BigInteger.
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return 0
+    shingles = {
+        " ".join(words[i:i + SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SHINGLE_WORDS + 1))
+    }
+
+    hashes = np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            for shingle in shingles
+        ],
+        dtype=np.uint64,
+    )
+    bits = (hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(hashes)
+
+    value = sum(1 << i for i in np.flatnonzero(votes > 0).tolist())
+    return value - (1 << FINGERPRINT_BITS) if value >= 1 << (FINGERPRINT_BITS - 1) else value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count the bits in which two fingerprints differ."""
+    return ((a ^ b) & ((1 << FINGERPRINT_BITS) - 1)).bit_count()
+
+
+class FingerprintIndex:
+    """Find fingerprints within a Hamming distance of those added.
+
+    Fingerprints are split into max_distance + 1 bands. Two fingerprints
+    differing in at most max_distance bits agree exactly on at least one
+    band, so candidates are looked up by band and checked in full.
+    """
+
+    def __init__(self, max_distance: int = 3) -> None:
+        """Initialize an empty index."""
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        bounds = [round(i * FINGERPRINT_BITS / bands) for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._tables: list[dict[int, list[tuple[int, Any]]]] = [{} for _ in self._bands]
+        self._count = 0
+
+    def __len__(self) -> int:
+        """Get number of fingerprints added."""
+        return self._count
+
+    def add(self, fingerprint: int, key: Any) -> None:
+        """Add a fingerprint, returned as key by later matches."""
+        for (shift, mask), table in zip(self._bands, self._tables):
+            table.setdefault((fingerprint >> shift) & mask, []).append((fingerprint, key))
+        self._count += 1
+
+    def find(self, fingerprint: int) -> Any | None:
+        """Get the key of the closest fingerprint within max_distance, if any."""
+        best = None
+        best_distance = self.max_distance + 1
+        for (shift, mask), table in zip(self._bands, self._tables):
+            for candidate, key in table.get((fingerprint >> shift) & mask, ()):
+                distance = hamming_distance(fingerprint, candidate)
+                if distance < best_distance:
+                    best, best_distance = key, distance
+                    if distance == 0:
+                        return best
+        return best
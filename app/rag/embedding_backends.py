@@ -0,0 +1,224 @@
+"""Embedding model backends."""
+
+import hashlib
+import math
+import re
+from abc import abstractmethod
+from collections import Counter
+from typing import Any
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from openai import AsyncOpenAI
+from app.config import settings
+from app.rag.embedding_batches import BatchEmbedder, TokenBucket, TokenCounter, run_sync
+
+EMBEDDING_BACKENDS = ("openai", "hashing")
+
+# Full output dimensions of supported OpenAI embedding models
+MODEL_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class EmbeddingBackend(Embeddings):
+    """Embedding model behind EmbeddingService.
+
+    Backends are LangChain Embeddings, so the active one can be handed to
+    LangChain components directly.
+    """
+
+    # Remote backends pay a round trip per request, worth batching queries for
+    remote = False
+
+    @property
+    @abstractmethod
+    def model_name(self) -> str:
+        """Get the model identifier, part of the embedding cache key."""
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Get the dimension of the vectors this backend returns."""
+
+    @property
+    def langchain_embeddings(self) -> Embeddings:
+        """Get the embeddings object to hand to LangChain."""
+        return self
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed a small batch of queries with one request."""
+        return self.embed_documents(texts)
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI embeddings API.
+
+    Documents are embedded in token-packed batches sent concurrently under
+    a shared rate limit; queries go through LangChain's client.
+    """
+
+    remote = True
+
+    def __init__(self) -> None:
+        """Initialize OpenAI clients from settings.
+
+        text-embedding-3 models return shortened vectors when
+        embedding_dimensions is set.
+        """
+        self._embeddings = OpenAIEmbeddings(
+            model=settings.openai_embedding_model,
+            openai_api_key=settings.openai_api_key,
+            dimensions=settings.embedding_dimensions,
+        )
+        self._count_tokens = TokenCounter(settings.openai_embedding_model)
+        self._token_bucket = (
+            TokenBucket(settings.embedding_tokens_per_minute)
+            if settings.embedding_tokens_per_minute > 0
+            else None
+        )
+        self.retries = 0
+
+    @property
+    def model_name(self) -> str:
+        """Get the OpenAI model name."""
+        return settings.openai_embedding_model
+
+    @property
+    def dimension(self) -> int:
+        """Get the configured or full model dimension."""
+        return settings.embedding_dimensions or MODEL_DIMENSIONS.get(
+            settings.openai_embedding_model, 1536
+        )
+
+    @property
+    def langchain_embeddings(self) -> Embeddings:
+        """Get LangChain's OpenAI embeddings client."""
+        return self._embeddings
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query with one API request."""
+        return self._embeddings.embed_query(text)
+
+    def embed_queries(self, texts: list[str]) -> list[list[float]]:
+        """Embed a small batch of queries with one request on the pooled client."""
+        return self._embeddings.embed_documents(texts)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts through the batching pipeline from synchronous code."""
+        if not texts:
+            return []
+        return run_sync(self.aembed_documents(texts))
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in token-packed batches sent concurrently, in input order.
+
+        Batches stay under embedding_tokens_per_minute and are retried with
+        jittered backoff when rate limited.
+        """
+        dimensions = (
+            {"dimensions": settings.embedding_dimensions} if settings.embedding_dimensions else {}
+        )
+
+        # Retries are handled by the batcher, which spaces them across batches
+        async with AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0) as client:
+
+            async def embed_batch(batch: list[str]) -> list[list[float]]:
+                response = await client.embeddings.create(
+                    input=batch,
+                    model=settings.openai_embedding_model,
+                    **dimensions,
+                )
+                return [
+                    item.embedding for item in sorted(response.data, key=lambda item: item.index)
+                ]
+
+            embedder = BatchEmbedder(
+                embed_batch,
+                self._count_tokens,
+                max_batch_tokens=settings.embedding_batch_tokens,
+                max_batch_size=settings.embedding_batch_size,
+                concurrency=settings.embedding_concurrency,
+                bucket=self._token_bucket,
+                max_retries=settings.embedding_max_retries,
+            )
+            try:
+                return await embedder.embed(texts)
+            finally:
+                self.retries += embedder.retries
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Local embeddings from hashed word and character n-gram features.
+
+    Each feature is hashed to a signed position of a fixed-size vector,
+    weighted by log term frequency, and the vector is L2-normalized. Texts
+    sharing words or word fragments land close together. Deterministic,
+    runs in milliseconds on CPU and needs no network or model files, at
+    the cost of matching surface forms rather than meaning.
+    """
+
+    def __init__(self, dimension: int | None = None, ngram_range: tuple[int, int] = (3, 5)) -> None:
+        """Initialize with the output dimension and character n-gram lengths."""
+        self._dimension = dimension or settings.local_embedding_dimension
+        self.ngram_range = ngram_range
+
+    @property
+    def model_name(self) -> str:
+        """Get an identifier covering the feature parameters."""
+        low, high = self.ngram_range
+        return f"hashing-ngram-{low}-{high}"
+
+    @property
+    def dimension(self) -> int:
+        """Get the configured output dimension."""
+        return self._dimension
+
+    def _features(self, text: str) -> Counter:
+        """Count a text's words and the character n-grams of each word."""
+        features: Counter = Counter()
+        low, high = self.ngram_range
+        for word in WORD_PATTERN.findall(text.lower()):
+            features["w:" + word] += 1
+            padded = f"<{word}>"
+            for n in range(low, min(high, len(padded)) + 1):
+                for i in range(len(padded) - n + 1):
+                    features[padded[i:i + n]] += 1
+        return features
+
+    def _embed(self, text: str) -> list[float]:
+        """Hash one text's features into a normalized vector."""
+        vector = np.zeros(self._dimension, dtype=np.float32)
+        for feature, count in self._features(text).items():
+            digest = int.from_bytes(
+                hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little"
+            )
+            sign = 1.0 if digest >> 63 else -1.0
+            vector[digest % self._dimension] += sign * (1.0 + math.log(count))
+
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embed a query."""
+        return self._embed(text)
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts."""
+        return [self._embed(text) for text in texts]
+
+
+def create_backend(name: str | None = None, **kwargs: Any) -> EmbeddingBackend:
+    """Create the embedding backend selected by name or settings."""
+    name = name or settings.embedding_backend
+    if name == "openai":
+        return OpenAIEmbeddingBackend()
+    if name == "hashing":
+        return HashingEmbeddingBackend(**kwargs)
+    raise ValueError(f"Unknown embedding backend: {name}")
@@ -0,0 +1,204 @@
+"""Token-aware concurrent batching of embedding requests."""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth retrying: rate limits and transient transport failures
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+
+# Rough characters per token when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+class TokenCounter:
+    """Count tokens with the model's tiktoken encoding.
+
+    Falls back to a characters-per-token estimate when the encoding cannot
+    be loaded, e.g. without network access to fetch it.
+    """
+
+    def __init__(self, model: str) -> None:
+        """Initialize counter for an embedding model; the encoding loads on first use."""
+        self.model = model
+        self._encoding: Any = None
+        self._loaded = False
+
+    def __call__(self, text: str) -> int:
+        """Count the tokens of a text."""
+        if not self._loaded:
+            self._loaded = True
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.encoding_for_model(self.model)
+            except Exception as e:
+                logger.warning(
+                    f"Estimating embedding tokens, no tiktoken encoding for {self.model}: {e}"
+                )
+
+        if self._encoding is None:
+            return max(1, len(text) // CHARS_PER_TOKEN)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+
+def pack_batches(token_counts: Sequence[int], max_tokens: int, max_items: int) -> list[list[int]]:
+    """Group consecutive text positions into batches within token and size limits.
+
+    A text over max_tokens on its own still gets a batch of one.
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+
+    for i, tokens in enumerate(token_counts):
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate.
+
+    Callers reserve tokens up front, going into debt when the bucket is
+    short, and sleep until the debt is repaid. Reservations take a thread
+    lock only briefly, so one bucket can be shared by every event loop.
+    """
+
+    def __init__(self, tokens_per_minute: int) -> None:
+        """Initialize a full bucket holding one minute of tokens."""
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int) -> float:
+        """Take tokens, returning the seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(float(tokens), self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    async def acquire(self, tokens: int) -> None:
+        """Wait until tokens are available and take them."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class BatchEmbedder:
+    """Embed texts in token-packed batches, several in flight at once.
+
+    Batches wait on a token bucket, if given, before being sent and are
+    retried with jittered exponential backoff on rate limits. Results are
+    returned in input order.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], Awaitable[list[list[float]]]],
+        count_tokens: Callable[[str], int],
+        max_batch_tokens: int,
+        max_batch_size: int,
+        concurrency: int,
+        bucket: TokenBucket | None = None,
+        max_retries: int = 6,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 60.0,
+    ) -> None:
+        """Initialize with an async function embedding one batch of texts."""
+        self.embed_batch = embed_batch
+        self.count_tokens = count_tokens
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retries = 0
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, returning vectors in input order."""
+        if not texts:
+            return []
+
+        token_counts = [self.count_tokens(text) for text in texts]
+        batches = pack_batches(token_counts, self.max_batch_tokens, self.max_batch_size)
+
+        # Created per call: asyncio primitives are bound to the running loop
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch: list[int]) -> list[list[float]]:
+            async with semaphore:
+                if self.bucket is not None:
+                    await self.bucket.acquire(sum(token_counts[i] for i in batch))
+                return await self._embed_with_retry([texts[i] for i in batch])
+
+        results = await asyncio.gather(*(run(batch) for batch in batches))
+
+        vectors: list[list[float]] = [[] for _ in texts]
+        for batch, batch_vectors in zip(batches, results):
+            for i, vector in zip(batch, batch_vectors):
+                vectors[i] = vector
+        return vectors
+
+    async def _embed_with_retry(self, texts: list[str]) -> list[list[float]]:
+        """Embed one batch, backing off and retrying on retryable errors."""
+        attempt = 0
+        while True:
+            try:
+                return await self.embed_batch(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter spreads retries from concurrent batches apart
+                delay = random.uniform(
+                    0, min(self.max_backoff_seconds, self.backoff_seconds * 2**attempt)
+                )
+                attempt += 1
+                self.retries += 1
+                logger.warning(
+                    f"Embedding batch of {len(texts)} failed ({type(e).__name__}), "
+                    f"retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """Run a coroutine to completion from synchronous code.
+
+    Inside a running event loop (e.g. an async endpoint calling a sync
+    service) the coroutine runs on its own loop in a worker thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)  # type: ignore[arg-type]
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()  # type: ignore[arg-type]
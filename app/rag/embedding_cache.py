@@ -0,0 +1,181 @@
+"""Persistent content-addressed cache of text embeddings."""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Evicting down to this fraction of the budget amortizes the delete
+EVICTION_TARGET = 0.9
+
+# SQLite limits bound parameters per statement
+SQL_BATCH = 500
+
+
+def text_hash(text: str) -> str:
+    """Hash text content for the cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite cache of embeddings keyed by (model, dimension, sha256(text)).
+
+    Identical text is embedded once however many documents or ingests it
+    appears in. Entries are evicted least recently used first once the
+    stored vectors exceed the byte budget.
+    """
+
+    def __init__(self, path: str | Path, max_bytes: int = 0) -> None:
+        """Open or create the cache database; max_bytes of 0 is unbounded."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dimension, hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)"
+        )
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, model: str, dimension: int, texts: list[str]) -> list[list[float] | None]:
+        """Look up embeddings for texts, None for each miss."""
+        hashes = [text_hash(text) for text in texts]
+        found: dict[str, list[float]] = {}
+
+        with self._lock:
+            for start in range(0, len(hashes), SQL_BATCH):
+                batch = list(dict.fromkeys(hashes[start:start + SQL_BATCH]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dimension = ? AND hash IN ({placeholders})",
+                    [model, dimension, *batch],
+                ).fetchall()
+                found.update(
+                    (h, np.frombuffer(blob, dtype=np.float32).tolist()) for h, blob in rows
+                )
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? "
+                    "WHERE model = ? AND dimension = ? AND hash = ?",
+                    [(now, model, dimension, h) for h in found],
+                )
+
+            results = [found.get(h) for h in hashes]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+            return results
+
+    def put_many(
+        self, model: str, dimension: int, texts: list[str], vectors: list[list[float]]
+    ) -> None:
+        """Store embeddings for texts, evicting old entries over budget."""
+        now = time.time()
+        rows = [
+            (model, dimension, text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                replaced = self._stored_bytes(model, dimension, [row[2] for row in rows])
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._size += sum(len(row[3]) for row in rows) - replaced
+
+            if self.max_bytes and self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICTION_TARGET))
+
+    def _stored_bytes(self, model: str, dimension: int, hashes: list[str]) -> int:
+        """Get bytes already stored under the given keys."""
+        total = 0
+        for start in range(0, len(hashes), SQL_BATCH):
+            batch = list(dict.fromkeys(hashes[start:start + SQL_BATCH]))
+            placeholders = ",".join("?" * len(batch))
+            total += self._conn.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings "
+                f"WHERE model = ? AND dimension = ? AND hash IN ({placeholders})",
+                [model, dimension, *batch],
+            ).fetchone()[0]
+        return total
+
+    def _evict(self, target_bytes: int) -> None:
+        """Delete least recently used entries until the cache fits target_bytes."""
+        rows = self._conn.execute(
+            "SELECT rowid, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        ).fetchall()
+
+        victims = []
+        for rowid, size in rows:
+            if self._size <= target_bytes:
+                break
+            victims.append((rowid,))
+            self._size -= size
+
+        self._conn.executemany("DELETE FROM embeddings WHERE rowid = ?", victims)
+        self.evictions += len(victims)
+        logger.info(f"Evicted {len(victims)} cached embeddings")
+
+    def __len__(self) -> int:
+        """Get number of cached embeddings."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def clear(self) -> None:
+        """Delete all cached embeddings."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._size = 0
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,32 +1,127 @@
-"""Embedding utilities using OpenAI."""
+"""Embedding service over pluggable model backends."""
 
+import threading
+from collections.abc import Sequence
 from typing import Any
-from langchain_openai import OpenAIEmbeddings
+import numpy as np
 from app.config import settings
+from app.rag.embedding_backends import EmbeddingBackend, create_backend
+from app.rag.embedding_cache import EmbeddingCache
+from app.rag.micro_batcher import MicroBatcher
+from app.rag.query_cache import QueryEmbeddingCache
+
+
+def encode_embedding(vector: Sequence[float] | np.ndarray) -> bytes:
+    """Pack an embedding as float16 bytes for KbChunk.embedding."""
+    return np.asarray(vector, dtype=np.float16).tobytes()
+
+
+def decode_embeddings(blobs: Sequence[bytes]) -> np.ndarray:
+    """Unpack float16 KbChunk embeddings into a float32 matrix."""
+    return np.vstack([np.frombuffer(blob, dtype=np.float16) for blob in blobs]).astype(np.float32)
 
 
 class EmbeddingService:
-    """Service for generating embeddings using OpenAI."""
+    """Service for generating embeddings with the configured backend."""
+
+    def __init__(
+        self,
+        backend: EmbeddingBackend | None = None,
+        cache: EmbeddingCache | None = None,
+    ) -> None:
+        """Initialize embedding service.
 
-    def __init__(self) -> None:
-        """Initialize embedding service."""
-        self._embeddings = OpenAIEmbeddings(
-            model=settings.openai_embedding_model,
-            openai_api_key=settings.openai_api_key,
+        The backend defaults to the one selected by settings.embedding_backend:
+        the OpenAI API, or local hashed n-gram features for offline use.
+        """
+        self.backend = backend or create_backend()
+        self._cache = cache
+        self._cache_lock = threading.Lock()
+        self.query_cache = (
+            QueryEmbeddingCache(
+                settings.query_embedding_cache_size, settings.query_embedding_cache_ttl
+            )
+            if settings.query_embedding_cache_size > 0
+            else None
         )
+        self.micro_batcher = (
+            MicroBatcher(
+                self.backend.embed_queries,
+                max_wait_ms=settings.embedding_microbatch_wait_ms,
+                max_batch_size=settings.embedding_microbatch_size,
+                concurrency=settings.embedding_concurrency,
+            )
+            if self.backend.remote and settings.embedding_microbatch_wait_ms > 0
+            else None
+        )
+
+    @property
+    def cache(self) -> EmbeddingCache | None:
+        """Get the persistent embedding cache, opening it on first use."""
+        if self._cache is None and settings.embedding_cache_path:
+            with self._cache_lock:
+                if self._cache is None:
+                    self._cache = EmbeddingCache(
+                        settings.embedding_cache_path,
+                        max_bytes=settings.embedding_cache_max_mb * 1024 * 1024,
+                    )
+        return self._cache
+
+    @property
+    def dimension(self) -> int:
+        """Get the dimension of the vectors this service returns."""
+        return self.backend.dimension
 
     def embed_text(self, text: str) -> list[float]:
-        """Embed a single text."""
-        return self._embeddings.embed_query(text)
+        """Embed a single text, reusing recent embeddings of the same query.
+
+        Cache misses from concurrent callers are micro-batched into one
+        backend request.
+        """
+        if self.query_cache is None:
+            return self._embed_query(text)
+        return self.query_cache.get_or_compute(text, lambda: self._embed_query(text))
+
+    def _embed_query(self, text: str) -> list[float]:
+        """Embed a query, through the micro-batcher when enabled."""
+        if self.micro_batcher is None:
+            return self.backend.embed_query(text)
+        return self.micro_batcher.submit(text)
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        """Embed multiple texts."""
-        return self._embeddings.embed_documents(texts)
+        """Embed multiple texts.
+
+        Texts embedded before by the same model and dimension are served
+        from the cache; only the distinct misses are sent to the backend.
+        """
+        cache = self.cache
+        if cache is None or not texts:
+            return self._embed_documents(texts)
+
+        model = self.backend.model_name
+        vectors = cache.get_many(model, self.dimension, texts)
+        missing = list(
+            dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None)
+        )
+        if not missing:
+            return vectors
+
+        embedded = dict(zip(missing, self._embed_documents(missing)))
+        cache.put_many(model, self.dimension, missing, [embedded[text] for text in missing])
+        return [
+            vector if vector is not None else embedded[text] for text, vector in zip(texts, vectors)
+        ]
+
+    def _embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts with the backend."""
+        if not texts:
+            return []
+        return self.backend.embed_documents(texts)
 
     @property
     def embeddings(self) -> Any:
         """Get underlying embeddings object for LangChain."""
-        return self._embeddings
+        return self.backend.langchain_embeddings
 
 
 # Global embedding service
@@ -0,0 +1,268 @@
+"""FAISS index selection, construction and benchmarking."""
+
+import math
+import time
+from typing import Any, Callable
+import faiss
+import numpy as np
+from app.config import settings
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# Vector codecs: bytes per dimension are 4 (none), 2 (float16), 1 (sq8), ~1/16 (pq)
+COMPRESSIONS = ("none", "float16", "sq8", "pq")
+
+# PQ trains 256 centroids per sub-quantizer and needs ~39 points per centroid
+PQ_MIN_VECTORS = 256 * 39
+
+
+def select_index_type(count: int, recall_target: float | None = None) -> str:
+    """Select an index type for a vector count and recall target.
+
+    Small tenants stay on exact flat search. Larger ones use HNSW when high
+    recall is required, IVF-Flat otherwise, and IVF-PQ once the index is big
+    enough that memory dominates and the recall target allows quantization.
+    """
+    if settings.vector_index_type != "auto":
+        return settings.vector_index_type
+
+    recall_target = recall_target if recall_target is not None else settings.vector_recall_target
+
+    if count < settings.vector_ann_min_vectors:
+        return "flat"
+    if count >= settings.vector_pq_min_vectors and recall_target < 0.95:
+        return "ivf_pq"
+    if recall_target >= 0.9:
+        return "hnsw"
+    return "ivf_flat"
+
+
+def index_type_of(index: Any) -> str:
+    """Get the index type name of a FAISS index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def compression_of(index: Any) -> str:
+    """Get the vector codec of a FAISS index."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return compression_of(index.storage)
+    if isinstance(index, (faiss.IndexPQ, faiss.IndexIVFPQ)):
+        return "pq"
+    if isinstance(index, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        return "float16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    return "none"
+
+
+def index_spec(index_type: str, compression: str, count: int) -> tuple[str, str]:
+    """Resolve the (index type, codec) to build for a vector count.
+
+    Small indexes stay uncompressed, IVF-PQ is always PQ, and PQ falls back
+    to SQ8 when there are too few vectors to train it.
+    """
+    if index_type == "ivf_pq":
+        return index_type, "pq"
+    if count < settings.vector_compression_min_vectors:
+        return index_type, "none"
+    if compression == "pq" and count < PQ_MIN_VECTORS:
+        return index_type, "sq8"
+    return index_type, compression
+
+
+def index_spec_of(index: Any) -> tuple[str, str]:
+    """Get the (index type, codec) of a FAISS index."""
+    return index_type_of(index), compression_of(index)
+
+
+def _ivf_nlist(count: int) -> int:
+    """Number of IVF lists, ~4*sqrt(n) with enough training points per list."""
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    """Number of PQ sub-quantizers, targeting ~16 dimensions per code byte."""
+    for m in range(max(1, dimension // 16), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _codec_string(compression: str, dimension: int) -> str | None:
+    """Build the index_factory vector codec, None for full float32."""
+    if compression == "none":
+        return None
+    if compression == "float16":
+        return "SQfp16"
+    if compression == "sq8":
+        return "SQ8"
+    if compression == "pq":
+        return f"PQ{_pq_subquantizers(dimension)}"
+    raise ValueError(f"Unknown compression: {compression}")
+
+
+def index_factory_string(
+    index_type: str,
+    dimension: int,
+    count: int,
+    compression: str = "none",
+) -> str:
+    """Build the faiss.index_factory description for an index type and codec."""
+    codec = _codec_string(compression, dimension)
+    if index_type == "flat":
+        return codec or "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{settings.hnsw_m}" + (f",{codec}" if codec else "")
+    if index_type == "ivf_flat":
+        return f"IVF{_ivf_nlist(count)},{codec or 'Flat'}"
+    if index_type == "ivf_pq":
+        return f"IVF{_ivf_nlist(count)},PQ{_pq_subquantizers(dimension)}"
+    raise ValueError(f"Unknown index type: {index_type}")
+
+
+def build_index(
+    index_type: str,
+    vectors: np.ndarray,
+    dimension: int,
+    compression: str = "none",
+) -> Any:
+    """Create, train and fill an index of the given type and vector codec."""
+    count = len(vectors)
+    index = faiss.index_factory(
+        dimension,
+        index_factory_string(index_type, dimension, count, compression),
+    )
+
+    if not index.is_trained:
+        sample_size = min(count, settings.vector_train_sample)
+        sample = vectors[np.random.default_rng(0).choice(count, sample_size, replace=False)]
+        index.train(sample)
+
+    if index_type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = settings.hnsw_ef_construction
+
+    if count:
+        index.add(vectors)
+
+    # IVF indexes need a direct map so vectors can be reconstructed
+    if isinstance(faiss.downcast_index(index), faiss.IndexIVF):
+        faiss.extract_index_ivf(index).make_direct_map()
+
+    return index
+
+
+def search_parameters(
+    index: Any,
+    recall_target: float | None = None,
+    selector: Any | None = None,
+) -> Any:
+    """Build search parameters tuned to the recall target for an index."""
+    recall_target = recall_target if recall_target is not None else settings.vector_recall_target
+    index = faiss.downcast_index(index)
+
+    # Exploration budget grows as the allowed miss rate shrinks
+    effort = 1.0 / max(1.0 - recall_target, 0.005)
+
+    if isinstance(index, faiss.IndexHNSW):
+        ef_search = int(min(max(16, 4 * effort), 1024))
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    if isinstance(index, faiss.IndexIVF):
+        nprobe = int(min(max(1, index.nlist * effort / 100), index.nlist))
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def index_memory_bytes(index: Any) -> int:
+    """Estimate the bytes an index holds for codes, graph links and ids."""
+    index = faiss.downcast_index(index)
+
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        links = hnsw.neighbors.size() * 4 + hnsw.levels.size() * 4 + hnsw.offsets.size() * 8
+        return index_memory_bytes(index.storage) + links
+    if isinstance(index, faiss.IndexIVF):
+        # Codes plus one int64 id per vector, and the coarse quantizer
+        return index.ntotal * (index.code_size + 8) + index_memory_bytes(index.quantizer)
+    if hasattr(index, "code_size"):
+        return index.ntotal * index.code_size
+    return index.ntotal * index.d * 4
+
+
+def reconstruct_all(index: Any) -> np.ndarray:
+    """Reconstruct all vectors stored in an index."""
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def rescore(
+    queries: np.ndarray,
+    candidates: np.ndarray,
+    fetch: Callable[[np.ndarray], np.ndarray],
+    k: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Re-rank candidate ids by exact L2 distance to their original vectors.
+
+    fetch maps an array of ids to their full-precision vectors.
+    """
+    distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    indices = np.full((len(queries), k), -1, dtype=np.int64)
+
+    for row, (query, ids) in enumerate(zip(queries, candidates)):
+        ids = ids[ids >= 0]
+        if not ids.size:
+            continue
+        exact = ((fetch(ids) - query) ** 2).sum(axis=1)
+        order = np.argsort(exact, kind="stable")[:k]
+        distances[row, :len(order)] = exact[order]
+        indices[row, :len(order)] = ids[order]
+
+    return distances, indices
+
+
+def benchmark_index(
+    candidate: Any,
+    baseline: Any,
+    queries: np.ndarray,
+    k: int,
+    recall_target: float | None = None,
+    vectors: np.ndarray | None = None,
+    rescore_factor: int = 0,
+    candidate_queries: np.ndarray | None = None,
+) -> dict[str, float]:
+    """Measure recall@k, latency and memory of an index against a baseline.
+
+    With vectors and a rescore_factor above 1, k * rescore_factor candidates
+    are re-ranked exactly against the original vectors. candidate_queries
+    are the queries as the candidate sees them, e.g. after dimension
+    reduction, and vectors must then be in the candidate's dimension.
+    """
+    _, truth = baseline.search(queries, k)
+    if candidate_queries is None:
+        candidate_queries = queries
+
+    params = search_parameters(candidate, recall_target)
+    fetch_k = k * rescore_factor if vectors is not None and rescore_factor > 1 else k
+    latencies = []
+    hits = 0
+    for i, query in enumerate(candidate_queries):
+        start = time.perf_counter()
+        _, found = candidate.search(query.reshape(1, -1), fetch_k, params=params)
+        if fetch_k > k:
+            _, found = rescore(query.reshape(1, -1), found, lambda ids: vectors[ids], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(set(found[0]) & set(truth[i]))
+
+    latencies_arr = np.array(latencies)
+    return {
+        "recall_at_k": hits / (len(queries) * k),
+        "latency_ms_mean": float(latencies_arr.mean()),
+        "latency_ms_p95": float(np.percentile(latencies_arr, 95)),
+        "bytes_per_vector": index_memory_bytes(candidate) / max(candidate.ntotal, 1),
+    }
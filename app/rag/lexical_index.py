@@ -0,0 +1,193 @@
+"""In-process BM25 index for lexical retrieval."""
+
+import json
+import math
+import re
+from collections import Counter
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+import numpy as np
+from app.rag.records import write_atomic
+
+LEXICAL_FILE = "lexical.json"
+
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the",
+    "to", "what", "when", "where", "which", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase alphanumeric terms, dropping stopwords."""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 inverted index over chunk contents.
+
+    Documents get consecutive ids matching their vector ids, so lexical and
+    dense hits refer to the same chunks. Postings are Python lists while
+    being appended to and converted to arrays per term on first search.
+
+    The index is append-only: searches may run while documents are added,
+    and pass max_id to ignore documents newer than what they can see.
+    """
+
+    def __init__(self, epoch: int = 0) -> None:
+        """Initialize an empty index for ids of the given segment epoch."""
+        self.epoch = epoch
+        self._ids: dict[str, list[int]] = {}
+        self._tfs: dict[str, list[int]] = {}
+        self._lengths: list[int] = []
+        self._total_length = 0
+        self._arrays: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._lengths_array: np.ndarray | None = None
+
+    @property
+    def count(self) -> int:
+        """Get number of indexed documents."""
+        return len(self._lengths)
+
+    def add(self, texts: Sequence[str], start_id: int) -> None:
+        """Index texts assigned consecutive ids from start_id."""
+        if start_id != self.count:
+            raise ValueError(f"Expected start id {self.count}, got {start_id}")
+
+        for doc_id, text in enumerate(texts, start=start_id):
+            terms = Counter(tokenize(text))
+
+            # Lengths first, so any id in the postings has its length
+            length = sum(terms.values())
+            self._lengths.append(length)
+            self._total_length += length
+
+            for term, tf in terms.items():
+                self._ids.setdefault(term, []).append(doc_id)
+                self._tfs.setdefault(term, []).append(tf)
+
+    def _postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        """Get a term's ids and term frequencies as arrays.
+
+        Cached arrays are rebuilt once the term's postings have grown.
+        """
+        cached = self._arrays.get(term)
+        if cached is None or len(cached[0]) != len(self._ids[term]):
+            size = min(len(self._ids[term]), len(self._tfs[term]))
+            cached = (
+                np.asarray(self._ids[term][:size], dtype=np.int64),
+                np.asarray(self._tfs[term][:size], dtype=np.float32),
+            )
+            self._arrays[term] = cached
+        return cached
+
+    def _lengths_up_to(self, max_id: int) -> np.ndarray:
+        """Get document lengths as an array covering at least ids below max_id."""
+        lengths = self._lengths_array
+        if lengths is None or len(lengths) < max_id:
+            lengths = np.asarray(self._lengths, dtype=np.float32)
+            self._lengths_array = lengths
+        return lengths
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        allowed_ids: np.ndarray | None = None,
+        max_id: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Get the top k (scores, ids) by BM25, best first.
+
+        allowed_ids restricts results to a sorted id subset, e.g. the ids
+        matching metadata filters, and max_id to ids below it.
+        """
+        count = self.count if max_id is None else min(max_id, self.count)
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t in self._ids]
+        if not terms or count == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        lengths = self._lengths_up_to(count)
+        average_length = self._total_length / self.count or 1.0
+
+        hit_ids = []
+        hit_scores = []
+        for term in terms:
+            ids, tfs = self._postings(term)
+            visible = np.searchsorted(ids, count)
+            ids, tfs = ids[:visible], tfs[:visible]
+            document_frequency = len(ids)
+            if allowed_ids is not None:
+                keep = np.isin(ids, allowed_ids, assume_unique=True)
+                ids, tfs = ids[keep], tfs[keep]
+
+            idf = math.log(1 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ids] / average_length)
+            hit_ids.append(ids)
+            hit_scores.append(idf * tfs * (BM25_K1 + 1) / (tfs + norm))
+
+        if not any(len(ids) for ids in hit_ids):
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        ids, inverse = np.unique(np.concatenate(hit_ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(hit_scores)).astype(np.float32)
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        return scores[top], ids[top]
+
+    def is_keyword_query(self, query: str, max_terms: int) -> bool:
+        """Check whether a query is a few terms that all occur in the index."""
+        terms = tokenize(query)
+        return 0 < len(terms) <= max_terms and all(t in self._ids for t in terms)
+
+    def save(self, path: Path) -> None:
+        """Write the index atomically."""
+        data = {
+            "count": self.count,
+            "epoch": self.epoch,
+            "lengths": self._lengths,
+            "postings": {term: [self._ids[term], self._tfs[term]] for term in self._ids},
+        }
+        write_atomic(path, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        """Read a saved index."""
+        with open(path, "r", encoding="utf-8") as f:
+            data: dict[str, Any] = json.load(f)
+
+        index = cls(epoch=data.get("epoch", 0))
+        index._lengths = data["lengths"]
+        index._total_length = sum(index._lengths)
+        for term, (ids, tfs) in data["postings"].items():
+            index._ids[term] = ids
+            index._tfs[term] = tfs
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[dict[str, Any]]],
+    k: int,
+    rrf_k: int = 60,
+) -> list[dict[str, Any]]:
+    """Fuse ranked result lists by reciprocal rank, keyed by result id.
+
+    Each result scores sum(1 / (rrf_k + rank)) over the lists it appears in,
+    which needs no calibration between BM25 and vector similarity scores.
+    """
+    fused: dict[int, dict[str, Any]] = {}
+    scores: dict[int, float] = {}
+
+    for ranking in rankings:
+        for rank, result in enumerate(ranking, start=1):
+            fused.setdefault(result["id"], result)
+            scores[result["id"]] = scores.get(result["id"], 0.0) + 1.0 / (rrf_k + rank)
+
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [{**fused[result_id], "score": scores[result_id]} for result_id in best]
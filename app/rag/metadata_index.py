@@ -0,0 +1,88 @@
+"""Inverted metadata index for pre-filtered vector search."""
+
+from collections import defaultdict
+from typing import Any, Iterable
+import faiss
+import numpy as np
+
+# Fields that are never used as filters and would only bloat the postings
+UNINDEXED_FIELDS = frozenset({"content"})
+
+# Filter values of these types are treated as set-membership filters
+MEMBERSHIP_TYPES = (list, tuple, set, frozenset)
+
+
+class MetadataIndex:
+    """Inverted index mapping metadata field/value pairs to vector ids."""
+
+    def __init__(self) -> None:
+        """Initialize metadata index."""
+        self._postings: dict[str, dict[Any, list[int]]] = defaultdict(lambda: defaultdict(list))
+        self._size = 0
+
+    def add(self, records: Iterable[dict[str, Any]], start_id: int) -> None:
+        """Index metadata records assigned consecutive ids from start_id."""
+        vector_id = start_id
+        for record in records:
+            for key, value in record.items():
+                if key in UNINDEXED_FIELDS or not _is_indexable(value):
+                    continue
+                self._postings[key][value].append(vector_id)
+            vector_id += 1
+
+        self._size = max(self._size, vector_id)
+
+    def match(self, filters: dict[str, Any]) -> np.ndarray:
+        """Get sorted ids matching all filters.
+
+        Scalar filter values match by equality, list/tuple/set values match
+        when the record's value is any of the given values.
+        """
+        matched: np.ndarray | None = None
+
+        for key, expected in filters.items():
+            values = expected if isinstance(expected, MEMBERSHIP_TYPES) else [expected]
+            postings = self._postings.get(key, {})
+
+            field_ids = [
+                np.asarray(postings[value], dtype=np.int64)
+                for value in values
+                if _is_indexable(value) and value in postings
+            ]
+            if not field_ids:
+                return np.empty(0, dtype=np.int64)
+
+            ids = np.unique(np.concatenate(field_ids))
+            matched = ids if matched is None else np.intersect1d(matched, ids, assume_unique=True)
+
+            if matched.size == 0:
+                break
+
+        if matched is None:
+            return np.arange(self._size, dtype=np.int64)
+        return matched
+
+    @staticmethod
+    def selector(ids: np.ndarray, ntotal: int) -> Any:
+        """Build a FAISS ID selector over matched ids.
+
+        The selector keeps a reference to its bitmap, so it stays valid as
+        long as it is alive.
+        """
+        bitmap = np.zeros(ntotal, dtype=bool)
+        bitmap[ids[ids < ntotal]] = True
+        packed = np.packbits(bitmap, bitorder="little")
+
+        selector = faiss.IDSelectorBitmap(ntotal, faiss.swig_ptr(packed))
+        selector.bitmap_ref = packed
+        return selector
+
+    @property
+    def fields(self) -> list[str]:
+        """Get indexed field names."""
+        return list(self._postings.keys())
+
+
+def _is_indexable(value: Any) -> bool:
+    """Check whether a metadata value can be used as a posting key."""
+    return value is None or isinstance(value, (str, int, float, bool))
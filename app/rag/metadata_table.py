@@ -0,0 +1,252 @@
+"""Compact columnar storage for vector metadata."""
+
+import bisect
+import json
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+import numpy as np
+from app.rag.records import write_atomic, write_npy
+
+# Null marker for integer columns
+INT_NULL = np.iinfo(np.int64).min
+
+# Null marker for dictionary-encoded columns
+CODE_NULL = -1
+
+VOCAB_SUFFIX = ".vocab.json"
+
+
+class MetadataTable(Sequence[dict[str, Any]]):
+    """Array-backed metadata records.
+
+    Integer fields (chunk_id, doc_id, page_number, ...) are int64 columns and
+    every other field is dictionary-encoded into int32 codes, so a row costs a
+    few bytes per field instead of a Python dict. Rows are materialized as
+    dicts only when accessed, and null fields are left out of them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty table."""
+        self._kinds: dict[str, str] = {}
+        self._vocabs: dict[str, list[Any]] = {}
+        self._codes: dict[str, dict[Any, int]] = {}
+        self._chunks: dict[str, list[np.ndarray]] = {}
+        self._ends: list[int] = []
+
+    def __len__(self) -> int:
+        """Get number of rows."""
+        return self._ends[-1] if self._ends else 0
+
+    @property
+    def columns(self) -> list[str]:
+        """Get column names."""
+        return list(self._kinds)
+
+    @property
+    def nbytes(self) -> int:
+        """Get bytes held by column arrays."""
+        return sum(chunk.nbytes for chunks in self._chunks.values() for chunk in chunks)
+
+    def copy(self) -> "MetadataTable":
+        """Copy the table structure, sharing its column arrays.
+
+        Extending the copy leaves this table untouched, which lets a writer
+        build the next version while readers use this one.
+        """
+        table = MetadataTable()
+        table._kinds = dict(self._kinds)
+        table._vocabs = {name: list(values) for name, values in self._vocabs.items()}
+        table._codes = {name: dict(codes) for name, codes in self._codes.items()}
+        table._chunks = {name: list(chunks) for name, chunks in self._chunks.items()}
+        table._ends = list(self._ends)
+        return table
+
+    def _add_column(self, name: str, kind: str) -> None:
+        """Add a column, null for all existing rows."""
+        self._kinds[name] = kind
+        self._chunks[name] = [_nulls(kind, self._chunk_size(i)) for i in range(len(self._ends))]
+        if kind == "enum":
+            self._vocabs[name] = []
+            self._codes[name] = {}
+
+    def _chunk_size(self, chunk: int) -> int:
+        """Get number of rows in a chunk."""
+        return self._ends[chunk] - (self._ends[chunk - 1] if chunk else 0)
+
+    def _encode(self, name: str, value: Any) -> int:
+        """Get the dictionary code of a value, adding it if new."""
+        codes = self._codes[name]
+        if value not in codes:
+            codes[value] = len(self._vocabs[name])
+            self._vocabs[name].append(value)
+        return codes[value]
+
+    def _to_enum(self, name: str) -> None:
+        """Convert an integer column to a dictionary-encoded one."""
+        chunks = self._chunks[name]
+        self._kinds[name] = "enum"
+        self._vocabs[name] = []
+        self._codes[name] = {}
+        self._chunks[name] = [
+            np.array(
+                [CODE_NULL if v == INT_NULL else self._encode(name, int(v)) for v in chunk],
+                dtype=np.int32,
+            )
+            for chunk in chunks
+        ]
+
+    def extend(self, records: Sequence[dict[str, Any]]) -> None:
+        """Append records as a new chunk of rows."""
+        if not records:
+            return
+
+        names = {key for record in records for key in record}
+        for name in sorted(names - set(self._kinds)):
+            values = [r.get(name) for r in records if r.get(name) is not None]
+            self._add_column(name, "int" if all(_is_int(v) for v in values) else "enum")
+
+        for name in names:
+            if self._kinds[name] == "int" and not all(
+                _is_int(r.get(name)) for r in records if r.get(name) is not None
+            ):
+                self._to_enum(name)
+
+        for name, kind in self._kinds.items():
+            if kind == "int":
+                column = np.array(
+                    [INT_NULL if r.get(name) is None else r[name] for r in records],
+                    dtype=np.int64,
+                )
+            else:
+                column = np.array(
+                    [
+                        CODE_NULL if r.get(name) is None else self._encode(name, r[name])
+                        for r in records
+                    ],
+                    dtype=np.int32,
+                )
+            self._chunks[name].append(column)
+
+        self._ends.append(len(self) + len(records))
+
+    def extend_table(self, other: "MetadataTable") -> None:
+        """Append all rows of another table, re-coding its dictionary columns."""
+        if len(other) == 0:
+            return
+
+        for name in other.columns:
+            if name not in self._kinds:
+                self._add_column(name, other._kinds[name])
+            elif self._kinds[name] == "int" and other._kinds[name] == "enum":
+                self._to_enum(name)
+
+        for i in range(len(other._ends)):
+            size = other._chunk_size(i)
+            for name, kind in self._kinds.items():
+                if name not in other._kinds:
+                    self._chunks[name].append(_nulls(kind, size))
+                    continue
+
+                chunk = other._chunks[name][i]
+                if kind == "enum" and other._kinds[name] == "int":
+                    chunk = np.array(
+                        [CODE_NULL if v == INT_NULL else self._encode(name, int(v)) for v in chunk],
+                        dtype=np.int32,
+                    )
+                elif kind == "enum":
+                    mapping = np.array(
+                        [self._encode(name, v) for v in other._vocabs[name]] + [CODE_NULL],
+                        dtype=np.int32,
+                    )
+                    # Identity mappings keep memory-mapped chunks shared
+                    if not np.array_equal(mapping[:-1], np.arange(len(mapping) - 1)):
+                        chunk = mapping[chunk]
+                self._chunks[name].append(chunk)
+
+            self._ends.append(len(self) + size)
+
+    def __getitem__(self, idx: int) -> dict[str, Any]:  # type: ignore[override]
+        """Materialize a row as a dict."""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("metadata row out of range")
+
+        chunk = bisect.bisect_right(self._ends, idx)
+        offset = idx - (self._ends[chunk - 1] if chunk else 0)
+
+        record: dict[str, Any] = {}
+        for name, kind in self._kinds.items():
+            value = self._chunks[name][chunk][offset]
+            if kind == "int":
+                if value != INT_NULL:
+                    record[name] = int(value)
+            elif value != CODE_NULL:
+                record[name] = self._vocabs[name][value]
+        return record
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Iterate over materialized rows."""
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def column(self, name: str) -> np.ndarray:
+        """Get a column as one array (ints, or codes for dictionary columns)."""
+        dtype = np.int64 if self._kinds.get(name, "int") == "int" else np.int32
+        if not self._chunks.get(name):
+            return np.empty(0, dtype=dtype)
+        return np.concatenate(self._chunks[name])
+
+    def save(self, path: Path) -> None:
+        """Write the table as a structured .npy array plus a vocabulary file."""
+        dtype = [
+            (name, np.int64 if kind == "int" else np.int32) for name, kind in self._kinds.items()
+        ]
+        rows = np.empty(len(self), dtype=dtype)
+        for name in self._kinds:
+            rows[name] = self.column(name)
+
+        vocab_path = vocab_file(path)
+        vocab = {
+            "kinds": self._kinds,
+            "vocabs": {name: values for name, values in self._vocabs.items()},
+        }
+        write_atomic(vocab_path, json.dumps(vocab).encode("utf-8"))
+
+        write_npy(path, rows)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "MetadataTable":
+        """Open a saved table, memory-mapping its columns by default."""
+        with open(vocab_file(path), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+
+        rows = np.load(path, mmap_mode="r" if mmap else None)
+
+        table = cls()
+        table._kinds = dict(vocab["kinds"])
+        for name, values in vocab["vocabs"].items():
+            table._vocabs[name] = values
+            table._codes[name] = {value: code for code, value in enumerate(values)}
+        for name in table._kinds:
+            table._chunks[name] = [rows[name]] if len(rows) else []
+        table._ends = [len(rows)] if len(rows) else []
+        return table
+
+
+def vocab_file(path: Path) -> Path:
+    """Get the vocabulary file belonging to a table file."""
+    return path.with_name(path.name.removesuffix(".npy") + VOCAB_SUFFIX)
+
+
+def _is_int(value: Any) -> bool:
+    """Check for a real integer (bools are encoded as categories)."""
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def _nulls(kind: str, size: int) -> np.ndarray:
+    """Build a null column chunk."""
+    if kind == "int":
+        return np.full(size, INT_NULL, dtype=np.int64)
+    return np.full(size, CODE_NULL, dtype=np.int32)
@@ -0,0 +1,103 @@
+"""Micro-batching of concurrent single-text embedding requests."""
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collect concurrent embedding requests into batched backend calls.
+
+    The first queued request opens a window of max_wait_ms; everything that
+    arrives within it, up to max_batch_size texts, is embedded with one
+    call and the vectors are handed back to each waiting caller. Up to
+    concurrency batches may be in flight while the next window fills.
+    """
+
+    def __init__(
+        self,
+        embed_batch: Callable[[list[str]], list[list[float]]],
+        max_wait_ms: float,
+        max_batch_size: int,
+        concurrency: int = 4,
+    ) -> None:
+        """Initialize with a function embedding a list of texts in order."""
+        self.embed_batch = embed_batch
+        self.max_wait_ms = max_wait_ms
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+
+        self._queue: deque[tuple[str, Future]] = deque()
+        self._condition = threading.Condition()
+        self._worker: threading.Thread | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="embed-batch"
+        )
+
+        self.requests = 0
+        self.batches = 0
+
+    def submit(self, text: str) -> list[float]:
+        """Embed a text as part of the next batch, blocking until it is done."""
+        future: Future = Future()
+        with self._condition:
+            self._queue.append((text, future))
+            self.requests += 1
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="embed-micro-batcher", daemon=True
+                )
+                self._worker.start()
+            self._condition.notify()
+        return future.result()
+
+    def _run(self) -> None:
+        """Cut batches from the queue and dispatch them."""
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+
+                deadline = time.monotonic() + self.max_wait_ms / 1000
+                while len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                batch = [
+                    self._queue.popleft() for _ in range(min(len(self._queue), self.max_batch_size))
+                ]
+                self.batches += 1
+
+            self._executor.submit(self._embed, batch)
+
+    def _embed(self, batch: list[tuple[str, Future]]) -> None:
+        """Embed a batch's distinct texts and resolve each request."""
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(texts, self.embed_batch(texts)))
+        except Exception as e:
+            logger.warning(f"Embedding micro-batch of {len(texts)} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for text, future in batch:
+            future.set_result(list(vectors[text]))
+
+    def stats(self) -> dict[str, Any]:
+        """Get request and batch counts."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+            "max_batch_size": self.max_batch_size,
+        }
@@ -0,0 +1,102 @@
+"""Embedding dimension reduction for tenant indexes."""
+
+import io
+from pathlib import Path
+import numpy as np
+from app.config import settings
+from app.rag.records import write_atomic
+
+PROJECTION_METHODS = ("truncate", "pca")
+
+
+def shorten(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """Keep the first dimensions of embeddings and re-normalize them.
+
+    text-embedding-3 models are trained so that a vector prefix is itself an
+    embedding; this matches requesting shorter output from the API.
+    """
+    shortened = np.ascontiguousarray(vectors[:, :dimension], dtype=np.float32)
+    norms = np.linalg.norm(shortened, axis=1, keepdims=True)
+    return shortened / np.maximum(norms, 1e-12)
+
+
+class Projection:
+    """Map from embedding model output to a tenant's smaller index dimension.
+
+    truncate shortens text-embedding-3 vectors; pca projects onto the top
+    principal components of the tenant's own vectors, for other models.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        input_dimension: int,
+        dimension: int,
+        mean: np.ndarray | None = None,
+        components: np.ndarray | None = None,
+    ) -> None:
+        """Initialize a projection; pca needs the fitted mean and components."""
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        if not 0 < dimension < input_dimension:
+            raise ValueError(f"Cannot project {input_dimension} dimensions to {dimension}")
+
+        self.method = method
+        self.input_dimension = input_dimension
+        self.dimension = dimension
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, method: str, vectors: np.ndarray, dimension: int) -> "Projection":
+        """Fit a projection to a sample of the vectors it will be applied to."""
+        input_dimension = vectors.shape[1]
+        if method != "pca":
+            return cls(method, input_dimension, dimension)
+
+        sample_size = min(len(vectors), settings.vector_train_sample)
+        sample = vectors[np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)]
+        mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - mean, full_matrices=False)
+        if len(vt) < dimension:
+            raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} vectors")
+        return cls(
+            method,
+            input_dimension,
+            dimension,
+            mean.astype(np.float32),
+            vt[:dimension].astype(np.float32),
+        )
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project vectors of the input dimension."""
+        if vectors.shape[1] != self.input_dimension:
+            raise ValueError(f"Expected dimension {self.input_dimension}, got {vectors.shape[1]}")
+        if self.method == "truncate":
+            return shorten(vectors, self.dimension)
+        return np.ascontiguousarray((vectors - self.mean) @ self.components.T, dtype=np.float32)
+
+    def save(self, path: Path) -> None:
+        """Write the projection atomically."""
+        buffer = io.BytesIO()
+        arrays = {"mean": self.mean, "components": self.components} if self.method == "pca" else {}
+        np.savez(
+            buffer,
+            method=np.array(self.method),
+            shape=np.array([self.input_dimension, self.dimension]),
+            **arrays,
+        )
+        write_atomic(path, buffer.getvalue())
+
+    @classmethod
+    def load(cls, path: Path) -> "Projection":
+        """Read a saved projection."""
+        with np.load(path) as data:
+            input_dimension, dimension = (int(x) for x in data["shape"])
+            return cls(
+                str(data["method"]),
+                input_dimension,
+                dimension,
+                data["mean"] if "mean" in data else None,
+                data["components"] if "components" in data else None,
+            )
@@ -0,0 +1,100 @@
+"""In-memory cache of query embeddings."""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings whose entries expire after a TTL.
+
+    Concurrent misses for the same query are coalesced: the first caller
+    computes the embedding and the others wait for its result, so a burst
+    of identical queries makes one API request.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._inflight: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._miss_seconds = 0.0
+        self._saved_seconds = 0.0
+
+    def get_or_compute(self, key: str, compute: Callable[[], list[float]]) -> list[float]:
+        """Get a cached embedding, computing it once on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._saved_seconds += self._mean_miss_seconds()
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            vector = future.result()
+            with self._lock:
+                self._saved_seconds += self._mean_miss_seconds()
+            return list(vector)
+
+        start = time.perf_counter()
+        try:
+            vector = compute()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._miss_seconds += time.perf_counter() - start
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(vector)
+        return list(vector)
+
+    def _mean_miss_seconds(self) -> float:
+        """Get the mean time a miss took, the latency a hit saves."""
+        return self._miss_seconds / self.misses if self.misses else 0.0
+
+    def clear(self) -> None:
+        """Drop all cached embeddings."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """Get cache size, hit rate and saved latency."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "mean_miss_ms": self._mean_miss_seconds() * 1000,
+                "saved_ms": self._saved_seconds * 1000,
+            }
@@ -0,0 +1,190 @@
+"""Memory-mappable metadata record files."""
+
+import bisect
+import json
+import mmap
+import os
+import pickle
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any
+import numpy as np
+
+# A record file is a blob of JSON-encoded values (.rec) plus an int64
+# offsets array (.off.npy) with one entry per value and a final end offset.
+# Chunk contents are stored this way; older segments stored whole metadata
+# records.
+RECORDS_SUFFIX = ".rec"
+OFFSETS_SUFFIX = ".off.npy"
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Write a file through a temp file and rename so readers never see it partial."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_records(path: Path, records: Sequence[Any]) -> None:
+    """Write JSON values to a .rec blob and offsets file, each atomically."""
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    tmp_path = path.with_name(path.name + ".tmp")
+
+    with open(tmp_path, "wb") as f:
+        position = 0
+        for i, record in enumerate(records):
+            data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            f.write(data)
+            position += len(data)
+            offsets[i + 1] = position
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    write_npy(offsets_file(path), offsets)
+
+
+def write_npy(path: Path, array: np.ndarray) -> None:
+    """Write a .npy array atomically."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def offsets_file(path: Path) -> Path:
+    """Get the offsets file belonging to a record file."""
+    return path.with_name(path.name[: -len(RECORDS_SUFFIX)] + OFFSETS_SUFFIX)
+
+
+def load_records(path: Path) -> Sequence[Any]:
+    """Open a record file, memory-mapped; legacy pickles are read in full."""
+    if path.suffix == ".pkl":
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return MappedRecords(path)
+
+
+class MappedRecords(Sequence[Any]):
+    """Read-only values decoded on access from a memory-mapped file.
+
+    Opening costs two mmaps regardless of size, and processes mapping the
+    same file share its pages through the OS page cache.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Map a record file."""
+        self.path = path
+        self._offsets = np.load(offsets_file(path), mmap_mode="r")
+
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        """Get number of values."""
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx: int) -> Any:  # type: ignore[override]
+        """Decode a single value."""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("record index out of range")
+
+        start, end = int(self._offsets[idx]), int(self._offsets[idx + 1])
+        return json.loads(self._data[start:end])
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over decoded values."""
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class RecordList(Sequence[Any]):
+    """Values from persisted segments followed by an appendable tail."""
+
+    def __init__(self, parts: list[Sequence[Any]] | None = None) -> None:
+        """Chain persisted value sequences."""
+        self._parts: list[Sequence[Any]] = []
+        self._ends: list[int] = []
+        self._tail: list[Any] = []
+        self._memory_bytes = 0
+
+        for part in parts or []:
+            self.add_part(part)
+
+    def add_part(self, part: Sequence[Any]) -> None:
+        """Append a sequence as a new part."""
+        if isinstance(part, list):
+            self._memory_bytes += _values_bytes(part)
+        elif isinstance(part, np.ndarray) and not isinstance(part, np.memmap):
+            self._memory_bytes += part.nbytes
+        self._parts.append(part)
+        self._ends.append((self._ends[-1] if self._ends else 0) + len(part))
+
+    def copy(self) -> "RecordList":
+        """Copy the list of parts, sharing the parts themselves.
+
+        Only the newest copy may be extended; the shared tail is append-only,
+        so older copies keep seeing their own length.
+        """
+        records = RecordList()
+        records._parts = list(self._parts)
+        records._ends = list(self._ends)
+        records._tail = self._tail
+        records._memory_bytes = self._memory_bytes
+        return records
+
+    def extend(self, records: Sequence[Any]) -> None:
+        """Append values to the in-memory tail."""
+        if not self._parts or self._parts[-1] is not self._tail:
+            self._tail = []
+            self.add_part(self._tail)
+
+        self._tail.extend(records)
+        self._memory_bytes += _values_bytes(records)
+        self._ends[-1] = (self._ends[-2] if len(self._ends) > 1 else 0) + len(self._tail)
+
+    def __len__(self) -> int:
+        """Get number of values."""
+        return self._ends[-1] if self._ends else 0
+
+    def __getitem__(self, idx: int) -> Any:  # type: ignore[override]
+        """Get a value by position."""
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("record index out of range")
+
+        part = bisect.bisect_right(self._ends, idx)
+        start = self._ends[part - 1] if part else 0
+        return self._parts[part][idx - start]
+
+    @property
+    def parts(self) -> list[Sequence[Any]]:
+        """Get the chained sequences, oldest first."""
+        return list(self._parts)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Get approximate bytes held in memory by tails and in-memory arrays.
+
+        Memory-mapped parts live in the OS page cache and are not counted.
+        """
+        return self._memory_bytes
+
+    def __iter__(self) -> Iterator[Any]:
+        """Iterate over all values."""
+        for part in self._parts:
+            yield from part
+
+
+def _values_bytes(values: Sequence[Any]) -> int:
+    """Approximate in-memory size of values (string length, or a flat guess)."""
+    return sum(len(value) if isinstance(value, str) else 64 for value in values)
@@ -0,0 +1,488 @@
+"""Append-only segment persistence for FAISS vector stores."""
+
+import json
+import logging
+import threading
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+import faiss
+import numpy as np
+from app.config import settings
+from app.rag.index_factory import (
+    build_index,
+    compression_of,
+    index_spec,
+    index_spec_of,
+    reconstruct_all,
+    select_index_type,
+)
+from app.rag.metadata_table import MetadataTable, vocab_file
+from app.rag.projection import Projection
+from app.rag.records import (
+    RecordList,
+    load_records,
+    offsets_file,
+    write_atomic,
+    write_npy,
+    write_records,
+)
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+# Pre-segment layout, adopted as the base segment on first load
+LEGACY_INDEX_FILE = "faiss.index"
+LEGACY_METADATA_FILE = "metadata.pkl"
+
+
+class SegmentStore:
+    """Manifest-tracked base and delta segments of a tenant index.
+
+    The base segment holds a full FAISS index. Each save appends a delta
+    segment with only the vectors added since the previous save, so a batch
+    of saves writes O(N) bytes. The manifest is rewritten atomically after
+    a segment's files are on disk, so a crash loses at most the segment
+    being written. Compaction folds deltas back into the base.
+
+    Each segment also has a columnar metadata table (.meta.npy) and a chunk
+    content side file (.rec), both memory-mapped on load.
+
+    Base segments of compressed indexes also keep their full-precision
+    vectors (.vec.npy), memory-mapped for exact re-scoring.
+
+    Deleted vectors are recorded as tombstones: a sorted array of positions
+    in the merged index, referenced from the manifest. Compaction keeps
+    positions stable; a renumbering checkpoint that drops deleted vectors
+    clears the tombstones and bumps the manifest epoch.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize segment store."""
+        self.path = path
+        self.manifest_file = path / MANIFEST_FILE
+        self._lock = threading.Lock()
+        self._compaction_thread: threading.Thread | None = None
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self) -> dict[str, Any]:
+        """Read the manifest, adopting legacy single-file indexes."""
+        if self.manifest_file.exists():
+            with open(self.manifest_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        manifest: dict[str, Any] = {"next_segment": 1, "segments": []}
+        if (self.path / LEGACY_INDEX_FILE).exists():
+            index = faiss.read_index(str(self.path / LEGACY_INDEX_FILE))
+            manifest["segments"].append({
+                "kind": "base",
+                "count": index.ntotal,
+                "index_file": LEGACY_INDEX_FILE,
+                "metadata_file": LEGACY_METADATA_FILE,
+            })
+            write_atomic(self.manifest_file, json.dumps(manifest, indent=2).encode("utf-8"))
+        return manifest
+
+    def _write_manifest(self, manifest: dict[str, Any]) -> None:
+        """Atomically replace the manifest."""
+        write_atomic(self.manifest_file, json.dumps(manifest, indent=2).encode("utf-8"))
+        self.manifest = manifest
+
+    def _next_name(self, manifest: dict[str, Any], kind: str) -> str:
+        """Allocate a segment file name prefix, must be called under the lock."""
+        number = manifest["next_segment"]
+        manifest["next_segment"] = number + 1
+        return f"{kind}-{number:06d}"
+
+    @property
+    def segments(self) -> list[dict[str, Any]]:
+        """Get segments in id order."""
+        return list(self.manifest["segments"])
+
+    @property
+    def count(self) -> int:
+        """Get number of persisted vectors."""
+        return sum(segment["count"] for segment in self.manifest["segments"])
+
+    @property
+    def compression(self) -> str:
+        """Get the tenant's vector codec, defaulting to the configured one."""
+        return self.manifest.get("compression", settings.vector_compression)
+
+    @property
+    def dimension(self) -> int | None:
+        """Get the vector dimension of the persisted index, if recorded."""
+        return self.manifest.get("dimension")
+
+    @property
+    def embedding_model(self) -> str | None:
+        """Get the embedding model the persisted vectors came from, if recorded."""
+        return self.manifest.get("embedding_model")
+
+    def load_projection(self) -> Projection | None:
+        """Load the projection from model output to the index dimension, if any."""
+        name = self.manifest.get("projection_file")
+        return Projection.load(self.path / name) if name else None
+
+    @property
+    def epoch(self) -> int:
+        """Get the number of renumbering checkpoints, which invalidate positions."""
+        return self.manifest.get("epoch", 0)
+
+    @property
+    def version(self) -> tuple[int, int]:
+        """Get the manifest file identity, which changes on every commit.
+
+        The manifest is replaced by rename, so its inode changes even when
+        the filesystem's mtime resolution is too coarse to notice.
+        """
+        try:
+            stat = self.manifest_file.stat()
+        except FileNotFoundError:
+            return (0, 0)
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def load(
+        self,
+        read_only: bool = False,
+    ) -> tuple[Any | None, MetadataTable, RecordList, RecordList | None]:
+        """Load all segments merged into one index, metadata table and contents.
+
+        In read-only mode the base index is opened with FAISS's mmap IO
+        flags. Metadata columns and chunk contents are always memory-mapped,
+        and contents are only decoded for the hits that are returned.
+
+        Also returns the full-precision vectors of a compressed index,
+        memory-mapped, or None if the index is uncompressed or a base
+        segment was written without them.
+        """
+        index = None
+        metadata = MetadataTable()
+        contents = RecordList()
+        vectors: RecordList | None = RecordList()
+        io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if read_only else 0
+
+        for segment in self.segments:
+            if segment["kind"] == "base":
+                index = faiss.read_index(str(self.path / segment["index_file"]), io_flags)
+                if "vectors_file" not in segment:
+                    vectors = None
+                elif vectors is not None:
+                    vectors.add_part(np.load(self.path / segment["vectors_file"], mmap_mode="r"))
+            else:
+                segment_vectors = np.load(self.path / segment["vectors_file"], mmap_mode="r")
+                if index is None:
+                    index = faiss.IndexFlatL2(segment_vectors.shape[1])
+                index.add(np.ascontiguousarray(segment_vectors))
+                if vectors is not None:
+                    vectors.add_part(segment_vectors)
+
+            table, segment_contents = self._load_metadata(segment)
+            metadata.extend_table(table)
+            contents.add_part(segment_contents)
+
+        if index is None or compression_of(index) == "none":
+            vectors = None
+        return index, metadata, contents, vectors
+
+    def load_tombstones(self) -> np.ndarray:
+        """Load the positions of deleted vectors."""
+        if "tombstones_file" not in self.manifest:
+            return np.empty(0, dtype=np.int64)
+        return np.load(self.path / self.manifest["tombstones_file"])
+
+    def _write_tombstones(
+        self, manifest: dict[str, Any], tombstones: np.ndarray | None
+    ) -> str | None:
+        """Write tombstones into the manifest being built, returning the replaced file."""
+        if tombstones is None:
+            return None
+
+        old_file = manifest.pop("tombstones_file", None)
+        if len(tombstones):
+            manifest["tombstones_file"] = f"{self._next_name(manifest, 'tombstones')}.npy"
+            write_npy(
+                self.path / manifest["tombstones_file"], np.asarray(tombstones, dtype=np.int64)
+            )
+        return old_file
+
+    def set_tombstones(self, tombstones: np.ndarray) -> None:
+        """Replace the recorded positions of deleted vectors."""
+        with self._lock:
+            manifest = json.loads(json.dumps(self.manifest))
+            old_file = self._write_tombstones(manifest, tombstones)
+            self._write_manifest(manifest)
+            if old_file:
+                (self.path / old_file).unlink(missing_ok=True)
+
+    def _load_metadata(self, segment: dict[str, Any]) -> tuple[MetadataTable, Sequence[str]]:
+        """Open a segment's metadata table and contents."""
+        if "content_file" in segment:
+            table = MetadataTable.load(self.path / segment["metadata_file"])
+            return table, load_records(self.path / segment["content_file"])
+
+        # Older segments kept content inside whole metadata records
+        records = load_records(self.path / segment["metadata_file"])
+        table = MetadataTable()
+        table.extend([{k: v for k, v in r.items() if k != "content"} for r in records])
+        return table, [r.get("content", "") for r in records]
+
+    def _write_metadata(
+        self,
+        segment: dict[str, Any],
+        name: str,
+        metadata: MetadataTable,
+        contents: Sequence[str],
+    ) -> None:
+        """Write a segment's metadata table and contents, recording their files."""
+        segment["metadata_file"] = f"{name}.meta.npy"
+        segment["content_file"] = f"{name}.rec"
+        metadata.save(self.path / segment["metadata_file"])
+        write_records(self.path / segment["content_file"], contents)
+
+    def append(
+        self,
+        vectors: np.ndarray,
+        metadata: MetadataTable,
+        contents: Sequence[str],
+        tombstones: np.ndarray | None = None,
+        embedding_model: str | None = None,
+    ) -> None:
+        """Persist vectors, metadata and contents as a new delta segment.
+
+        Given tombstones replace the recorded ones in the same manifest commit.
+        """
+        with self._lock:
+            manifest = json.loads(json.dumps(self.manifest))
+            name = self._next_name(manifest, "delta")
+
+            segment = {"kind": "delta", "count": len(vectors), "vectors_file": f"{name}.npy"}
+            write_npy(
+                self.path / segment["vectors_file"],
+                np.ascontiguousarray(vectors, dtype=np.float32),
+            )
+            self._write_metadata(segment, name, metadata, contents)
+            old_file = self._write_tombstones(manifest, tombstones)
+
+            manifest["segments"].append(segment)
+            manifest["dimension"] = int(vectors.shape[1])
+            if embedding_model is not None:
+                manifest["embedding_model"] = embedding_model
+            self._write_manifest(manifest)
+            if old_file:
+                (self.path / old_file).unlink(missing_ok=True)
+
+    def checkpoint(
+        self,
+        index: Any,
+        metadata: MetadataTable,
+        contents: Sequence[str],
+        tombstones: np.ndarray | None = None,
+        renumbered: bool = False,
+        vectors: np.ndarray | None = None,
+        compression: str | None = None,
+        projection: Projection | None = None,
+        embedding_model: str | None = None,
+    ) -> None:
+        """Replace all segments with a single base segment of the given state.
+
+        renumbered marks a state whose positions no longer match the old
+        segments (deleted vectors were dropped), which bumps the epoch.
+        vectors are the full-precision vectors of a compressed index, and
+        compression records the tenant's codec. A projection is recorded
+        when the index was reduced to fewer dimensions than the model emits.
+        embedding_model records the model the vectors came from.
+        """
+        with self._lock:
+            manifest = json.loads(json.dumps(self.manifest))
+            old_segments = manifest["segments"]
+            name = self._next_name(manifest, "base")
+            manifest["segments"] = [self._write_base(name, index, metadata, contents, vectors)]
+            manifest["dimension"] = int(index.d)
+            if compression is not None:
+                manifest["compression"] = compression
+            if embedding_model is not None:
+                manifest["embedding_model"] = embedding_model
+            old_projection = None
+            if projection is not None:
+                old_projection = manifest.get("projection_file")
+                manifest["projection_file"] = f"{self._next_name(manifest, 'projection')}.npz"
+                projection.save(self.path / manifest["projection_file"])
+            old_file = self._write_tombstones(
+                manifest,
+                np.empty(0, dtype=np.int64) if tombstones is None else tombstones,
+            )
+            if renumbered:
+                manifest["epoch"] = manifest.get("epoch", 0) + 1
+            self._write_manifest(manifest)
+            self._remove_files(old_segments)
+            for name in (old_file, old_projection):
+                if name:
+                    (self.path / name).unlink(missing_ok=True)
+
+    def _write_base(
+        self,
+        name: str,
+        index: Any,
+        metadata: MetadataTable,
+        contents: Sequence[str],
+        vectors: np.ndarray | None = None,
+    ) -> dict[str, Any]:
+        """Write a base segment and return its manifest entry."""
+        segment = {"kind": "base", "count": index.ntotal, "index_file": f"{name}.index"}
+        write_atomic(self.path / segment["index_file"], faiss.serialize_index(index).tobytes())
+        if vectors is not None and compression_of(index) != "none":
+            segment["vectors_file"] = f"{name}.vec.npy"
+            write_npy(
+                self.path / segment["vectors_file"], np.ascontiguousarray(vectors, dtype=np.float32)
+            )
+        self._write_metadata(segment, name, metadata, contents)
+        return segment
+
+    def _remove_files(self, segments: list[dict[str, Any]]) -> None:
+        """Delete the files of segments no longer in the manifest."""
+        for segment in segments:
+            for key in ("index_file", "vectors_file", "metadata_file", "content_file"):
+                if key not in segment:
+                    continue
+                path = self.path / segment[key]
+                path.unlink(missing_ok=True)
+                if path.name.endswith(".rec"):
+                    offsets_file(path).unlink(missing_ok=True)
+                if path.name.endswith(".meta.npy"):
+                    vocab_file(path).unlink(missing_ok=True)
+
+    def needs_compaction(self) -> bool:
+        """Check whether enough delta segments have accumulated."""
+        deltas = [s for s in self.manifest["segments"] if s["kind"] == "delta"]
+        return len(deltas) >= settings.vector_compaction_segments
+
+    def compact(self) -> None:
+        """Merge segments.
+
+        Deltas are merged into a single delta while they are small relative
+        to the base, and folded into a new base otherwise. Rewrites are thus
+        geometric in size, keeping total write volume close to linear.
+        """
+        with self._lock:
+            merged = list(self.manifest["segments"])
+            if len(merged) < 2:
+                return
+            # Reserve a segment number so concurrent appends never collide
+            number = self.manifest["next_segment"]
+            self.manifest["next_segment"] = number + 1
+
+        base = merged[0] if merged[0]["kind"] == "base" else None
+        deltas = merged[1:] if base else merged
+        delta_count = sum(s["count"] for s in deltas)
+
+        if (
+            base
+            and len(deltas) > 1
+            and delta_count < base["count"] * settings.vector_compaction_ratio
+        ):
+            merged = deltas
+            replacement = self._merge_deltas(f"delta-{number:06d}", deltas)
+        else:
+            replacement = self._merge_into_base(f"base-{number:06d}", base, deltas)
+
+        # Segments appended while merging stay after the replacement
+        with self._lock:
+            manifest = json.loads(json.dumps(self.manifest))
+            names = [s["metadata_file"] for s in manifest["segments"]]
+            merged_names = [s["metadata_file"] for s in merged]
+            start = names.index(merged_names[0]) if merged_names[0] in names else -1
+
+            if start < 0 or names[start:start + len(merged)] != merged_names:
+                # A checkpoint replaced the segments while we were merging
+                self._remove_files([replacement])
+                return
+
+            manifest["segments"][start:start + len(merged)] = [replacement]
+            self._write_manifest(manifest)
+            self._remove_files(merged)
+
+        logger.info(f"Compacted {len(merged)} segments in {self.path}")
+
+    def _merge_deltas(
+        self,
+        name: str,
+        deltas: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Concatenate delta segments into a single delta segment."""
+        vectors = np.vstack([np.load(self.path / s["vectors_file"]) for s in deltas])
+        metadata, contents = self._merge_metadata(deltas)
+
+        segment = {"kind": "delta", "count": len(vectors), "vectors_file": f"{name}.npy"}
+        write_npy(self.path / segment["vectors_file"], vectors)
+        self._write_metadata(segment, name, metadata, contents)
+        return segment
+
+    def _merge_into_base(
+        self,
+        name: str,
+        base: dict[str, Any] | None,
+        deltas: list[dict[str, Any]],
+    ) -> dict[str, Any]:
+        """Fold delta segments into a new base segment.
+
+        The index is rebuilt when its type or codec no longer fits the size.
+        """
+        index = faiss.read_index(str(self.path / base["index_file"])) if base else None
+        parts = []
+        if base and "vectors_file" in base:
+            parts.append(np.load(self.path / base["vectors_file"], mmap_mode="r"))
+        elif index is not None:
+            parts.append(reconstruct_all(index))
+
+        for segment in deltas:
+            vectors = np.load(self.path / segment["vectors_file"])
+            if index is None:
+                index = faiss.IndexFlatL2(vectors.shape[1])
+            index.add(vectors)
+            parts.append(vectors)
+
+        spec = index_spec(select_index_type(index.ntotal), self.compression, index.ntotal)
+        if index_spec_of(index) != spec:
+            index = build_index(spec[0], np.vstack(parts), index.d, spec[1])
+
+        metadata, contents = self._merge_metadata(([base] if base else []) + deltas)
+        return self._write_base(name, index, metadata, contents, np.vstack(parts))
+
+    def _merge_metadata(
+        self,
+        segments: list[dict[str, Any]],
+    ) -> tuple[MetadataTable, list[str]]:
+        """Concatenate the metadata and contents of segments."""
+        metadata = MetadataTable()
+        contents: list[str] = []
+        for segment in segments:
+            table, segment_contents = self._load_metadata(segment)
+            metadata.extend_table(table)
+            contents.extend(segment_contents)
+        return metadata, contents
+
+    def compact_in_background(self) -> None:
+        """Start compaction on a background thread unless one is running."""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+
+        self._compaction_thread = threading.Thread(
+            target=self._compact_safely,
+            name=f"compaction-{self.path.name}",
+            daemon=True,
+        )
+        self._compaction_thread.start()
+
+    def _compact_safely(self) -> None:
+        """Run compaction, logging instead of raising on the worker thread."""
+        try:
+            self.compact()
+        except Exception as e:
+            logger.error(f"Compaction failed for {self.path}: {e}", exc_info=True)
+
+    def wait_for_compaction(self) -> None:
+        """Block until any running background compaction finishes."""
+        if self._compaction_thread:
+            self._compaction_thread.join()
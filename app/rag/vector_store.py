@@ -1,48 +1,517 @@
 """FAISS vector store management."""
 
-import os
-import pickle
+import logging
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from typing import Any
 import faiss
 import numpy as np
 from app.config import settings
 from app.rag.embeddings import embedding_service
+from app.rag.index_factory import (
+    build_index,
+    compression_of,
+    index_memory_bytes,
+    index_spec,
+    index_spec_of,
+    index_type_of,
+    reconstruct_all,
+    rescore,
+    search_parameters,
+    select_index_type,
+)
+from app.rag.lexical_index import LEXICAL_FILE, LexicalIndex, reciprocal_rank_fusion
+from app.rag.metadata_index import MetadataIndex
+from app.rag.metadata_table import MetadataTable
+from app.rag.projection import Projection
+from app.rag.records import RecordList
+from app.rag.segments import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+# Suffix of the directory a replacement index is built in before swapping
+STAGING_SUFFIX = ".staging"
+MIGRATION_SUFFIX = ".migration"
+
+# The tail is merged into the base index once it reaches this fraction of it
+# (or vector_tail_vectors), so merge copies stay linear in total
+TAIL_MERGE_FRACTION = 0.125
+
+
+@dataclass
+class StoreSnapshot:
+    """Published state of a vector store that searches run against.
+
+    A published snapshot is never mutated. Writers build the next snapshot
+    and publish it with one reference assignment, so searches need no lock.
+    Vectors added since the base index was frozen are searched exactly from
+    the tail. The metadata and BM25 inverted indexes are append-only and
+    shared with later snapshots, so their ids are clipped to ntotal.
+
+    vectors holds the full-precision vectors when the index is compressed,
+    for re-scoring its candidates exactly; it is None otherwise.
+    """
+
+    index: Any
+    tail: np.ndarray
+    metadata: MetadataTable
+    contents: RecordList
+    deleted: frozenset[int] = frozenset()
+    vectors: RecordList | None = None
+    metadata_index: MetadataIndex | None = None
+    lexical_index: LexicalIndex | None = None
+    tombstones: np.ndarray = field(init=False)
+    live_ids: np.ndarray | None = field(init=False, default=None)
+
+    def __post_init__(self) -> None:
+        """Derive the sorted tombstone positions."""
+        self.tombstones = np.array(sorted(self.deleted), dtype=np.int64)
+
+    @property
+    def ntotal(self) -> int:
+        """Get number of vectors, deleted ones included."""
+        return self.index.ntotal + len(self.tail)
 
 
 class FAISSVectorStore:
-    """FAISS-based vector store."""
+    """FAISS-based vector store.
 
-    def __init__(self, tenant: str, dimension: int = 1536) -> None:
-        """Initialize FAISS vector store."""
+    Searches read the current snapshot without locking. Writes are
+    serialized by a lock and swap in a new snapshot when done, so a search
+    never sees metadata out of step with the index.
+    """
+
+    def __init__(
+        self,
+        tenant: str,
+        dimension: int | None = None,
+        read_only: bool | None = None,
+    ) -> None:
+        """Initialize FAISS vector store.
+
+        The dimension of an existing index is read from its manifest; new
+        indexes default to the embedding service's output dimension.
+
+        A read-only store memory-maps its index and metadata so worker
+        processes serving the same tenant share pages through the OS page
+        cache instead of each holding a private copy.
+        """
         self.tenant = tenant
-        self.dimension = dimension
+        self.read_only = settings.vector_read_only if read_only is None else read_only
         self.index_path = Path(settings.vector_dir) / tenant
         self.index_path.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.RLock()
 
-        self.index_file = self.index_path / "faiss.index"
-        self.metadata_file = self.index_path / "metadata.pkl"
-
-        # Initialize or load index
-        if self.index_file.exists():
-            self.index = faiss.read_index(str(self.index_file))
-            with open(self.metadata_file, "rb") as f:
-                self.metadata = pickle.load(f)
+        # Initialize or load index from its persisted segments
+        self.segments = SegmentStore(self.index_path)
+        self.version = self.segments.version
+        self.compression = self.segments.compression
+        self.projection = self.segments.load_projection()
+        index, metadata, contents, vectors = self.segments.load(read_only=self.read_only)
+        if index is not None:
+            self.dimension = self.segments.dimension or index.d
+            self.embedding_model = self.segments.embedding_model
         else:
-            self.index = faiss.IndexFlatL2(dimension)
-            self.metadata: list[dict[str, Any]] = []
+            self.dimension = dimension or embedding_service.dimension
+            self.embedding_model = embedding_service.backend.model_name
+            index = faiss.IndexFlatL2(self.dimension)
+
+        if self.embedding_model and self.embedding_model != embedding_service.backend.model_name:
+            logger.warning(
+                f"Vector store for tenant {tenant} holds {self.embedding_model} embeddings, "
+                f"not {embedding_service.backend.model_name}; run scripts/migrate_embeddings.py"
+            )
+
+        self._snapshot = StoreSnapshot(
+            index=index,
+            tail=np.empty((0, self.dimension), dtype=np.float32),
+            metadata=metadata,
+            contents=contents,
+            deleted=frozenset(self.segments.load_tombstones().tolist()),
+            vectors=vectors,
+        )
+
+        # Vectors added since the last save, written as the next delta segment
+        self._pending_vectors: list[np.ndarray] = []
+        self._pending_metadata: list[dict[str, Any]] = []
+        self._pending_contents: list[str] = []
+        self._needs_checkpoint = False
+        self._deleted_dirty = False
+        self._lexical_saved = 0
+
+    def _publish(self, snapshot: StoreSnapshot) -> None:
+        """Make a snapshot visible to searches."""
+        self._snapshot = snapshot
+
+    @property
+    def index(self) -> Any:
+        """Get a FAISS index of all vectors, folding in the tail if needed."""
+        snapshot = self._snapshot
+        if len(snapshot.tail) == 0:
+            return snapshot.index
+        return self._merged_index(snapshot)
+
+    @index.setter
+    def index(self, index: Any) -> None:
+        """Replace the index with one holding the same vectors, e.g. a new type or codec."""
+        with self._write_lock:
+            snapshot = self._snapshot
+            if index.ntotal != snapshot.ntotal:
+                raise ValueError(f"Index has {index.ntotal} vectors, store has {snapshot.ntotal}")
+            self._publish(replace(
+                snapshot,
+                index=index,
+                tail=snapshot.tail[:0],
+                vectors=self._originals_for(index, snapshot),
+            ))
+            self._needs_checkpoint = True
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Get all vectors, at full precision unless only compressed codes were kept."""
+        return self._all_vectors(self._snapshot)
+
+    @property
+    def metadata(self) -> MetadataTable:
+        """Get the metadata table."""
+        return self._snapshot.metadata
+
+    @property
+    def contents(self) -> RecordList:
+        """Get chunk contents."""
+        return self._snapshot.contents
+
+    def _all_vectors(self, snapshot: StoreSnapshot) -> np.ndarray:
+        """Get a snapshot's vectors at full precision where they are kept."""
+        if snapshot.vectors is not None:
+            return np.vstack(snapshot.vectors.parts)
+        return np.vstack([reconstruct_all(snapshot.index), snapshot.tail])
+
+    def _originals_for(self, index: Any, snapshot: StoreSnapshot) -> RecordList | None:
+        """Get the full-precision vectors to keep alongside a new index."""
+        if compression_of(index) == "none":
+            return None
+        if snapshot.vectors is not None:
+            return snapshot.vectors
+        return RecordList([self._all_vectors(snapshot)])
+
+    def _merged_index(self, snapshot: StoreSnapshot) -> Any:
+        """Copy a snapshot's base index and add its tail to the copy."""
+        index = faiss.clone_index(snapshot.index)
+        index.add(snapshot.tail)
+        return index
 
     def add_vectors(
         self,
         vectors: np.ndarray | list[list[float]],
         metadata: list[dict[str, Any]],
     ) -> None:
-        """Add vectors to the index."""
+        """Add vectors to the index.
+
+        Chunk content given under the "content" key is kept in the content
+        side store; the rest of each record goes to the metadata table.
+        The new vectors become searchable together with their metadata.
+        """
+        self._check_writable()
+
         if isinstance(vectors, list):
             vectors = np.array(vectors, dtype=np.float32)
+        vectors = self._to_index_dimension(np.ascontiguousarray(vectors, dtype=np.float32))
+
+        contents = [meta.get("content", "") for meta in metadata]
+        records = [{k: v for k, v in meta.items() if k != "content"} for meta in metadata]
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            start_id = snapshot.ntotal
+
+            lexical_index = self._lexical_index_for(snapshot)
+            lexical_index.add(contents, start_id=start_id)
+            if snapshot.metadata_index is not None:
+                snapshot.metadata_index.add(records, start_id=start_id)
+
+            table = snapshot.metadata.copy()
+            table.extend(records)
+            content_list = snapshot.contents.copy()
+            content_list.extend(contents)
+
+            originals = snapshot.vectors
+            if originals is not None:
+                originals = originals.copy()
+                originals.add_part(vectors)
+
+            index = snapshot.index
+            tail = np.vstack([snapshot.tail, vectors])
+            ntotal = index.ntotal + len(tail)
+
+            spec = index_spec(select_index_type(ntotal), self.compression, ntotal)
+            if spec != index_spec_of(index):
+                all_vectors = (
+                    np.vstack(originals.parts)
+                    if originals is not None
+                    else np.vstack([reconstruct_all(index), tail])
+                )
+                index = build_index(spec[0], all_vectors, self.dimension, spec[1])
+                originals = RecordList([all_vectors]) if spec[1] != "none" else None
+                tail = tail[:0]
+                self._needs_checkpoint = True
+            elif len(tail) >= max(settings.vector_tail_vectors, index.ntotal * TAIL_MERGE_FRACTION):
+                index = faiss.clone_index(index)
+                index.add(tail)
+                tail = tail[:0]
 
-        self.index.add(vectors)
-        self.metadata.extend(metadata)
+            self._publish(replace(
+                snapshot,
+                index=index,
+                tail=tail,
+                metadata=table,
+                contents=content_list,
+                lexical_index=lexical_index,
+                vectors=originals,
+            ))
+
+            self._pending_vectors.append(vectors)
+            self._pending_metadata.extend(records)
+            self._pending_contents.extend(contents)
+
+    def _to_index_dimension(self, vectors: np.ndarray) -> np.ndarray:
+        """Project embedding model output down to the index dimension if needed."""
+        if vectors.shape[1] == self.dimension:
+            return vectors
+        if self.projection is not None and vectors.shape[1] == self.projection.input_dimension:
+            return self.projection.apply(vectors)
+        raise ValueError(
+            f"Vectors have dimension {vectors.shape[1]} but the index for tenant "
+            f"{self.tenant} has {self.dimension}; re-project it with scripts/reproject_index.py"
+        )
+
+    def reproject(self, dimension: int, method: str = "truncate") -> Projection:
+        """Reduce the index to fewer dimensions and record the projection.
+
+        Stored vectors are projected and the index rebuilt at the new size.
+        Vectors and queries still at the model's full dimension are projected
+        on the way in, so ingestion and search keep working unchanged.
+        """
+        self._check_writable()
+        if self.projection is not None:
+            raise ValueError(
+                f"Index for tenant {self.tenant} is already projected, re-ingest to change it"
+            )
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            full_vectors = self._all_vectors(snapshot)
+            projection = Projection.fit(method, full_vectors, dimension)
+            vectors = projection.apply(full_vectors)
+
+            index_type, compression = index_spec(
+                select_index_type(snapshot.ntotal),
+                self.compression,
+                snapshot.ntotal,
+            )
+            index = build_index(index_type, vectors, dimension, compression)
+            self.segments.checkpoint(
+                index,
+                snapshot.metadata,
+                snapshot.contents,
+                snapshot.tombstones,
+                vectors=vectors,
+                compression=self.compression,
+                projection=projection,
+            )
+            self.version = self.segments.version
+            self.dimension = dimension
+            self.projection = projection
+            self._clear_pending()
+            self._deleted_dirty = False
+            self._needs_checkpoint = False
+
+            self._publish(replace(
+                snapshot,
+                index=index,
+                tail=np.empty((0, dimension), dtype=np.float32),
+                vectors=RecordList([vectors]) if compression != "none" else None,
+            ))
+            self._save_lexical(force=True)
+
+        logger.info(f"Re-projected tenant {self.tenant} index to {dimension} dimensions ({method})")
+        return projection
+
+    def rebuild_index(self, index_type: str | None = None) -> None:
+        """Rebuild the index, selecting the type automatically by default.
+
+        The index is built with the store's vector codec.
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            index_type, compression = index_spec(
+                index_type or select_index_type(snapshot.ntotal),
+                self.compression,
+                snapshot.ntotal,
+            )
+            vectors = self._all_vectors(snapshot)
+            index = build_index(index_type, vectors, self.dimension, compression)
+            self._publish(replace(
+                snapshot,
+                index=index,
+                tail=snapshot.tail[:0],
+                vectors=RecordList([vectors]) if compression != "none" else None,
+            ))
+            self._needs_checkpoint = True
+
+    def _check_writable(self) -> None:
+        """Raise if the store was opened in read-only serving mode."""
+        if self.read_only:
+            raise RuntimeError(f"Vector store for tenant {self.tenant} is read-only")
+
+    @property
+    def metadata_index(self) -> MetadataIndex:
+        """Get the metadata inverted index, building it on first use."""
+        return self._metadata_index_for(self._snapshot)
+
+    def _metadata_index_for(self, snapshot: StoreSnapshot) -> MetadataIndex:
+        """Get a snapshot's metadata inverted index, building it on first use."""
+        if snapshot.metadata_index is None:
+            metadata_index = MetadataIndex()
+            metadata_index.add(snapshot.metadata, start_id=0)
+            snapshot.metadata_index = metadata_index
+        return snapshot.metadata_index
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        """Get the BM25 index, loading it and indexing any newer contents."""
+        return self._lexical_index_for(self._snapshot)
+
+    def _lexical_index_for(self, snapshot: StoreSnapshot) -> LexicalIndex:
+        """Get a snapshot's BM25 index, loading it on first use."""
+        if snapshot.lexical_index is None:
+            path = self.index_path / LEXICAL_FILE
+            epoch = self.segments.epoch
+            contents = snapshot.contents
+            lexical_index = LexicalIndex.load(path) if path.exists() else LexicalIndex(epoch)
+            if lexical_index.count > len(contents) or lexical_index.epoch != epoch:
+                # Saved ahead of uncommitted segments, or before a purge renumbered ids
+                lexical_index = LexicalIndex(epoch)
+
+            self._lexical_saved = lexical_index.count
+            missing = [contents[i] for i in range(lexical_index.count, len(contents))]
+            lexical_index.add(missing, start_id=lexical_index.count)
+            snapshot.lexical_index = lexical_index
+        return snapshot.lexical_index
+
+    def _save_lexical(self, force: bool = False) -> None:
+        """Persist the BM25 index once it has grown by a tenth since last saved.
+
+        Contents that are not yet in the saved index are re-indexed on load,
+        so deferring the write only costs catch-up time, and rewrites stay
+        proportional to the total indexed.
+        """
+        lexical_index = self._snapshot.lexical_index
+        if lexical_index is None:
+            return
+
+        unsaved = lexical_index.count - self._lexical_saved
+        if force or unsaved * 10 >= lexical_index.count:
+            lexical_index.save(self.index_path / LEXICAL_FILE)
+            self._lexical_saved = lexical_index.count
+
+    def delete(self, filters: dict[str, Any]) -> int:
+        """Tombstone the vectors matching metadata filters, e.g. {"doc_id": 7}.
+
+        Deleted vectors are excluded from searches immediately and dropped
+        from the index once enough accumulate. Returns the number deleted.
+        """
+        self._check_writable()
+        if not filters:
+            raise ValueError("Refusing to delete without filters")
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            ids = self._metadata_index_for(snapshot).match(filters)
+            deleted = set(ids.tolist()) - snapshot.deleted
+            if deleted:
+                self._publish(replace(snapshot, deleted=snapshot.deleted | deleted))
+                self._deleted_dirty = True
+            return len(deleted)
+
+    def _allowed_ids(
+        self, snapshot: StoreSnapshot, filters: dict[str, Any] | None
+    ) -> np.ndarray | None:
+        """Get sorted ids a search may return, or None when all are allowed."""
+        if not filters and not snapshot.deleted:
+            return None
+
+        if not filters:
+            if snapshot.live_ids is None:
+                live = np.ones(snapshot.ntotal, dtype=bool)
+                live[snapshot.tombstones] = False
+                snapshot.live_ids = np.flatnonzero(live)
+            return snapshot.live_ids
+
+        ids = self._metadata_index_for(snapshot).match(filters)
+        # The inverted index may already hold ids of a newer snapshot
+        ids = ids[:np.searchsorted(ids, snapshot.ntotal)]
+        if snapshot.deleted:
+            ids = ids[~np.isin(ids, snapshot.tombstones, assume_unique=True)]
+        return ids
+
+    def purge(self) -> None:
+        """Drop deleted vectors, renumber the rest and write a new base segment."""
+        self._check_writable()
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            live = self._allowed_ids(snapshot, None)
+            if live is None:
+                return
+
+            vectors = self._all_vectors(snapshot)[live]
+            metadata = MetadataTable()
+            metadata.extend([snapshot.metadata[int(i)] for i in live])
+            contents = RecordList([[snapshot.contents[int(i)] for i in live]])
+            index_type, compression = index_spec(
+                select_index_type(len(live)), self.compression, len(live)
+            )
+            index = build_index(index_type, vectors, self.dimension, compression)
+
+            self.segments.checkpoint(
+                index,
+                metadata,
+                contents,
+                renumbered=True,
+                vectors=vectors,
+                compression=self.compression,
+            )
+            self.version = self.segments.version
+            self._clear_pending()
+            self._deleted_dirty = False
+
+            lexical_index = LexicalIndex(self.segments.epoch)
+            lexical_index.add(list(contents), start_id=0)
+            self._publish(StoreSnapshot(
+                index=index,
+                tail=snapshot.tail[:0],
+                metadata=metadata,
+                contents=contents,
+                lexical_index=lexical_index,
+                vectors=RecordList([vectors]) if compression != "none" else None,
+            ))
+            self._save_lexical(force=True)
+
+        logger.info(f"Purged deleted vectors for tenant {self.tenant}, {len(live)} remain")
+
+    def is_stale(self) -> bool:
+        """Check whether another process committed segments since loading."""
+        return self.segments.version != self.version
+
+    @property
+    def index_type(self) -> str:
+        """Get the type of the current index."""
+        return index_type_of(self._snapshot.index)
 
     def search(
         self,
@@ -50,65 +519,436 @@ class FAISSVectorStore:
         k: int | None = None,
         filters: dict[str, Any] | None = None,
     ) -> list[dict[str, Any]]:
-        """Search for similar vectors."""
+        """Search for similar vectors.
+
+        Filters are applied before the vector search through an ID selector,
+        so up to k matching results are returned however selective they are.
+        """
+        query_vectors = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+        return self.search_many(query_vectors, k=k, filters=filters)[0]
+
+    def search_many(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Search for several query vectors with one matrix search.
+
+        Returns one result list per query, in query order. Filters apply to
+        every query. A compressed index returns k * vector_rescore_factor
+        candidates, which are re-ranked by exact distance to their originals.
+        """
         k = k or settings.retrieval_top_k
+        query_vectors = np.asarray(query_vectors, dtype=np.float32)
+        if query_vectors.ndim == 1:
+            query_vectors = query_vectors.reshape(1, -1)
+        if len(query_vectors):
+            query_vectors = self._to_index_dimension(query_vectors)
 
-        if isinstance(query_vector, list):
-            query_vector = np.array([query_vector], dtype=np.float32)
-        elif len(query_vector.shape) == 1:
-            query_vector = query_vector.reshape(1, -1)
+        snapshot = self._snapshot
+        if snapshot.ntotal == 0 or len(query_vectors) == 0:
+            return [[] for _ in range(len(query_vectors))]
 
         # Search
-        distances, indices = self.index.search(query_vector, min(k * 2, self.index.ntotal))
+        ids = self._allowed_ids(snapshot, filters)
+        if ids is not None and ids.size == 0:
+            return [[] for _ in range(len(query_vectors))]
+        rescoring = snapshot.vectors is not None and settings.vector_rescore_factor > 1
+        fetch_k = k * settings.vector_rescore_factor if rescoring else k
+        distances, indices = self._search_snapshot(snapshot, query_vectors, fetch_k, ids)
+        if rescoring:
+            distances, indices = rescore(
+                query_vectors,
+                indices,
+                lambda candidates: np.vstack([snapshot.vectors[int(i)] for i in candidates]),
+                k,
+            )
+
+        # Collect results, loading content only for the final hits
+        hits = [
+            [
+                (int(idx), float(dist))
+                for dist, idx in zip(row_distances, row_indices)
+                if 0 <= idx < snapshot.ntotal
+            ]
+            for row_distances, row_indices in zip(distances, indices)
+        ]
+        contents = iter(self._get_contents(snapshot, [idx for row in hits for idx, _ in row]))
 
-        # Collect results
+        return [
+            [
+                {
+                    "id": idx,
+                    "content": next(contents),
+                    "metadata": snapshot.metadata[idx],
+                    "score": float(1 / (1 + dist)),  # Convert distance to similarity
+                }
+                for idx, dist in row
+            ]
+            for row in hits
+        ]
+
+    def lexical_search(
+        self,
+        query: str,
+        k: int | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search chunk contents by BM25, without embedding the query."""
+        k = k or settings.retrieval_top_k
+
+        snapshot = self._snapshot
+        allowed_ids = self._allowed_ids(snapshot, filters)
+        if allowed_ids is not None and allowed_ids.size == 0:
+            return []
+
+        lexical_index = self._lexical_index_for(snapshot)
+        scores, ids = lexical_index.search(query, k, allowed_ids, max_id=snapshot.ntotal)
+        contents = self._get_contents(snapshot, [int(idx) for idx in ids])
+
+        return [
+            {
+                "id": int(idx),
+                "content": content,
+                "metadata": snapshot.metadata[int(idx)],
+                "score": float(score),
+            }
+            for score, idx, content in zip(scores, ids, contents)
+        ]
+
+    def get_contents(self, ids: list[int]) -> list[str]:
+        """Fetch chunk contents for vector ids in one batch."""
+        return self._get_contents(self._snapshot, ids)
+
+    def _get_contents(self, snapshot: StoreSnapshot, ids: list[int]) -> list[str]:
+        """Fetch chunk contents from a snapshot."""
+        return [snapshot.contents[idx] for idx in ids]
+
+    def _search_snapshot(
+        self,
+        snapshot: StoreSnapshot,
+        query_vectors: np.ndarray,
+        k: int,
+        ids: np.ndarray | None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Search a snapshot's base index and tail, merging the top k."""
+        base_size = snapshot.index.ntotal
         results = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < 0 or idx >= len(self.metadata):
-                continue
 
-            meta = self.metadata[idx]
+        if ids is None:
+            if base_size:
+                results.append(snapshot.index.search(
+                    query_vectors,
+                    min(k, base_size),
+                    params=search_parameters(snapshot.index),
+                ))
+            tail_ids = np.arange(len(snapshot.tail))
+        else:
+            split = np.searchsorted(ids, base_size)
+            if split:
+                results.append(self._search_filtered(snapshot.index, query_vectors, k, ids[:split]))
+            tail_ids = ids[split:] - base_size
+
+        if tail_ids.size:
+            distances, positions = faiss.knn(
+                query_vectors, snapshot.tail[tail_ids], min(k, tail_ids.size)
+            )
+            results.append(
+                (distances, np.where(positions >= 0, tail_ids[positions] + base_size, -1))
+            )
 
-            # Apply filters
-            if filters:
-                if not all(meta.get(key) == value for key, value in filters.items()):
-                    continue
+        if len(results) == 1:
+            return results[0]
 
-            results.append({
-                "content": meta.get("content", ""),
-                "metadata": meta,
-                "score": float(1 / (1 + dist)),  # Convert distance to similarity
-            })
+        distances = np.hstack([d for d, _ in results])
+        indices = np.hstack([i for _, i in results])
+        distances = np.where(indices >= 0, distances, np.inf)
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        return distances, np.take_along_axis(indices, order, axis=1)
 
-            if len(results) >= k:
-                break
+    def _search_filtered(
+        self,
+        index: Any,
+        query_vectors: np.ndarray,
+        k: int,
+        ids: np.ndarray,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Search an index restricted to the given ids.
 
-        return results
+        Small subsets are scored exactly, since graph and IVF traversal lose
+        recall when most neighbours are filtered out.
+        """
+        k = min(k, int(ids.size))
+
+        if index_type_of(index) != "flat" and ids.size <= settings.vector_exact_filter_max:
+            subset = np.vstack([index.reconstruct(int(i)) for i in ids])
+            distances, positions = faiss.knn(query_vectors, subset, k)
+            return distances, np.where(positions >= 0, ids[positions], -1)
+
+        selector = MetadataIndex.selector(ids, index.ntotal)
+        return index.search(
+            query_vectors,
+            k,
+            params=search_parameters(index, selector=selector),
+        )
 
     def save(self) -> None:
-        """Save index and metadata to disk."""
-        faiss.write_index(self.index, str(self.index_file))
-        with open(self.metadata_file, "wb") as f:
-            pickle.dump(self.metadata, f)
+        """Save vectors added since the last save as a new delta segment.
+
+        A rebuilt index is written as a fresh base segment instead. Once
+        enough deltas accumulate they are compacted in the background.
+        Every file is written to a temp file and renamed into place, and the
+        manifest last, so readers in other processes never see partial state.
+        """
+        self._check_writable()
+
+        with self._write_lock:
+            if self._needs_checkpoint:
+                self.checkpoint()
+                return
+
+            snapshot = self._snapshot
+            tombstones = snapshot.tombstones if self._deleted_dirty else None
+            if self._pending_vectors:
+                metadata = MetadataTable()
+                metadata.extend(self._pending_metadata)
+                self.segments.append(
+                    np.vstack(self._pending_vectors),
+                    metadata,
+                    self._pending_contents,
+                    tombstones=tombstones,
+                    embedding_model=self.embedding_model,
+                )
+                self._clear_pending()
+            elif tombstones is not None:
+                self.segments.set_tombstones(tombstones)
+            self._deleted_dirty = False
+            self.version = self.segments.version
+
+            if len(snapshot.deleted) >= settings.vector_purge_ratio * snapshot.ntotal > 0:
+                self.purge()
+                return
+
+            self._save_lexical()
+
+        if self.segments.needs_compaction():
+            self.segments.compact_in_background()
+
+    def checkpoint(self) -> None:
+        """Write the whole index and metadata as a single base segment."""
+        self._check_writable()
+
+        with self._write_lock:
+            snapshot = self._snapshot
+            if len(snapshot.tail):
+                snapshot = replace(
+                    snapshot, index=self._merged_index(snapshot), tail=snapshot.tail[:0]
+                )
+                self._publish(snapshot)
+
+            self.segments.checkpoint(
+                snapshot.index,
+                snapshot.metadata,
+                snapshot.contents,
+                snapshot.tombstones,
+                vectors=np.vstack(snapshot.vectors.parts) if snapshot.vectors is not None else None,
+                compression=self.compression,
+                embedding_model=self.embedding_model,
+            )
+            self.version = self.segments.version
+            self._deleted_dirty = False
+            self._save_lexical(force=True)
+            self._clear_pending()
+            self._needs_checkpoint = False
+
+    def _clear_pending(self) -> None:
+        """Forget vectors that are now persisted."""
+        self._pending_vectors = []
+        self._pending_metadata = []
+        self._pending_contents = []
 
     @property
     def count(self) -> int:
-        """Get number of vectors in index."""
-        return self.index.ntotal
+        """Get number of live (not deleted) vectors in index."""
+        snapshot = self._snapshot
+        return snapshot.ntotal - len(snapshot.deleted)
+
+    @property
+    def has_unsaved_changes(self) -> bool:
+        """Check whether vectors were added or deleted since the last save."""
+        return bool(self._pending_vectors) or self._needs_checkpoint or self._deleted_dirty
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimate resident bytes: index structures plus metadata and content."""
+        snapshot = self._snapshot
+        return (
+            index_memory_bytes(snapshot.index)
+            + snapshot.tail.nbytes
+            + snapshot.metadata.nbytes
+            + snapshot.contents.memory_bytes
+            + (snapshot.vectors.memory_bytes if snapshot.vectors is not None else 0)
+        )
+
+    def stats(self) -> dict[str, Any]:
+        """Get size accounting for this store."""
+        snapshot = self._snapshot
+        return {
+            "tenant": self.tenant,
+            "vectors": snapshot.ntotal - len(snapshot.deleted),
+            "dimension": self.dimension,
+            "embedding_model": self.embedding_model,
+            "projection": self.projection.method if self.projection is not None else None,
+            "index_type": index_type_of(snapshot.index),
+            "compression": compression_of(snapshot.index),
+            "read_only": self.read_only,
+            "index_bytes": index_memory_bytes(snapshot.index) + snapshot.tail.nbytes,
+            "metadata_bytes": snapshot.metadata.nbytes,
+            "content_bytes": snapshot.contents.memory_bytes,
+            "memory_bytes": self.memory_bytes,
+            "segments": len(self.segments.segments),
+            "deleted": len(snapshot.deleted),
+        }
 
 
 class VectorStoreService:
-    """Service for managing vector stores per tenant."""
+    """Service for managing vector stores per tenant.
+
+    Loaded stores are kept within a memory budget. When loading a tenant
+    pushes the total over budget, idle stores are evicted by least recent
+    (lru) or least frequent (lfu) use and reloaded on their next request.
+    """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        memory_budget_bytes: int | None = None,
+        eviction_policy: str | None = None,
+    ) -> None:
         """Initialize vector store service."""
-        self._stores: dict[str, FAISSVectorStore] = {}
+        self.memory_budget_bytes = (
+            memory_budget_bytes
+            if memory_budget_bytes is not None
+            else settings.vector_memory_budget_mb * 1024 * 1024
+        )
+        self.eviction_policy = eviction_policy or settings.vector_eviction_policy
+
+        self._stores: OrderedDict[str, FAISSVectorStore] = OrderedDict()
+        self._hits: dict[str, int] = {}
+        self._last_access: dict[str, float] = {}
+        self._lock = threading.RLock()
+        self.evictions = 0
 
     def get_store(self, tenant: str) -> FAISSVectorStore:
-        """Get or create vector store for tenant."""
-        if tenant not in self._stores:
-            self._stores[tenant] = FAISSVectorStore(tenant)
-        return self._stores[tenant]
+        """Get or create vector store for tenant.
+
+        Read-only stores are reopened when the writer has committed new
+        segments, which only costs remapping the files.
+        """
+        with self._lock:
+            store = self._stores.get(tenant)
+            if store is None or (store.read_only and store.is_stale()):
+                store = FAISSVectorStore(tenant)
+                self._stores[tenant] = store
+
+            self._stores.move_to_end(tenant)
+            self._hits[tenant] = self._hits.get(tenant, 0) + 1
+            self._last_access[tenant] = time.time()
+
+            self._enforce_budget(keep=tenant)
+            return store
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Evict idle stores until the resident total fits the budget."""
+        if self.memory_budget_bytes <= 0:
+            return
+
+        while len(self._stores) > 1 and self.memory_bytes > self.memory_budget_bytes:
+            candidates = [tenant for tenant in self._stores if tenant != keep]
+            if self.eviction_policy == "lfu":
+                victim = min(candidates, key=lambda t: (self._hits.get(t, 0), self._last_access[t]))
+            else:
+                victim = candidates[0]
+            self.evict(victim)
+
+    def evict(self, tenant: str) -> bool:
+        """Drop a tenant's store from memory, saving unsaved vectors first."""
+        with self._lock:
+            store = self._stores.pop(tenant, None)
+            if store is None:
+                return False
+
+            if store.has_unsaved_changes:
+                store.save()
+
+            self._hits.pop(tenant, None)
+            self._last_access.pop(tenant, None)
+            self.evictions += 1
+            logger.info(f"Evicted vector store for tenant {tenant}")
+            return True
+
+    def create_staging_store(
+        self,
+        tenant: str,
+        dimension: int | None = None,
+        suffix: str = STAGING_SUFFIX,
+        resume: bool = False,
+    ) -> FAISSVectorStore:
+        """Create a store to build a replacement for a tenant's index in.
+
+        With resume, a staging store left by an interrupted build is
+        reopened instead of being cleared.
+        """
+        name = f"{tenant}{suffix}"
+        if not resume:
+            shutil.rmtree(Path(settings.vector_dir) / name, ignore_errors=True)
+        return FAISSVectorStore(name, dimension=dimension, read_only=False)
+
+    def swap_store(self, tenant: str, staging: FAISSVectorStore) -> None:
+        """Replace a tenant's persisted index with a checkpointed staging store.
+
+        The loaded store is dropped without saving and the tenant is
+        reloaded from the new files on its next request; read-only workers
+        see a new manifest and reopen.
+        """
+        if staging.has_unsaved_changes:
+            raise ValueError(f"Staging store for tenant {tenant} has unsaved changes")
+        staging.segments.wait_for_compaction()
+
+        target = Path(settings.vector_dir) / tenant
+        retired = target.with_name(f"{tenant}.retired")
+        with self._lock:
+            self._stores.pop(tenant, None)
+            self._hits.pop(tenant, None)
+            self._last_access.pop(tenant, None)
+
+            shutil.rmtree(retired, ignore_errors=True)
+            if target.exists():
+                target.rename(retired)
+            staging.index_path.rename(target)
+            shutil.rmtree(retired, ignore_errors=True)
+
+        logger.info(f"Swapped in rebuilt vector store for tenant {tenant}")
+
+    @property
+    def memory_bytes(self) -> int:
+        """Get estimated bytes held by all resident stores."""
+        return sum(store.memory_bytes for store in list(self._stores.values()))
+
+    def resident_stores(self) -> list[dict[str, Any]]:
+        """Describe resident stores, most recently used first."""
+        with self._lock:
+            stores = list(self._stores.items())
+
+        return [
+            {
+                **store.stats(),
+                "hits": self._hits.get(tenant, 0),
+                "last_access": self._last_access.get(tenant),
+            }
+            for tenant, store in reversed(stores)
+        ]
 
     def search(
         self,
@@ -117,11 +957,60 @@ class VectorStoreService:
         k: int | None = None,
         filters: dict[str, Any] | None = None,
     ) -> list[dict[str, Any]]:
-        """Search across tenant's vector store."""
+        """Search across tenant's vector store.
+
+        Filters map metadata fields to a value (equality) or to a list, tuple
+        or set of values (membership), e.g. {"doc_type": ["policy", "faq"]}.
+        """
         store = self.get_store(tenant)
         query_vector = embedding_service.embed_text(query)
         return store.search(query_vector, k=k, filters=filters)
 
+    def lexical_search(
+        self,
+        query: str,
+        tenant: str,
+        k: int | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search tenant's chunks by BM25 alone, skipping the embedding call."""
+        return self.get_store(tenant).lexical_search(query, k=k, filters=filters)
+
+    def hybrid_search(
+        self,
+        query: str,
+        tenant: str,
+        k: int | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Search by dense vectors and BM25, fusing both by reciprocal rank."""
+        k = k or settings.retrieval_top_k
+        candidates = max(k, settings.hybrid_candidates)
+
+        store = self.get_store(tenant)
+        query_vector = embedding_service.embed_text(query)
+        dense = store.search(query_vector, k=candidates, filters=filters)
+        lexical = store.lexical_search(query, k=candidates, filters=filters)
+        return reciprocal_rank_fusion([dense, lexical], k=k, rrf_k=settings.rrf_k)
+
+    def search_many(
+        self,
+        queries: list[str],
+        tenant: str,
+        k: int | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """Search several queries with one embedding request and one index search.
+
+        Returns one result list per query, in query order.
+        """
+        if not queries:
+            return []
+
+        store = self.get_store(tenant)
+        query_vectors = embedding_service.embed_texts(queries)
+        return store.search_many(query_vectors, k=k, filters=filters)
+
 
 # Global vector store service
 vector_store_service = VectorStoreService()
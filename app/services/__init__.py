@@ -1,11 +1,14 @@
 """Services module."""
 
 from app.services.ingestion import ingestion_service, IngestionService
+from app.services.ingest_jobs import ingest_job_runner, IngestJobRunner
 from app.services.prompts import prompt_service, PromptService
 
 __all__ = [
     "ingestion_service",
     "IngestionService",
+    "ingest_job_runner",
+    "IngestJobRunner",
     "prompt_service",
     "PromptService",
 ]
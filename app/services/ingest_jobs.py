@@ -0,0 +1,386 @@
+"""Background ingestion jobs on an in-process worker pool."""
+
+import logging
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Any, Generator
+from sqlalchemy.orm import Session, sessionmaker
+from app.config import settings
+from app.db import SessionLocal
+from app.models.database import IngestJob
+from app.services.ingestion import IngestProgress, ingestion_service
+
+logger = logging.getLogger(__name__)
+
+# Columns of a job as handed between the queue and the workers
+JOB_FIELDS = (
+    "id",
+    "tenant",
+    "status",
+    "request",
+    "progress",
+    "result",
+    "error",
+    "created_at",
+    "updated_at",
+    "finished_at",
+)
+
+# Minimum seconds between progress writes of a running job
+PROGRESS_INTERVAL = 1.0
+
+
+@contextmanager
+def session_scope(session_factory: sessionmaker) -> Generator[Session, None, None]:
+    """Open a session, committing on success and rolling back on error."""
+    db = session_factory()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class JobQueue(ABC):
+    """Queue of ingestion jobs and their state.
+
+    Jobs are dicts of the JOB_FIELDS. Workers claim queued jobs in
+    submission order and record progress and outcome on them.
+    """
+
+    @abstractmethod
+    def put(self, job: dict[str, Any]) -> None:
+        """Store a new job as queued."""
+
+    @abstractmethod
+    def claim(self) -> dict[str, Any] | None:
+        """Mark the oldest queued job running and return it, None when none are queued."""
+
+    @abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update a job's fields, marking it as updated now."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Get a job by id."""
+
+    @abstractmethod
+    def requeue_stale(self, before: datetime) -> int:
+        """Queue again running jobs last updated before a time, returning how many."""
+
+
+class MemoryJobQueue(JobQueue):
+    """Job queue held in memory; jobs are lost when the process stops."""
+
+    def __init__(self) -> None:
+        """Initialize an empty queue."""
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._queued: deque[str] = deque()
+        self._lock = threading.Lock()
+
+    def put(self, job: dict[str, Any]) -> None:
+        """Store a new job as queued."""
+        now = datetime.utcnow()
+        with self._lock:
+            self._jobs[job["id"]] = {
+                **dict.fromkeys(JOB_FIELDS),
+                **job,
+                "status": "queued",
+                "created_at": now,
+                "updated_at": now,
+            }
+            self._queued.append(job["id"])
+
+    def claim(self) -> dict[str, Any] | None:
+        """Mark the oldest queued job running and return it, None when none are queued."""
+        with self._lock:
+            if not self._queued:
+                return None
+            job = self._jobs[self._queued.popleft()]
+            job.update(status="running", updated_at=datetime.utcnow())
+            return dict(job)
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update a job's fields, marking it as updated now."""
+        with self._lock:
+            self._jobs[job_id].update(fields, updated_at=datetime.utcnow())
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Get a job by id."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def requeue_stale(self, before: datetime) -> int:
+        """Queue again running jobs last updated before a time, returning how many."""
+        with self._lock:
+            stale = [
+                job
+                for job in self._jobs.values()
+                if job["status"] == "running" and job["updated_at"] < before
+            ]
+            for job in stale:
+                job["status"] = "queued"
+                self._queued.append(job["id"])
+            return len(stale)
+
+
+class DatabaseJobQueue(JobQueue):
+    """Job queue in the ingest_jobs table.
+
+    Jobs survive restarts, and API processes sharing the database share
+    the queue: a job is claimed with a conditional update, so only one
+    worker of any process runs it.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal) -> None:
+        """Initialize with the session factory of the database holding the jobs."""
+        self.session_factory = session_factory
+
+    def put(self, job: dict[str, Any]) -> None:
+        """Store a new job as queued."""
+        with session_scope(self.session_factory) as db:
+            db.add(IngestJob(**{**job, "status": "queued"}))
+
+    def claim(self) -> dict[str, Any] | None:
+        """Mark the oldest queued job running and return it, None when none are queued."""
+        with session_scope(self.session_factory) as db:
+            while True:
+                job_id = (
+                    db.query(IngestJob.id)
+                    .filter(IngestJob.status == "queued")
+                    .order_by(IngestJob.created_at, IngestJob.id)
+                    .limit(1)
+                    .scalar()
+                )
+                if job_id is None:
+                    return None
+                # Another worker may claim the same job first
+                claimed = (
+                    db.query(IngestJob)
+                    .filter(IngestJob.id == job_id, IngestJob.status == "queued")
+                    .update(
+                        {"status": "running", "updated_at": datetime.utcnow()},
+                        synchronize_session=False,
+                    )
+                )
+                if claimed:
+                    return self._as_dict(db.get(IngestJob, job_id))
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Update a job's fields, marking it as updated now."""
+        with session_scope(self.session_factory) as db:
+            db.query(IngestJob).filter(IngestJob.id == job_id).update(
+                {**fields, "updated_at": datetime.utcnow()}, synchronize_session=False
+            )
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        """Get a job by id."""
+        with session_scope(self.session_factory) as db:
+            job = db.get(IngestJob, job_id)
+            return self._as_dict(job) if job else None
+
+    def requeue_stale(self, before: datetime) -> int:
+        """Queue again running jobs last updated before a time, returning how many."""
+        with session_scope(self.session_factory) as db:
+            return (
+                db.query(IngestJob)
+                .filter(IngestJob.status == "running", IngestJob.updated_at < before)
+                .update({"status": "queued"}, synchronize_session=False)
+            )
+
+    def _as_dict(self, job: IngestJob) -> dict[str, Any]:
+        """Convert a job row to a dict."""
+        return {name: getattr(job, name) for name in JOB_FIELDS}
+
+
+def create_job_queue(name: str | None = None) -> JobQueue:
+    """Create the job queue selected by name or settings."""
+    name = name or settings.ingest_job_queue
+    if name == "database":
+        return DatabaseJobQueue()
+    if name == "memory":
+        return MemoryJobQueue()
+    raise ValueError(f"Unknown ingestion job queue: {name}")
+
+
+class IngestJobRunner:
+    """Run queued ingestion jobs on a pool of worker threads.
+
+    Workers start with the first submitted job, or at app startup. Idle
+    workers check the queue every ingest_job_poll_seconds, so jobs queued
+    by other processes sharing a database queue are picked up too, and
+    requeue running jobs that have not reported progress for
+    ingest_job_stale_seconds, as left by a stopped process. Jobs of the
+    same tenant run one at a time.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue | None = None,
+        session_factory: sessionmaker = SessionLocal,
+        workers: int | None = None,
+    ) -> None:
+        """Initialize runner; queue defaults to the one selected by settings."""
+        self.queue = queue or create_job_queue()
+        self.session_factory = session_factory
+        self.workers = settings.ingest_job_workers if workers is None else workers
+
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._condition = threading.Condition()
+        self._stopping = threading.Event()
+        self._tenant_locks: dict[str, threading.Lock] = {}
+
+    def submit(
+        self,
+        job_id: str,
+        tenant: str,
+        file_paths: list[str],
+        source_paths: list[str] | None = None,
+        metadata: dict[str, Any] | None = None,
+        prune: bool = False,
+        upload_dir: str | None = None,
+    ) -> dict[str, Any]:
+        """Queue files for ingestion, returning the job.
+
+        upload_dir, if given, is deleted once the job has finished.
+        """
+        self.queue.put(
+            {
+                "id": job_id,
+                "tenant": tenant,
+                "request": {
+                    "file_paths": file_paths,
+                    "source_paths": source_paths,
+                    "metadata": metadata,
+                    "prune": prune,
+                    "upload_dir": upload_dir,
+                },
+                "progress": IngestProgress(files=len(file_paths)).counts(),
+            }
+        )
+        self.start()
+        with self._condition:
+            self._condition.notify()
+        logger.info(f"Queued ingestion job {job_id} of {len(file_paths)} files for {tenant}")
+        return self.queue.get(job_id)
+
+    def start(self) -> None:
+        """Start the worker threads, unless running or disabled."""
+        with self._lock:
+            if self._threads or self.workers == 0:
+                return
+            self._stopping.clear()
+            self._threads = [
+                threading.Thread(target=self._work, name=f"ingest-job-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the workers once their current jobs finish, waiting up to timeout."""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stopping.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+    def _work(self) -> None:
+        """Claim and run queued jobs until stopped."""
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.claim()
+                if job is None:
+                    stale = datetime.utcnow() - timedelta(seconds=settings.ingest_job_stale_seconds)
+                    requeued = self.queue.requeue_stale(stale)
+                    if requeued:
+                        logger.warning(f"Requeued {requeued} stale ingestion jobs")
+                        continue
+            except Exception as e:
+                logger.warning(f"Failed to read ingestion job queue: {e}")
+                job = None
+
+            if job is None:
+                with self._condition:
+                    self._condition.wait(settings.ingest_job_poll_seconds)
+            else:
+                self._run(job)
+
+    def _tenant_lock(self, tenant: str) -> threading.Lock:
+        """Get the lock serializing a tenant's jobs."""
+        with self._lock:
+            return self._tenant_locks.setdefault(tenant, threading.Lock())
+
+    def _run(self, job: dict[str, Any]) -> None:
+        """Run a claimed job, recording its progress and outcome."""
+        job_id = job["id"]
+        request = job["request"]
+        last_report = 0.0
+
+        def report(progress: IngestProgress) -> None:
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                self.queue.update(job_id, progress=progress.counts())
+
+        progress = IngestProgress(on_update=report)
+        try:
+            tenant_lock = self._tenant_lock(job["tenant"])
+            # Keep the job from looking stale while another of the tenant's runs
+            while not tenant_lock.acquire(timeout=settings.ingest_job_poll_seconds):
+                self.queue.update(job_id)
+            try:
+                logger.info(f"Running ingestion job {job_id} for {job['tenant']}")
+                with session_scope(self.session_factory) as db:
+                    result = ingestion_service.ingest_documents(
+                        file_paths=request["file_paths"],
+                        tenant=job["tenant"],
+                        db=db,
+                        metadata=request.get("metadata"),
+                        source_paths=request.get("source_paths"),
+                        prune=request.get("prune", False),
+                        progress=progress,
+                    )
+            finally:
+                tenant_lock.release()
+
+            self.queue.update(
+                job_id,
+                status="completed",
+                progress=progress.counts(),
+                result=asdict(result),
+                finished_at=datetime.utcnow(),
+            )
+            logger.info(f"Ingestion job {job_id} completed")
+
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {e}", exc_info=True)
+            self.queue.update(
+                job_id,
+                status="failed",
+                progress=progress.counts(),
+                error=str(e),
+                finished_at=datetime.utcnow(),
+            )
+
+        finally:
+            if request.get("upload_dir"):
+                shutil.rmtree(request["upload_dir"], ignore_errors=True)
+
+
+# Global ingestion job runner
+ingest_job_runner = IngestJobRunner()
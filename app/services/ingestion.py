@@ -1,37 +1,139 @@
 """Document ingestion service."""
 
+import hashlib
+import logging
+import multiprocessing
 import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 import docx2txt
 from pypdf import PdfReader
 from sqlalchemy.orm import Session
+from app.db import bulk_insert
 from app.models.database import KbDoc, KbChunk
 from app.rag import chunking_service, embedding_service, vector_store_service
+from app.rag.dedup import FingerprintIndex, simhash
+from app.rag.embedding_cache import text_hash
+from app.rag.embeddings import decode_embeddings, encode_embedding
+from app.rag.vector_store import MIGRATION_SUFFIX, FAISSVectorStore
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Document fields that ingestion metadata may set
+DOC_FIELDS = ("doc_type", "department", "country", "version")
+
+
+@dataclass
+class IngestionResult:
+    """Outcome of ingesting a batch of files.
+
+    docs counts documents added or updated, and chunks the new chunks
+    stored for them.
+    """
+
+    docs: int
+    chunks: int
+    index_path: str
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0
+    chunks_unchanged: int = 0
+    chunks_removed: int = 0
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class IngestProgress:
+    """Running counts of an ingestion, passed to on_update as they change.
+
+    files is the number of files to ingest and files_done those finished,
+    whether ingested, skipped as unchanged or failed. pages and chunks
+    count what has been extracted, embedded the chunks sent to the
+    embedding model and indexed the chunk rows stored.
+    """
+
+    files: int = 0
+    files_done: int = 0
+    pages: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    indexed: int = 0
+    on_update: Callable[["IngestProgress"], None] | None = field(default=None, repr=False)
+
+    def add(self, **counts: int) -> None:
+        """Add to counts and report the change."""
+        for name, count in counts.items():
+            setattr(self, name, getattr(self, name) + count)
+        if self.on_update is not None:
+            self.on_update(self)
+
+    def counts(self) -> dict[str, int]:
+        """Get the counts by name."""
+        return {
+            "files": self.files,
+            "files_done": self.files_done,
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "embedded": self.embedded,
+            "indexed": self.indexed,
+        }
+
+    def count_extracted(self, chunks: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        """Pass a file's chunks through, counting them and the pages they start."""
+        last_page: Any = object()
+        for chunk in chunks:
+            page_started = chunk["page_number"] != last_page
+            last_page = chunk["page_number"]
+            self.add(pages=int(page_started), chunks=1)
+            yield chunk
+
+
+def file_hash(file_path: str) -> str:
+    """Hash a file's bytes."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class IngestionService:
     """Service for ingesting documents into knowledge base."""
 
     def __init__(self) -> None:
         """Initialize ingestion service."""
-        pass
+        # Per tenant: fingerprints of canonical chunks and the last chunk id loaded
+        self._fingerprints: dict[str, tuple[FingerprintIndex, int]] = {}
+        self._fingerprint_lock = threading.Lock()
 
     def extract_text_from_pdf(self, file_path: str) -> list[dict[str, Any]]:
         """Extract text from PDF file."""
+        return list(self.iter_pdf_pages(file_path))
+
+    def iter_pdf_pages(
+        self,
+        file_path: str,
+        start_page: int = 0,
+        end_page: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Extract text from a PDF file one page at a time, optionally a range of pages."""
         reader = PdfReader(file_path)
-        pages = []
+        end_page = len(reader.pages) if end_page is None else min(end_page, len(reader.pages))
 
-        for page_num, page in enumerate(reader.pages, start=1):
-            text = page.extract_text()
+        for page_num in range(start_page + 1, end_page + 1):
+            text = reader.pages[page_num - 1].extract_text()
             if text.strip():
-                pages.append({
+                yield {
                     "content": text,
                     "page_number": page_num,
-                })
-
-        return pages
+                }
 
     def extract_text_from_docx(self, file_path: str) -> list[dict[str, Any]]:
         """Extract text from DOCX file."""
@@ -52,25 +154,78 @@ class IngestionService:
 
     def extract_text(self, file_path: str) -> list[dict[str, Any]]:
         """Extract text based on file extension."""
+        return list(self.iter_pages(file_path))
+
+    def iter_pages(
+        self,
+        file_path: str,
+        start_page: int = 0,
+        end_page: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Extract text based on file extension, yielding pages as they are read.
+
+        A page range applies to PDFs; other formats are read whole.
+        """
         ext = Path(file_path).suffix.lower()
 
         if ext == ".pdf":
-            return self.extract_text_from_pdf(file_path)
+            return self.iter_pdf_pages(file_path, start_page, end_page)
         elif ext in [".docx", ".doc"]:
-            return self.extract_text_from_docx(file_path)
+            return iter(self.extract_text_from_docx(file_path))
         elif ext in [".md", ".markdown", ".txt"]:
-            return self.extract_text_from_markdown(file_path)
+            return iter(self.extract_text_from_markdown(file_path))
         else:
             raise ValueError(f"Unsupported file type: {ext}")
 
+    def iter_chunks(
+        self,
+        file_path: str,
+        start_page: int = 0,
+        end_page: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Extract and chunk a file page by page, yielding chunk content and position."""
+        for page in self.iter_pages(file_path, start_page, end_page):
+            for chunk in chunking_service.chunk_text(page["content"]):
+                yield {
+                    "content": chunk["content"],
+                    "chunk_index": chunk["chunk_index"],
+                    "page_number": page.get("page_number"),
+                }
+
+    def _page_ranges(self, file_path: str) -> list[tuple[int, int | None]]:
+        """Split a large PDF into page ranges of ingest_pages_per_task to extract in parallel."""
+        if Path(file_path).suffix.lower() != ".pdf":
+            return [(0, None)]
+        try:
+            page_count = len(PdfReader(file_path).pages)
+        except Exception:
+            # Left for the worker to fail on and report
+            return [(0, None)]
+
+        step = max(1, settings.ingest_pages_per_task)
+        return [(start, start + step) for start in range(0, max(page_count, 1), step)]
+
     def ingest_document(
         self,
         file_path: str,
         tenant: str,
         db: Session,
         metadata: dict[str, Any] | None = None,
-    ) -> tuple[KbDoc, list[KbChunk]]:
-        """Ingest a single document."""
+        chunks: Iterable[dict[str, Any]] | None = None,
+        source_path: str | None = None,
+        progress: IngestProgress | None = None,
+    ) -> tuple[KbDoc, int]:
+        """Ingest a single document, returning it with its chunk count.
+
+        Each batch of chunks is saved to the vector store as soon as it is
+        indexed, so the start of a long document is searchable while the
+        rest is still being processed. Chunks already extracted from the
+        file may be passed in. If ingestion fails, the document's rows and
+        vectors are removed before the error is raised.
+
+        source_path identifies the document across re-ingestions and
+        defaults to the file path.
+        """
         metadata = metadata or {}
 
         filename = os.path.basename(file_path)
@@ -84,60 +239,575 @@ class IngestionService:
             department=metadata.get("department"),
             country=metadata.get("country"),
             version=metadata.get("version"),
+            source_path=source_path or file_path,
+            content_hash=file_hash(file_path),
         )
         db.add(kb_doc)
         db.flush()
 
-        # Extract text
-        pages = self.extract_text(file_path)
-
-        # Chunk all pages
-        all_chunks = []
-        chunk_records = []
-
-        for page in pages:
-            page_metadata = {
-                "tenant": tenant,
-                "doc_id": kb_doc.id,
-                "filename": filename,
-                "page_number": page.get("page_number"),
-                "doc_type": metadata.get("doc_type", "general"),
-                "department": metadata.get("department"),
+        try:
+            chunk_count = self._index_document(
+                kb_doc, file_path, tenant, db, metadata, True, chunks, progress
+            )
+        except Exception:
+            db.query(KbChunk).filter(KbChunk.doc_id == kb_doc.id).delete(synchronize_session=False)
+            db.delete(kb_doc)
+            db.flush()
+            raise
+        vector_store_service.get_store(tenant).save()
+
+        return kb_doc, chunk_count
+
+    def _batch_chunks(
+        self,
+        kb_doc: KbDoc,
+        chunks: Iterable[dict[str, Any]],
+        file_path: str,
+        tenant: str,
+        db: Session,
+        metadata: dict[str, Any],
+    ) -> Iterator[list[dict[str, Any]]]:
+        """Attach document metadata to a file's chunks, yielding batches of ingest_batch_size.
+
+        With dedup_enabled, a chunk whose fingerprint is near a canonical
+        chunk of the tenant, or an earlier chunk of this file, is marked
+        with that chunk under "duplicate_of" and will not be embedded.
+        """
+        filename = os.path.basename(file_path)
+        tenant_index = self._fingerprint_index(tenant, db) if settings.dedup_enabled else None
+        file_index = FingerprintIndex(settings.dedup_max_distance)
+        batch: list[dict[str, Any]] = []
+
+        for chunk in chunks:
+            chunk = {
+                **chunk,
+                "fingerprint": simhash(chunk["content"]),
+                "metadata": {
+                    "tenant": tenant,
+                    "doc_id": kb_doc.id,
+                    "filename": filename,
+                    "page_number": chunk["page_number"],
+                    "doc_type": metadata.get("doc_type", "general"),
+                    "department": metadata.get("department"),
+                },
             }
+            if tenant_index is not None:
+                duplicate_of = file_index.find(chunk["fingerprint"])
+                if duplicate_of is None:
+                    duplicate_of = self._canonical_chunk(
+                        tenant_index.find(chunk["fingerprint"]), db
+                    )
+                if duplicate_of is None:
+                    file_index.add(chunk["fingerprint"], chunk)
+                else:
+                    chunk["duplicate_of"] = duplicate_of
 
-            chunks = chunking_service.chunk_text(page["content"], page_metadata)
+            batch.append(chunk)
+            if len(batch) >= settings.ingest_batch_size:
+                yield batch
+                batch = []
 
-            for chunk in chunks:
-                chunk_record = KbChunk(
-                    doc_id=kb_doc.id,
-                    content=chunk["content"],
-                    chunk_index=chunk["chunk_index"],
-                    page_number=page.get("page_number"),
-                    chunk_metadata=chunk["metadata"],
+        if batch:
+            yield batch
+
+    def _fingerprint_index(self, tenant: str, db: Session) -> FingerprintIndex:
+        """Get the fingerprints of a tenant's canonical chunks, loading any added since last use."""
+        with self._fingerprint_lock:
+            cached = self._fingerprints.get(tenant)
+            index, last_id = cached or (FingerprintIndex(settings.dedup_max_distance), 0)
+            rows = (
+                db.query(KbChunk.id, KbChunk.fingerprint)
+                .join(KbDoc, KbChunk.doc_id == KbDoc.id)
+                .filter(
+                    KbDoc.tenant == tenant,
+                    KbChunk.id > last_id,
+                    KbChunk.duplicate_of.is_(None),
+                    KbChunk.fingerprint.isnot(None),
                 )
-                db.add(chunk_record)
-                chunk_records.append(chunk_record)
-                all_chunks.append(chunk)
+                .order_by(KbChunk.id)
+            )
+            for chunk_id, fingerprint in rows:
+                index.add(fingerprint, chunk_id)
+                last_id = chunk_id
+            self._fingerprints[tenant] = (index, last_id)
+            return index
+
+    def _canonical_chunk(self, chunk_id: int | None, db: Session) -> int | None:
+        """Check that a matched chunk is still stored and canonical.
+
+        Another process may have deleted it since the fingerprints were loaded.
+        """
+        if chunk_id is None:
+            return None
+        row = (
+            db.query(KbChunk.id)
+            .filter(KbChunk.id == chunk_id, KbChunk.duplicate_of.is_(None))
+            .first()
+        )
+        return chunk_id if row else None
+
+    def _index_document(
+        self,
+        kb_doc: KbDoc,
+        file_path: str,
+        tenant: str,
+        db: Session,
+        metadata: dict[str, Any],
+        save_batches: bool = False,
+        chunks: Iterable[dict[str, Any]] | None = None,
+        progress: IngestProgress | None = None,
+    ) -> int:
+        """Stream a file through extraction, chunking, embedding and indexing under kb_doc.
+
+        Chunk batches are embedded in the background while earlier batches
+        are stored and indexed. Once ingest_max_inflight_batches are being
+        embedded, extraction waits for the oldest to finish, so memory stays
+        flat however long the document is. With save_batches, each batch is
+        saved to the vector store once indexed. If any batch fails, the
+        chunks already indexed are deleted again. Returns the chunk count.
+
+        Chunks are extracted from the file unless already extracted ones
+        are given. Near-duplicates of stored chunks are stored without
+        being embedded or indexed (see _batch_chunks). Embedded and stored
+        chunks are added to progress, if given.
+        """
+        if chunks is None:
+            chunks = self.iter_chunks(file_path)
+
+        vector_store = vector_store_service.get_store(tenant)
+        max_inflight = max(1, settings.ingest_max_inflight_batches)
+        inflight: deque[tuple[list[dict[str, Any]], Future]] = deque()
+        chunk_ids: list[int] = []
+
+        with ThreadPoolExecutor(
+            max_workers=max_inflight, thread_name_prefix="ingest-embed"
+        ) as executor:
+            try:
+                for batch in self._batch_chunks(kb_doc, chunks, file_path, tenant, db, metadata):
+                    texts = [chunk["content"] for chunk in batch if "duplicate_of" not in chunk]
+                    inflight.append((batch, executor.submit(embedding_service.embed_texts, texts)))
+                    if len(inflight) >= max_inflight:
+                        batch, embedded = inflight.popleft()
+                        chunk_ids += self._store_batch(
+                            kb_doc, batch, embedded.result(), vector_store, db, save_batches
+                        )
+                        self._report_batch(progress, batch)
+
+                while inflight:
+                    batch, embedded = inflight.popleft()
+                    chunk_ids += self._store_batch(
+                        kb_doc, batch, embedded.result(), vector_store, db, save_batches
+                    )
+                    self._report_batch(progress, batch)
+
+            except Exception:
+                for _, embedded in inflight:
+                    embedded.cancel()
+                if chunk_ids:
+                    vector_store.delete({"chunk_id": chunk_ids})
+                    if save_batches:
+                        vector_store.save()
+                raise
+
+        return len(chunk_ids)
+
+    def _report_batch(self, progress: IngestProgress | None, batch: list[dict[str, Any]]) -> None:
+        """Add a stored batch's embedded and stored chunks to progress."""
+        if progress is not None:
+            embedded = sum(1 for chunk in batch if "duplicate_of" not in chunk)
+            progress.add(embedded=embedded, indexed=len(batch))
+
+    def _store_batch(
+        self,
+        kb_doc: KbDoc,
+        chunks: list[dict[str, Any]],
+        embeddings: list[list[float]],
+        vector_store: FAISSVectorStore,
+        db: Session,
+        save: bool,
+    ) -> list[int]:
+        """Insert a batch of chunk rows with their embeddings and index their vectors.
+
+        embeddings cover the canonical chunks; duplicates are stored with a
+        reference to their canonical chunk and no vector. Rows are bulk
+        inserted without loading ORM instances, so the session does not grow
+        with the document. Returns the new chunk ids.
+        """
+        canonical = [chunk for chunk in chunks if "duplicate_of" not in chunk]
+        chunk_rows = [
+            {
+                **self._chunk_row(kb_doc, chunk),
+                # Kept on the chunk so the index can be rebuilt without re-embedding
+                "embedding": encode_embedding(embedding),
+            }
+            for chunk, embedding in zip(canonical, embeddings)
+        ]
+        chunk_ids = bulk_insert(db, KbChunk, chunk_rows)
+
+        # Later duplicates in this file refer to these chunks by their dicts
+        for chunk, chunk_id in zip(canonical, chunk_ids):
+            chunk["id"] = chunk_id
+
+        duplicate_rows = [
+            {
+                **self._chunk_row(kb_doc, chunk),
+                "duplicate_of": (
+                    chunk["duplicate_of"]
+                    if isinstance(chunk["duplicate_of"], int)
+                    else chunk["duplicate_of"]["id"]
+                ),
+            }
+            for chunk in chunks
+            if "duplicate_of" in chunk
+        ]
+        duplicate_ids = bulk_insert(db, KbChunk, duplicate_rows)
+
+        if chunk_rows:
+            vector_store.add_vectors(
+                embeddings,
+                [self._row_metadata(chunk_id, row) for chunk_id, row in zip(chunk_ids, chunk_rows)],
+            )
+            if save:
+                vector_store.save()
+
+        logger.info(
+            f"Indexed {len(chunk_rows)} chunks of {kb_doc.filename} "
+            f"({len(duplicate_rows)} duplicates)"
+        )
+        return chunk_ids + duplicate_ids
 
+    def _chunk_row(self, kb_doc: KbDoc, chunk: dict[str, Any]) -> dict[str, Any]:
+        """Build the KbChunk column values for a chunk of a document."""
+        return {
+            "doc_id": kb_doc.id,
+            "content": chunk["content"],
+            "chunk_index": chunk["chunk_index"],
+            "page_number": chunk["metadata"].get("page_number"),
+            "chunk_metadata": chunk["metadata"],
+            "fingerprint": chunk["fingerprint"],
+        }
+
+    def _promote_duplicates(
+        self, chunk_ids: list[int], tenant: str, db: Session, vector_store: FAISSVectorStore
+    ) -> int:
+        """Make duplicates of chunks about to be deleted canonical in their place.
+
+        For each deleted chunk with duplicates outside chunk_ids, the first
+        duplicate is embedded and indexed and the rest re-pointed to it.
+        Returns the number promoted.
+        """
+        if not chunk_ids:
+            return 0
+        orphans = (
+            db.query(KbChunk)
+            .filter(KbChunk.duplicate_of.in_(chunk_ids), KbChunk.id.notin_(chunk_ids))
+            .order_by(KbChunk.id)
+            .all()
+        )
+        if not orphans:
+            return 0
+
+        groups: dict[int, list[KbChunk]] = {}
+        for chunk_record in orphans:
+            groups.setdefault(chunk_record.duplicate_of, []).append(chunk_record)
+        promoted = [chunk_records[0] for chunk_records in groups.values()]
+
+        vectors = embedding_service.embed_texts([chunk_record.content for chunk_record in promoted])
+        for chunk_records, vector in zip(groups.values(), vectors):
+            canonical = chunk_records[0]
+            canonical.duplicate_of = None
+            canonical.embedding = encode_embedding(vector)
+            for chunk_record in chunk_records[1:]:
+                chunk_record.duplicate_of = canonical.id
         db.flush()
 
-        # Generate embeddings
-        chunk_texts = [c["content"] for c in all_chunks]
-        embeddings = embedding_service.embed_texts(chunk_texts)
+        vector_store.add_vectors(
+            vectors, [self._vector_metadata(chunk_record) for chunk_record in promoted]
+        )
+        self._fingerprints.pop(tenant, None)
+        return len(promoted)
+
+    def _vector_metadata(self, chunk_record: KbChunk) -> dict[str, Any]:
+        """Build the vector store record for a chunk."""
+        return self._row_metadata(
+            chunk_record.id,
+            {
+                "chunk_index": chunk_record.chunk_index,
+                "content": chunk_record.content,
+                "chunk_metadata": chunk_record.chunk_metadata,
+            },
+        )
+
+    def _row_metadata(self, chunk_id: int, row: dict[str, Any]) -> dict[str, Any]:
+        """Build the vector store record for a chunk from its KbChunk column values."""
+        meta = dict(row["chunk_metadata"] or {})
+        meta["chunk_id"] = chunk_id
+        meta["chunk_index"] = row["chunk_index"]
+        meta["content"] = row["content"]
+        return meta
+
+    def _iter_chunk_batches(
+        self,
+        tenant: str,
+        db: Session,
+        batch_size: int,
+        after_id: int = 0,
+    ) -> Iterator[list[KbChunk]]:
+        """Stream a tenant's canonical chunks with ids above after_id, batch_size rows per query."""
+        last_id = after_id
+        while True:
+            batch = (
+                db.query(KbChunk)
+                .join(KbDoc, KbChunk.doc_id == KbDoc.id)
+                .filter(
+                    KbDoc.tenant == tenant, KbChunk.id > last_id, KbChunk.duplicate_of.is_(None)
+                )
+                .order_by(KbChunk.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+            # Release rows already indexed, keeping memory to one batch
+            db.flush()
+            for chunk_record in batch:
+                db.expunge(chunk_record)
+
+    def rebuild_index(
+        self,
+        tenant: str,
+        db: Session,
+        index_type: str | None = None,
+        batch_size: int = 5000,
+    ) -> dict[str, int]:
+        """Rebuild a tenant's vector index from the embeddings stored on its chunks.
+
+        Chunks are streamed from the database into a staging index that
+        replaces the live one once complete, so no embedding API calls are
+        needed. Chunks stored without an embedding are embedded (through
+        the embedding cache) and backfilled. The tenant's vector codec and
+        dimension reduction are carried over. Returns chunk counts.
+        """
+        live = vector_store_service.get_store(tenant)
+        staging = None
+        indexed = 0
+        embedded = 0
+
+        for batch in self._iter_chunk_batches(tenant, db, batch_size):
+            missing = [chunk_record for chunk_record in batch if chunk_record.embedding is None]
+            if missing:
+                vectors = embedding_service.embed_texts(
+                    [chunk_record.content for chunk_record in missing]
+                )
+                for chunk_record, vector in zip(missing, vectors):
+                    chunk_record.embedding = encode_embedding(vector)
+                embedded += len(missing)
+
+            vectors = decode_embeddings([chunk_record.embedding for chunk_record in batch])
+            if staging is None:
+                staging = vector_store_service.create_staging_store(
+                    tenant, dimension=vectors.shape[1]
+                )
+                staging.compression = live.compression
+                staging.embedding_model = live.embedding_model
+            staging.add_vectors(
+                vectors, [self._vector_metadata(chunk_record) for chunk_record in batch]
+            )
+            indexed += len(batch)
+
+        if staging is None:
+            raise ValueError(f"No chunks stored for tenant {tenant}")
+
+        if live.projection is not None and staging.dimension != live.dimension:
+            staging.reproject(live.dimension, live.projection.method)
+        if index_type:
+            staging.rebuild_index(index_type)
+        staging.checkpoint()
+        vector_store_service.swap_store(tenant, staging)
+
+        logger.info(
+            f"Rebuilt index for tenant {tenant} from {indexed} chunks ({embedded} embedded)"
+        )
+        return {"chunks": indexed, "embedded": embedded}
+
+    def migrate_embeddings(
+        self,
+        tenant: str,
+        db: Session,
+        index_type: str | None = None,
+        batch_size: int = 2000,
+    ) -> dict[str, int]:
+        """Re-embed a tenant's chunks with the configured embedding model.
+
+        Chunks are embedded in batches through the concurrent embedding
+        pipeline into a new index built beside the live one, which keeps
+        serving until the new index is swapped in. Each batch is committed
+        to the database and then saved to the new index, whose highest
+        chunk id is the checkpoint an interrupted migration resumes after.
+        Returns the chunk count and how many were migrated before resuming.
+        """
+        model = embedding_service.backend.model_name
+        live = vector_store_service.get_store(tenant)
+        staging = vector_store_service.create_staging_store(
+            tenant,
+            dimension=embedding_service.dimension,
+            suffix=MIGRATION_SUFFIX,
+            resume=True,
+        )
+        if staging.count and (
+            staging.embedding_model != model or staging.dimension != embedding_service.dimension
+        ):
+            logger.info(f"Discarding migration of tenant {tenant} to {staging.embedding_model}")
+            staging = vector_store_service.create_staging_store(
+                tenant,
+                dimension=embedding_service.dimension,
+                suffix=MIGRATION_SUFFIX,
+            )
+        staging.compression = live.compression
+
+        resumed = staging.count
+        last_id = int(staging.metadata.column("chunk_id").max()) if resumed else 0
+        if resumed:
+            logger.info(
+                f"Resuming migration of tenant {tenant} after chunk {last_id} ({resumed} done)"
+            )
+
+        migrated = 0
+        for batch in self._iter_chunk_batches(tenant, db, batch_size, after_id=last_id):
+            vectors = embedding_service.embed_texts(
+                [chunk_record.content for chunk_record in batch]
+            )
+            vector_metadata = [self._vector_metadata(chunk_record) for chunk_record in batch]
+            for chunk_record, vector in zip(batch, vectors):
+                chunk_record.embedding = encode_embedding(vector)
+
+            # Committed first: a batch saved to the index is never re-embedded
+            db.commit()
+            staging.add_vectors(vectors, vector_metadata)
+            staging.save()
+            migrated += len(batch)
+            logger.info(f"Migrated {resumed + migrated} chunks of tenant {tenant} to {model}")
+
+        if not staging.count:
+            raise ValueError(f"No chunks stored for tenant {tenant}")
+
+        if index_type:
+            staging.rebuild_index(index_type)
+        staging.checkpoint()
+        vector_store_service.swap_store(tenant, staging)
+
+        logger.info(f"Migrated tenant {tenant} to {model} ({resumed + migrated} chunks)")
+        return {"chunks": resumed + migrated, "resumed": resumed}
+
+    def _get_document(self, doc_id: int, tenant: str, db: Session) -> KbDoc:
+        """Get a tenant's document, raising ValueError if it does not exist."""
+        kb_doc = db.query(KbDoc).filter(KbDoc.id == doc_id, KbDoc.tenant == tenant).first()
+        if not kb_doc:
+            raise ValueError(f"Document {doc_id} not found for tenant {tenant}")
+        return kb_doc
+
+    def delete_document(self, doc_id: int, tenant: str, db: Session) -> int:
+        """Delete a document with its chunks and vectors, returning the chunks removed.
+
+        Vectors are tombstoned rather than removed, so the cost is
+        proportional to the document, not the index. Duplicates of its
+        chunks in other documents are promoted in their place.
+        """
+        kb_doc = self._get_document(doc_id, tenant, db)
+        chunk_ids = [
+            chunk_id for (chunk_id,) in db.query(KbChunk.id).filter(KbChunk.doc_id == doc_id)
+        ]
 
-        # Add to vector store
         vector_store = vector_store_service.get_store(tenant)
+        self._promote_duplicates(chunk_ids, tenant, db, vector_store)
+        deleted = vector_store.delete({"doc_id": doc_id})
+        vector_store.save()
 
-        vector_metadata = []
-        for chunk, embedding in zip(all_chunks, embeddings):
-            meta = chunk["metadata"].copy()
-            meta["content"] = chunk["content"]
-            vector_metadata.append(meta)
+        db.delete(kb_doc)
+        db.flush()
+
+        return deleted
 
-        vector_store.add_vectors(embeddings, vector_metadata)
+    def replace_document(
+        self,
+        doc_id: int,
+        file_path: str,
+        tenant: str,
+        db: Session,
+        metadata: dict[str, Any] | None = None,
+    ) -> tuple[KbDoc, int]:
+        """Replace a document's content with a new version of the file.
+
+        The document keeps its id, and only chunks that changed are
+        embedded (see update_document). Returns the new version's chunk count.
+        """
+        kb_doc = self._get_document(doc_id, tenant, db)
+        added, kept, _ = self.update_document(kb_doc, file_path, tenant, db, metadata)
+        return kb_doc, added + kept
+
+    def update_document(
+        self,
+        kb_doc: KbDoc,
+        file_path: str,
+        tenant: str,
+        db: Session,
+        metadata: dict[str, Any] | None = None,
+        chunks: Iterable[dict[str, Any]] | None = None,
+        progress: IngestProgress | None = None,
+    ) -> tuple[int, int, int]:
+        """Re-index a document from a new version of its file, diffed by chunk.
+
+        Chunks are matched to the existing ones by content and page. Matched
+        chunks are kept as they are, unmatched new ones are embedded and
+        added, and old ones left unmatched are deleted. Additions and
+        deletions are committed to the vector store in one save after the
+        new chunks are indexed, so a failed extraction leaves the old
+        version in place. Returns the chunks added, kept and removed.
+        """
+        existing: dict[tuple[str, int | None], list[int]] = {}
+        rows = db.query(KbChunk.id, KbChunk.content, KbChunk.page_number).filter(
+            KbChunk.doc_id == kb_doc.id
+        )
+        for chunk_id, content, page_number in rows:
+            existing.setdefault((text_hash(content), page_number), []).append(chunk_id)
+        kept: list[int] = []
+
+        def changed_chunks() -> Iterator[dict[str, Any]]:
+            for chunk in self.iter_chunks(file_path) if chunks is None else chunks:
+                matches = existing.get((text_hash(chunk["content"]), chunk["page_number"]))
+                if matches:
+                    kept.append(matches.pop())
+                else:
+                    yield chunk
+
+        kb_doc.path = file_path
+        kb_doc.filename = os.path.basename(file_path)
+        kb_doc.content_hash = file_hash(file_path)
+        for field, value in (metadata or {}).items():
+            if field in DOC_FIELDS and value is not None:
+                setattr(kb_doc, field, value)
+
+        doc_metadata = {"doc_type": kb_doc.doc_type, "department": kb_doc.department}
+        added = self._index_document(
+            kb_doc, file_path, tenant, db, doc_metadata, chunks=changed_chunks(), progress=progress
+        )
+
+        vector_store = vector_store_service.get_store(tenant)
+        removed = [chunk_id for chunk_ids in existing.values() for chunk_id in chunk_ids]
+        if removed:
+            self._promote_duplicates(removed, tenant, db, vector_store)
+            vector_store.delete({"chunk_id": removed})
+            db.query(KbChunk).filter(KbChunk.id.in_(removed)).delete(synchronize_session=False)
         vector_store.save()
 
-        return kb_doc, chunk_records
+        logger.info(
+            f"Updated {kb_doc.filename}: {added} chunks added, "
+            f"{len(kept)} kept, {len(removed)} removed"
+        )
+        return added, len(kept), len(removed)
 
     def ingest_documents(
         self,
@@ -145,21 +815,151 @@ class IngestionService:
         tenant: str,
         db: Session,
         metadata: dict[str, Any] | None = None,
-    ) -> tuple[int, int, str]:
-        """Ingest multiple documents."""
-        total_docs = 0
-        total_chunks = 0
+        workers: int | None = None,
+        source_paths: list[str] | None = None,
+        prune: bool = False,
+        progress: IngestProgress | None = None,
+    ) -> IngestionResult:
+        """Ingest multiple documents incrementally.
 
-        for file_path in file_paths:
-            doc, chunks = self.ingest_document(file_path, tenant, db, metadata)
-            total_docs += 1
-            total_chunks += len(chunks)
+        Files are matched to the tenant's documents by source path (default:
+        the file path). A file whose content hash is unchanged is skipped, a
+        modified one is diffed by chunk so only changed chunks are embedded,
+        and a new one is added. With prune, documents whose source is not
+        among the files are deleted, for syncing a whole knowledge base.
+
+        With more than one worker (default: ingest_workers), files are
+        extracted and chunked in a process pool, large PDFs split into page
+        ranges, and embedded and indexed here in file order. A file that
+        fails is logged and reported in the result without aborting the others.
+
+        progress, if given, is kept up to date as files are processed.
+        """
+        progress = progress or IngestProgress()
+        progress.add(files=len(file_paths))
+        result = IngestionResult(
+            docs=0, chunks=0, index_path=str(Path(settings.vector_dir) / tenant)
+        )
+        source_paths = source_paths or file_paths
+
+        documents = {
+            kb_doc.source_path: kb_doc
+            for kb_doc in db.query(KbDoc).filter(
+                KbDoc.tenant == tenant, KbDoc.source_path.in_(source_paths)
+            )
+        }
+        changed: list[tuple[str, str]] = []
+        for file_path, source_path in zip(file_paths, source_paths):
+            kb_doc = documents.get(source_path)
+            try:
+                unchanged = kb_doc is not None and kb_doc.content_hash == file_hash(file_path)
+            except OSError as e:
+                result.failed[os.path.basename(file_path)] = str(e)
+                progress.add(files_done=1)
+                continue
+            if unchanged:
+                result.unchanged += 1
+                progress.add(files_done=1)
+            else:
+                changed.append((file_path, source_path))
+
+        file_paths = [file_path for file_path, _ in changed]
+        workers = settings.ingest_workers if workers is None else workers
+        if workers > 1 and file_paths:
+            extracted = self._extract_in_pool(file_paths, workers)
+        else:
+            extracted = ((file_path, None) for file_path in file_paths)
+
+        for (file_path, chunks), (_, source_path) in zip(extracted, changed):
+            kb_doc = documents.get(source_path)
+            try:
+                if isinstance(chunks, Exception):
+                    raise chunks
+                chunks = progress.count_extracted(
+                    self.iter_chunks(file_path) if chunks is None else chunks
+                )
+                if kb_doc is None:
+                    _, added = self.ingest_document(
+                        file_path, tenant, db, metadata, chunks, source_path, progress
+                    )
+                    result.added += 1
+                else:
+                    added, kept, removed = self.update_document(
+                        kb_doc, file_path, tenant, db, metadata, chunks, progress
+                    )
+                    result.updated += 1
+                    result.chunks_unchanged += kept
+                    result.chunks_removed += removed
+            except Exception as e:
+                logger.warning(f"Failed to ingest {file_path}: {e}")
+                result.failed[os.path.basename(file_path)] = str(e)
+                continue
+            finally:
+                progress.add(files_done=1)
+            result.docs += 1
+            result.chunks += added
+
+        if prune:
+            stale = (
+                db.query(KbDoc.id)
+                .filter(KbDoc.tenant == tenant, KbDoc.source_path.notin_(source_paths))
+                .all()
+            )
+            for (doc_id,) in stale:
+                result.chunks_removed += self.delete_document(doc_id, tenant, db)
+                result.removed += 1
 
         db.commit()
 
-        index_path = str(Path(settings.vector_dir) / tenant)
-        return total_docs, total_chunks, index_path
+        logger.info(
+            f"Ingested {tenant}: {result.added} added, {result.updated} updated, "
+            f"{result.unchanged} unchanged, {result.removed} removed, {len(result.failed)} failed"
+        )
+        return result
+
+    def _extract_in_pool(
+        self,
+        file_paths: list[str],
+        workers: int,
+    ) -> Iterator[tuple[str, list[dict[str, Any]] | Exception]]:
+        """Extract and chunk files in a process pool, yielding each file's chunks in order.
+
+        Large PDFs are split into page-range tasks. Up to workers files are
+        queued ahead of the one being indexed. A file whose extraction
+        failed is yielded with the exception instead of its chunks.
+        """
+        # Spawned, not forked: the parent holds threads (embedding, compaction)
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            queued: deque[tuple[str, list[Future]]] = deque()
+
+            def collect(
+                file_path: str, tasks: list[Future]
+            ) -> tuple[str, list[dict[str, Any]] | Exception]:
+                try:
+                    return file_path, [chunk for task in tasks for chunk in task.result()]
+                except Exception as e:
+                    return file_path, e
+
+            for file_path in file_paths:
+                tasks = [
+                    pool.submit(extract_chunks, file_path, start, end)
+                    for start, end in self._page_ranges(file_path)
+                ]
+                queued.append((file_path, tasks))
+                if len(queued) > workers:
+                    yield collect(*queued.popleft())
+
+            while queued:
+                yield collect(*queued.popleft())
 
 
 # Global ingestion service
 ingestion_service = IngestionService()
+
+
+def extract_chunks(
+    file_path: str, start_page: int = 0, end_page: int | None = None
+) -> list[dict[str, Any]]:
+    """Extract and chunk a file, or a range of its PDF pages, in an ingestion worker process."""
+    return list(ingestion_service.iter_chunks(file_path, start_page, end_page))
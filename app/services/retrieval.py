@@ -1,11 +1,17 @@
 """Retrieval service for RAG."""
 
+import logging
 from typing import Any
-from app.models.schemas import Citation
+from sqlalchemy.exc import SQLAlchemyError
+from app.config import settings
+from app.db import SessionLocal
+from app.models.database import KbChunk, KbDoc
+from app.models.schemas import Citation, CitationSource
 from app.rag import vector_store_service
 from app.services.llm import llm_service
 from app.services.prompts import prompt_service
 
+logger = logging.getLogger(__name__)
 
 class RetrievalService:
     """Service for retrieving relevant information from KB."""
@@ -20,28 +26,106 @@ class RetrievalService:
         tenant: str,
         k: int = 6,
         filters: dict[str, Any] | None = None,
+        mode: str | None = None,
     ) -> tuple[list[dict[str, Any]], list[Citation]]:
-        """Retrieve relevant chunks from vector store."""
-        results = vector_store_service.search(
-            query=query,
+        """Retrieve relevant chunks from vector store.
+
+        Modes are dense, lexical (BM25 only), hybrid (both, fused by
+        reciprocal rank) and auto, which answers short keyword queries such
+        as "NEFT charges" lexically without an embedding call and uses
+        hybrid otherwise. Defaults to the retrieval_mode setting.
+        """
+        mode = mode or settings.retrieval_mode
+
+        if mode == "auto":
+            store = vector_store_service.get_store(tenant)
+            if store.lexical_index.is_keyword_query(query, settings.lexical_max_terms):
+                results = vector_store_service.lexical_search(query, tenant, k=k, filters=filters)
+                if results:
+                    return results, self._to_citations(results)
+            mode = "hybrid"
+
+        if mode == "lexical":
+            results = vector_store_service.lexical_search(query, tenant, k=k, filters=filters)
+        elif mode == "hybrid":
+            results = vector_store_service.hybrid_search(query, tenant, k=k, filters=filters)
+        else:
+            results = vector_store_service.search(
+                query=query,
+                tenant=tenant,
+                k=k,
+                filters=filters,
+            )
+
+        return results, self._to_citations(results)
+
+    def retrieve_many(
+        self,
+        queries: list[str],
+        tenant: str,
+        k: int = 6,
+        filters: dict[str, Any] | None = None,
+    ) -> list[tuple[list[dict[str, Any]], list[Citation]]]:
+        """Retrieve chunks for several queries in one embedding and search round trip."""
+        batches = vector_store_service.search_many(
+            queries=queries,
             tenant=tenant,
             k=k,
             filters=filters,
         )
 
-        # Convert to citations
+        return [(results, self._to_citations(results)) for results in batches]
+
+    def _to_citations(self, results: list[dict[str, Any]]) -> list[Citation]:
+        """Convert search results to citations.
+
+        A chunk that near-duplicates were collapsed into also cites the
+        documents of its duplicates.
+        """
+        sources = self._duplicate_sources([r["metadata"].get("chunk_id") for r in results])
+
         citations = []
         for result in results:
             metadata = result["metadata"]
+            citation_doc = metadata.get("filename", "Unknown")
             citation = Citation(
-                doc=metadata.get("filename", "Unknown"),
+                doc=citation_doc,
                 page=metadata.get("page_number"),
                 snippet=result["content"][:200] + "..." if len(result["content"]) > 200 else result["content"],
                 score=result.get("score"),
+                sources=[
+                    source
+                    for source in sources.get(metadata.get("chunk_id"), [])
+                    if (source.doc, source.page) != (citation_doc, metadata.get("page_number"))
+                ],
             )
             citations.append(citation)
 
-        return results, citations
+        return citations
+
+    def _duplicate_sources(self, chunk_ids: list[int | None]) -> dict[int, list[CitationSource]]:
+        """Look up the documents of chunks collapsed into each of the given chunks."""
+        chunk_ids = [chunk_id for chunk_id in chunk_ids if chunk_id is not None]
+        if not settings.dedup_enabled or not chunk_ids:
+            return {}
+
+        try:
+            with SessionLocal() as db:
+                rows = (
+                    db.query(KbChunk.duplicate_of, KbDoc.filename, KbChunk.page_number)
+                    .join(KbDoc, KbChunk.doc_id == KbDoc.id)
+                    .filter(KbChunk.duplicate_of.in_(chunk_ids))
+                    .distinct()
+                    .all()
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not look up duplicate chunk sources: {e}")
+            return {}
+
+        sources: dict[int, list[CitationSource]] = {}
+        for chunk_id, filename, page_number in rows:
+            sources.setdefault(chunk_id, []).append(CitationSource(doc=filename, page=page_number))
+        return sources
 
     def answer_question(
         self,
@@ -0,0 +1,93 @@
+"""CLI script to benchmark chunk row inserts through the ORM and in bulk."""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.db import bulk_insert
+from app.models.database import Base, KbChunk, KbDoc
+from app.rag.embeddings import encode_embedding
+
+
+def insert_orm(db: Session, rows: list[dict], batch_size: int) -> None:
+    """Insert rows one ORM object each, flushing per batch."""
+    for start in range(0, len(rows), batch_size):
+        records = [KbChunk(**row) for row in rows[start:start + batch_size]]
+        db.add_all(records)
+        db.flush()
+        for record in records:
+            db.expunge(record)
+
+
+def insert_bulk(db: Session, rows: list[dict], batch_size: int) -> None:
+    """Insert rows with multi-row Core inserts."""
+    bulk_insert(db, KbChunk, rows, batch_size=batch_size)
+
+
+def main() -> None:
+    """Time chunk inserts with each write path and report rows per second."""
+    parser = argparse.ArgumentParser(description="Benchmark KbChunk insert throughput")
+    parser.add_argument(
+        "--db-url",
+        default=settings.db_url,
+        help="Database to benchmark against (default: DB_URL); nothing is committed",
+    )
+    parser.add_argument("--rows", type=int, default=20_000, help="Chunk rows to insert")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.db_bulk_batch_size,
+        help="Rows per flush or insert (default: DB_BULK_BATCH_SIZE)",
+    )
+    parser.add_argument("--dimension", type=int, default=512, help="Stored embedding dimension")
+
+    args = parser.parse_args()
+
+    engine = create_engine(args.db_url)
+    Base.metadata.create_all(bind=engine)
+    embedding = encode_embedding([0.1] * args.dimension)
+
+    print(f"Database: {engine.dialect.name} ({args.rows} rows, batches of {args.batch_size})")
+    print("")
+    print(f"{'method':<10} {'seconds':>10} {'rows/sec':>12}")
+
+    for name, insert_rows in [("orm", insert_orm), ("bulk", insert_bulk)]:
+        # Each run is rolled back so the database is left as it was
+        with engine.connect() as conn:
+            transaction = conn.begin()
+            db = Session(bind=conn)
+            doc = KbDoc(path="bench.md", filename="bench.md", doc_type="bench", tenant="bench")
+            db.add(doc)
+            db.flush()
+            rows = [
+                {
+                    "doc_id": doc.id,
+                    "content": f"Benchmark chunk {i} " * 40,
+                    "chunk_index": i,
+                    "page_number": i // 10,
+                    "chunk_metadata": {"doc_type": "bench", "page_number": i // 10},
+                    "fingerprint": i,
+                    "embedding": embedding,
+                }
+                for i in range(args.rows)
+            ]
+
+            start = time.perf_counter()
+            insert_rows(db, rows, args.batch_size)
+            elapsed = time.perf_counter() - start
+
+            db.close()
+            transaction.rollback()
+
+        print(f"{name:<10} {elapsed:>10.2f} {args.rows / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
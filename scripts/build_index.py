@@ -0,0 +1,148 @@
+"""CLI script to train and rebuild a tenant's vector index offline."""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from app.config import settings
+from app.rag.index_factory import (
+    COMPRESSIONS,
+    INDEX_TYPES,
+    PQ_MIN_VECTORS,
+    benchmark_index,
+    build_index,
+    select_index_type,
+)
+from app.rag.vector_store import FAISSVectorStore
+
+
+def main() -> None:
+    """Rebuild a tenant index and report its recall/latency/memory tradeoff."""
+    parser = argparse.ArgumentParser(description="Train and rebuild a tenant's FAISS index")
+    parser.add_argument("--tenant", default="bank-asia", help="Tenant identifier")
+    parser.add_argument(
+        "--index-type",
+        default="auto",
+        choices=["auto", *INDEX_TYPES],
+        help="Index type to build (auto selects by size and recall target)",
+    )
+    parser.add_argument(
+        "--recall-target",
+        type=float,
+        default=settings.vector_recall_target,
+        help="Target recall@k",
+    )
+    parser.add_argument(
+        "--compression",
+        default=None,
+        choices=COMPRESSIONS,
+        help="Vector codec to build (default: the tenant's current codec)",
+    )
+    parser.add_argument(
+        "--rescore-factor",
+        type=int,
+        default=settings.vector_rescore_factor,
+        help="Re-rank k * factor candidates of compressed indexes exactly (0 = off)",
+    )
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sample queries")
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="Benchmark every index type and codec instead of only the selected one",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report the benchmark without replacing the tenant index",
+    )
+
+    args = parser.parse_args()
+
+    store = FAISSVectorStore(args.tenant, read_only=False)
+    if store.count == 0:
+        print(f"Error: No vectors indexed for tenant {args.tenant}")
+        sys.exit(1)
+
+    vectors = store.vectors
+    baseline = build_index("flat", vectors, store.dimension)
+
+    # Perturbed stored vectors stand in for real queries
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = (sample + rng.normal(0, 0.01, sample.shape)).astype(np.float32)
+
+    selected = (
+        select_index_type(len(vectors), args.recall_target)
+        if args.index_type == "auto"
+        else args.index_type
+    )
+    compression = args.compression or store.compression
+    if selected == "ivf_pq":
+        compression = "pq"
+
+    if args.compare:
+        candidates = [(index_type, "none") for index_type in INDEX_TYPES if index_type != "ivf_pq"]
+        candidates += [(selected, codec) for codec in COMPRESSIONS if codec != "none"]
+        candidates.append(("ivf_pq", "pq"))
+    else:
+        candidates = [("flat", "none"), (selected, compression)]
+    candidates = list(dict.fromkeys(candidates))
+
+    print(f"Tenant: {args.tenant} | vectors: {len(vectors)} | dimension: {store.dimension}")
+    print(
+        f"Current index: {store.index_type} ({store.compression}) | "
+        f"selected: {selected} ({compression})"
+    )
+    print("")
+    print(
+        f"{'index':<10} {'codec':<8} {'bytes/vec':>10} {'recall@' + str(args.k):>10} "
+        f"{'mean ms':>10} {'p95 ms':>10}"
+    )
+
+    built = {}
+    for index_type, codec in candidates:
+        if codec == "pq" and len(vectors) < PQ_MIN_VECTORS:
+            print(
+                f"{index_type:<10} {codec:<8} skipped: PQ needs {PQ_MIN_VECTORS} vectors to train"
+            )
+            continue
+
+        if (index_type, codec) == ("flat", "none"):
+            index = baseline
+        else:
+            index = build_index(index_type, vectors, store.dimension, codec)
+        built[(index_type, codec)] = index
+
+        rescore_factor = args.rescore_factor if codec != "none" else 0
+        stats = benchmark_index(
+            index,
+            baseline,
+            queries,
+            args.k,
+            args.recall_target,
+            vectors=vectors,
+            rescore_factor=rescore_factor,
+        )
+        print(
+            f"{index_type:<10} {codec:<8} {stats['bytes_per_vector']:>10.1f} "
+            f"{stats['recall_at_k']:>10.4f} {stats['latency_ms_mean']:>10.3f} "
+            f"{stats['latency_ms_p95']:>10.3f}"
+        )
+
+    if args.dry_run or (selected, compression) not in built:
+        return
+
+    store.compression = compression
+    store.index = built[(selected, compression)]
+    store.checkpoint()
+    print("")
+    print(f"Rebuilt {args.tenant} index as {selected} ({compression})")
+
+
+if __name__ == "__main__":
+    main()
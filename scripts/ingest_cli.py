@@ -7,6 +7,7 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from app.config import settings
 from app.db import get_db
 from app.services.ingestion import ingestion_service
 
@@ -20,6 +21,17 @@ def main() -> None:
     parser.add_argument("--department", help="Department")
     parser.add_argument("--country", help="Country")
     parser.add_argument("--version", help="Document version")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.ingest_workers,
+        help="Processes extracting files in parallel (default: INGEST_WORKERS)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="Delete the tenant's documents that are not among the files",
+    )
 
     args = parser.parse_args()
 
@@ -46,19 +58,28 @@ def main() -> None:
     # Ingest documents
     try:
         with get_db() as db:
-            total_docs, total_chunks, index_path = ingestion_service.ingest_documents(
+            result = ingestion_service.ingest_documents(
                 file_paths=file_paths,
                 tenant=args.tenant,
                 db=db,
                 metadata=metadata,
+                workers=args.workers,
+                prune=args.prune,
             )
 
         print("\n" + "=" * 60)
         print("INGESTION COMPLETE")
         print("=" * 60)
-        print(f"Documents processed: {total_docs}")
-        print(f"Chunks created: {total_chunks}")
-        print(f"Index path: {index_path}")
+        print(f"Documents processed: {result.docs}")
+        print(
+            f"  added: {result.added} | updated: {result.updated} | "
+            f"unchanged: {result.unchanged} | removed: {result.removed}"
+        )
+        print(f"Chunks created: {result.chunks}")
+        print(f"  unchanged: {result.chunks_unchanged} | removed: {result.chunks_removed}")
+        print(f"Index path: {result.index_path}")
+        for filename, error in result.failed.items():
+            print(f"Failed: {filename} ({error})")
         print("=" * 60)
 
     except Exception as e:
@@ -0,0 +1,66 @@
+"""CLI script to re-embed tenant knowledge bases with the configured embedding model."""
+
+import argparse
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import get_db
+from app.rag import embedding_service
+from app.rag.index_factory import INDEX_TYPES
+from app.services.ingestion import ingestion_service
+
+
+def migrate(tenant: str, index_type: str | None, batch_size: int) -> dict[str, int]:
+    """Migrate one tenant with its own database session."""
+    with get_db() as db:
+        return ingestion_service.migrate_embeddings(
+            tenant, db, index_type=index_type, batch_size=batch_size
+        )
+
+
+def main() -> None:
+    """Re-embed tenants' chunks and swap in their new indexes."""
+    parser = argparse.ArgumentParser(
+        description="Migrate tenant indexes to the configured embedding model"
+    )
+    parser.add_argument("--tenant", nargs="+", default=["bank-asia"], help="Tenant identifiers")
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        help="Index type to build (default: chosen by corpus size)",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=2000, help="Chunks embedded per checkpoint"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Tenants migrated in parallel")
+
+    args = parser.parse_args()
+
+    print(f"Migrating {len(args.tenant)} tenant(s) to {embedding_service.backend.model_name}")
+
+    failed = False
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(migrate, tenant, args.index_type, args.batch_size): tenant
+            for tenant in args.tenant
+        }
+        for future in as_completed(futures):
+            tenant = futures[future]
+            try:
+                counts = future.result()
+            except Exception as e:
+                print(f"{tenant}: failed, rerun to resume ({e})")
+                failed = True
+                continue
+            print(f"{tenant}: migrated {counts['chunks']} chunks ({counts['resumed']} resumed)")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""CLI script to rebuild a tenant's vector index from stored chunk embeddings."""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import get_db
+from app.rag.index_factory import INDEX_TYPES
+from app.services.ingestion import ingestion_service
+
+
+def main() -> None:
+    """Rebuild a tenant index from the database without re-embedding."""
+    parser = argparse.ArgumentParser(description="Rebuild a tenant's FAISS index from the database")
+    parser.add_argument("--tenant", default="bank-asia", help="Tenant identifier")
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        help="Index type to build (default: chosen by corpus size)",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000, help="Chunks read per query")
+
+    args = parser.parse_args()
+
+    try:
+        with get_db() as db:
+            counts = ingestion_service.rebuild_index(
+                args.tenant,
+                db,
+                index_type=args.index_type,
+                batch_size=args.batch_size,
+            )
+    except Exception as e:
+        print(f"\nError during rebuild: {e}")
+        sys.exit(1)
+
+    print(f"Rebuilt {args.tenant} index from {counts['chunks']} chunks")
+    print(f"Chunks embedded (no stored embedding): {counts['embedded']}")
+
+
+if __name__ == "__main__":
+    main()
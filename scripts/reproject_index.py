@@ -0,0 +1,102 @@
+"""CLI script to reduce a tenant's vector index to fewer dimensions."""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from app.config import settings
+from app.rag.index_factory import benchmark_index, build_index, index_memory_bytes
+from app.rag.projection import PROJECTION_METHODS, Projection
+from app.rag.vector_store import FAISSVectorStore
+
+
+def main() -> None:
+    """Benchmark and apply a dimension reduction for a tenant index."""
+    parser = argparse.ArgumentParser(
+        description="Re-project a tenant's FAISS index to fewer dimensions"
+    )
+    parser.add_argument("--tenant", default="bank-asia", help="Tenant identifier")
+    parser.add_argument(
+        "--dimension",
+        type=int,
+        default=settings.embedding_dimensions,
+        help="Target dimension (default: EMBEDDING_DIMENSIONS)",
+    )
+    parser.add_argument(
+        "--method",
+        default="truncate",
+        choices=PROJECTION_METHODS,
+        help="truncate for text-embedding-3 models, pca for others",
+    )
+    parser.add_argument("--k", type=int, default=10, help="k for recall@k")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sample queries")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report the benchmark without re-projecting the tenant index",
+    )
+
+    args = parser.parse_args()
+
+    if not args.dimension:
+        print("Error: Pass --dimension or set EMBEDDING_DIMENSIONS")
+        sys.exit(1)
+
+    store = FAISSVectorStore(args.tenant, read_only=False)
+    if store.count == 0:
+        print(f"Error: No vectors indexed for tenant {args.tenant}")
+        sys.exit(1)
+    if store.projection is not None:
+        print(f"Error: Tenant {args.tenant} is already projected to {store.dimension} dimensions")
+        sys.exit(1)
+
+    vectors = store.vectors
+    projection = Projection.fit(args.method, vectors, args.dimension)
+    projected = projection.apply(vectors)
+
+    # Perturbed stored vectors stand in for real queries
+    rng = np.random.default_rng(0)
+    sample = vectors[rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)]
+    queries = (sample + rng.normal(0, 0.01, sample.shape)).astype(np.float32)
+
+    baseline = build_index("flat", vectors, store.dimension)
+    candidate = build_index("flat", projected, args.dimension)
+
+    print(f"Tenant: {args.tenant} | vectors: {len(vectors)}")
+    print(f"Dimension: {store.dimension} -> {args.dimension} ({args.method})")
+    print("")
+    recall = f"recall@{args.k}"
+    print(f"{'index':<10} {'bytes/vec':>10} {recall:>10} {'mean ms':>10} {'p95 ms':>10}")
+
+    runs = [
+        ("full", baseline, None),
+        ("projected", candidate, projection.apply(queries)),
+    ]
+    for name, index, candidate_queries in runs:
+        stats = benchmark_index(
+            index,
+            baseline,
+            queries,
+            args.k,
+            candidate_queries=candidate_queries,
+        )
+        print(
+            f"{name:<10} {index_memory_bytes(index) / index.ntotal:>10.1f} "
+            f"{stats['recall_at_k']:>10.4f} {stats['latency_ms_mean']:>10.3f} "
+            f"{stats['latency_ms_p95']:>10.3f}"
+        )
+
+    if args.dry_run:
+        return
+
+    store.reproject(args.dimension, args.method)
+    print("")
+    print(f"Re-projected {args.tenant} index to {args.dimension} dimensions")
+
+
+if __name__ == "__main__":
+    main()
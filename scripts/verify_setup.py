@@ -174,8 +174,8 @@ def check_vector_store() -> bool:
     if tenants:
         print(f"  ✓ Found {len(tenants)} tenant index(es)")
         for tenant in tenants:
-            index_file = tenant / "faiss.index"
-            if index_file.exists():
+            manifest_file = tenant / "manifest.json"
+            if manifest_file.exists() or (tenant / "faiss.index").exists():
                 print(f"    - {tenant.name}/")
         return True
     else:
@@ -1,5 +1,10 @@
 """Pytest configuration and fixtures."""
 
+import os
+
+# Embed locally so the suite runs without network access
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -48,3 +53,12 @@ def client(db_session):
         yield test_client
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture(scope="function")
+def vector_dir(tmp_path, monkeypatch):
+    """Point vector store persistence at a temporary directory."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "vector_dir", str(tmp_path / "indexes"))
+    return tmp_path / "indexes"
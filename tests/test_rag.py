@@ -4,7 +4,8 @@ import pytest
 import numpy as np
 from app.rag.embeddings import embedding_service
 from app.rag.chunking import chunking_service
-from app.rag.vector_store import FAISSVectorStore
+from app.rag.lexical_index import reciprocal_rank_fusion
+from app.rag.vector_store import FAISSVectorStore, VectorStoreService
 
 
 class TestEmbeddings:
@@ -33,6 +34,251 @@ class TestEmbeddings:
         assert all(isinstance(e, list) for e in embeddings)
 
 
+class TestHashingBackend:
+    """Test local hashed n-gram embeddings."""
+
+    def test_deterministic_and_normalized(self):
+        """Test that embeddings are stable, unit-length and of the configured size."""
+        from app.rag.embedding_backends import HashingEmbeddingBackend
+
+        backend = HashingEmbeddingBackend(dimension=256)
+        first = backend.embed_query("Open a WhatsApp channel")
+        second = HashingEmbeddingBackend(dimension=256).embed_documents(
+            ["Open a WhatsApp channel"]
+        )[0]
+
+        assert first == second
+        assert len(first) == 256
+        assert np.linalg.norm(first) == pytest.approx(1.0, abs=1e-5)
+
+    def test_similar_texts_score_higher(self):
+        """Test that shared words and word fragments bring texts closer."""
+        from app.rag.embedding_backends import HashingEmbeddingBackend
+
+        backend = HashingEmbeddingBackend()
+        query, related, unrelated = (
+            np.array(v)
+            for v in backend.embed_documents([
+                "open whatsapp channel for retail",
+                "opening a WhatsApp channel in retail banking",
+                "quarterly interest rate policy",
+            ])
+        )
+        assert query @ related > query @ unrelated
+
+
+class TestEmbeddingCache:
+    """Test persistent embedding cache."""
+
+    def test_hits_misses_and_persistence(self, tmp_path):
+        """Test that cached embeddings are keyed by model, dimension and text."""
+        from app.rag.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path / "cache.db")
+        assert cache.get_many("model-a", 4, ["hello"]) == [None]
+        cache.put_many(
+            "model-a", 4, ["hello", "world"], [[0.0, 1.0, 2.0, 3.0], [1.0, 1.0, 1.0, 1.0]]
+        )
+
+        assert cache.get_many("model-a", 4, ["world", "hello", "new"]) == [
+            [1.0, 1.0, 1.0, 1.0],
+            [0.0, 1.0, 2.0, 3.0],
+            None,
+        ]
+        assert cache.get_many("model-b", 4, ["hello"]) == [None]
+        assert (cache.hits, cache.misses) == (2, 3)
+        cache.close()
+
+        reopened = EmbeddingCache(tmp_path / "cache.db")
+        assert len(reopened) == 2
+        assert reopened.stats()["bytes"] == 32
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """Test that the cache stays within its byte budget."""
+        import time
+        from app.rag.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(tmp_path / "cache.db", max_bytes=16 * 10)
+        for i in range(10):
+            cache.put_many("m", 4, [f"text {i}"], [[float(i)] * 4])
+            time.sleep(0.001)
+        cache.get_many("m", 4, ["text 0"])
+        cache.put_many("m", 4, ["text 10"], [[10.0] * 4])
+
+        assert cache.stats()["bytes"] <= 16 * 10
+        assert cache.evictions > 0
+        assert cache.get_many("m", 4, ["text 0", "text 1", "text 10"])[0] is not None
+        assert cache.get_many("m", 4, ["text 1"]) == [None]
+
+    def test_service_embeds_only_misses(self, tmp_path):
+        """Test that the embedding service sends only uncached texts to the API."""
+        from app.rag.embedding_cache import EmbeddingCache
+        from app.rag.embeddings import EmbeddingService
+
+        calls = []
+
+        def embed_documents(texts):
+            calls.append(list(texts))
+            return [[float(len(text))] * 3 for text in texts]
+
+        service = EmbeddingService(cache=EmbeddingCache(tmp_path / "cache.db"))
+        service._embed_documents = embed_documents
+
+        assert service.embed_texts(["a", "bb", "a"]) == [[1.0] * 3, [2.0] * 3, [1.0] * 3]
+        assert service.embed_texts(["bb", "ccc"]) == [[2.0] * 3, [3.0] * 3]
+        assert calls == [["a", "bb"], ["ccc"]]
+
+
+class TestQueryEmbeddingCache:
+    """Test in-memory query embedding cache."""
+
+    def test_lru_and_ttl(self):
+        """Test that entries are bounded by count and expire after the TTL."""
+        import time
+        from app.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=0.05)
+        for query in ["a", "b", "a", "c"]:
+            cache.get_or_compute(query, lambda: [1.0])
+        assert (cache.hits, cache.misses) == (1, 3)
+
+        # "b" was least recently used when "c" was added
+        cache.get_or_compute("b", lambda: [2.0])
+        assert cache.misses == 4
+
+        time.sleep(0.06)
+        assert cache.get_or_compute("b", lambda: [3.0]) == [3.0]
+        assert cache.stats()["entries"] <= 2
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test that identical concurrent queries share one computation."""
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from app.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return [0.5, 0.5]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: cache.get_or_compute("same", compute), range(8)))
+
+        assert results == [[0.5, 0.5]] * 8
+        assert len(calls) == 1
+        assert cache.stats()["hit_rate"] == 7 / 8
+        assert cache.stats()["saved_ms"] > 0
+
+    def test_failed_computation_is_not_cached(self):
+        """Test that errors propagate and the next lookup retries."""
+        from app.rag.query_cache import QueryEmbeddingCache
+
+        cache = QueryEmbeddingCache(max_entries=10, ttl_seconds=60)
+
+        def fail():
+            raise RuntimeError("rate limited")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("q", fail)
+        assert cache.get_or_compute("q", lambda: [1.0]) == [1.0]
+
+
+class TestMicroBatcher:
+    """Test micro-batching of concurrent query embeddings."""
+
+    def test_concurrent_requests_share_batches(self):
+        """Test that concurrent requests are embedded together and fanned back out."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.rag.micro_batcher import MicroBatcher
+
+        batches = []
+
+        def embed_batch(texts):
+            batches.append(list(texts))
+            return [[float(text)] for text in texts]
+
+        batcher = MicroBatcher(embed_batch, max_wait_ms=50, max_batch_size=8)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(lambda i: batcher.submit(str(i % 12)), range(16)))
+
+        assert results == [[float(i % 12)] for i in range(16)]
+        assert len(batches) < 16
+        assert all(len(batch) <= 8 for batch in batches)
+        assert batcher.stats()["mean_batch_size"] > 1
+
+    def test_batch_errors_reach_every_waiter(self):
+        """Test that a failed batch raises in each caller."""
+        from app.rag.micro_batcher import MicroBatcher
+
+        def embed_batch(texts):
+            raise RuntimeError("provider down")
+
+        batcher = MicroBatcher(embed_batch, max_wait_ms=1, max_batch_size=4)
+        with pytest.raises(RuntimeError):
+            batcher.submit("query")
+
+
+class TestBatchEmbedding:
+    """Test token-aware concurrent embedding batches."""
+
+    def test_pack_batches_by_tokens_and_size(self):
+        """Test that batches respect token and item limits in order."""
+        from app.rag.embedding_batches import pack_batches
+
+        assert pack_batches([3, 3, 3, 10, 1], max_tokens=6, max_items=10) == [[0, 1], [2], [3], [4]]
+        assert pack_batches([1] * 5, max_tokens=100, max_items=2) == [[0, 1], [2, 3], [4]]
+
+    def test_concurrent_batches_keep_order_and_retry(self):
+        """Test that results come back in input order despite retries and concurrency."""
+        import asyncio
+        import httpx
+        import openai
+        from app.rag.embedding_batches import BatchEmbedder, TokenBucket
+
+        in_flight = []
+        peak = []
+        failed = set()
+
+        async def embed_batch(texts):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            try:
+                await asyncio.sleep(0.01 * (len(texts) % 3))
+                if texts[0] not in failed:
+                    failed.add(texts[0])
+                    response = httpx.Response(429, request=httpx.Request("POST", "http://test"))
+                    raise openai.RateLimitError("rate limited", response=response, body=None)
+                return [[float(text)] for text in texts]
+            finally:
+                in_flight.pop()
+
+        embedder = BatchEmbedder(
+            embed_batch,
+            count_tokens=lambda text: len(text),
+            max_batch_tokens=4,
+            max_batch_size=3,
+            concurrency=2,
+            bucket=TokenBucket(600_000),
+            backoff_seconds=0.001,
+        )
+        texts = [str(i) for i in range(25)]
+
+        assert asyncio.run(embedder.embed(texts)) == [[float(i)] for i in range(25)]
+        assert max(peak) == 2
+        assert embedder.retries == len(failed)
+
+    def test_token_bucket_delays_over_rate(self):
+        """Test that reservations beyond the bucket wait for the refill."""
+        from app.rag.embedding_batches import TokenBucket
+
+        bucket = TokenBucket(tokens_per_minute=600)
+        assert bucket.reserve(600) == 0
+        assert bucket.reserve(60) == pytest.approx(6.0, abs=0.1)
+
+
 class TestChunking:
     """Test chunking service."""
 
@@ -105,3 +351,755 @@ class TestVectorStore:
         )
 
         assert len(results) <= 3  # Only retail documents
+
+    def test_selective_filter_returns_k_results(self, vector_dir):
+        """Test that selective filters still return k matching results."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=64)
+
+        vectors = np.random.rand(200, 64).astype(np.float32)
+        metadata = [
+            {"content": f"Doc {i}", "department": "treasury" if i % 50 == 0 else "retail"}
+            for i in range(200)
+        ]
+        store.add_vectors(vectors, metadata)
+
+        results = store.search(vectors[1].tolist(), k=3, filters={"department": "treasury"})
+
+        assert len(results) == 3
+        assert all(r["metadata"]["department"] == "treasury" for r in results)
+
+    def test_search_with_membership_filter(self, vector_dir):
+        """Test set-membership filters."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=64)
+
+        vectors = np.random.rand(30, 64).astype(np.float32)
+        doc_types = ["policy", "faq", "product"]
+        metadata = [{"content": f"Doc {i}", "doc_type": doc_types[i % 3]} for i in range(30)]
+        store.add_vectors(vectors, metadata)
+
+        results = store.search(
+            vectors[0].tolist(),
+            k=30,
+            filters={"doc_type": ["faq", "product"]},
+        )
+
+        assert len(results) == 20
+        assert {r["metadata"]["doc_type"] for r in results} == {"faq", "product"}
+        assert store.search(vectors[0].tolist(), k=5, filters={"doc_type": "missing"}) == []
+
+    def test_auto_switches_to_ann_index(self, vector_dir, monkeypatch):
+        """Test that large stores move from flat to an approximate index."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_ann_min_vectors", 500)
+        store = FAISSVectorStore(tenant="test-tenant", dimension=32)
+
+        vectors = np.random.rand(600, 32).astype(np.float32)
+        metadata = [{"content": f"Doc {i}", "department": "retail"} for i in range(600)]
+
+        store.add_vectors(vectors[:400], metadata[:400])
+        assert store.index_type == "flat"
+
+        store.add_vectors(vectors[400:], metadata[400:])
+        assert store.index_type == "hnsw"
+        assert store.count == 600
+
+        results = store.search(vectors[10].tolist(), k=5, filters={"department": "retail"})
+        assert len(results) == 5
+        assert results[0]["content"] == "Doc 10"
+
+    def test_segmented_persistence(self, vector_dir, monkeypatch):
+        """Test that saves append delta segments and compaction merges them."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_compaction_segments", 100)
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(30, 16).astype(np.float32)
+
+        for batch in range(3):
+            rows = slice(batch * 10, (batch + 1) * 10)
+            store.add_vectors(vectors[rows], [{"content": f"Doc {i}"} for i in range(30)[rows]])
+            store.save()
+
+        assert [s["count"] for s in store.segments.segments] == [10, 10, 10]
+
+        reloaded = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert reloaded.count == 30
+        assert reloaded.get_contents([25]) == ["Doc 25"]
+
+        reloaded.segments.compact()
+        assert len(reloaded.segments.segments) == 1
+        assert reloaded.segments.segments[0]["kind"] == "base"
+
+        compacted = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        results = compacted.search(vectors[25].tolist(), k=1)
+        assert results[0]["content"] == "Doc 25"
+
+    def test_read_only_mmap_store(self, vector_dir):
+        """Test serving a saved store in read-only memory-mapped mode."""
+        writer = FAISSVectorStore(tenant="test-tenant", dimension=16, read_only=False)
+        vectors = np.random.rand(20, 16).astype(np.float32)
+        writer.add_vectors(vectors, [{"content": f"Doc {i}", "doc_id": i} for i in range(20)])
+        writer.checkpoint()
+
+        reader = FAISSVectorStore(tenant="test-tenant", read_only=True)
+        assert reader.count == 20
+        assert reader.dimension == 16
+        assert reader.search(vectors[7].tolist(), k=1)[0]["metadata"]["doc_id"] == 7
+
+        with pytest.raises(RuntimeError):
+            reader.add_vectors(vectors[:1], [{"content": "new"}])
+
+        assert not reader.is_stale()
+        writer.add_vectors(vectors[:1], [{"content": "new"}])
+        writer.save()
+        assert reader.is_stale()
+
+    def test_content_kept_out_of_metadata(self, vector_dir):
+        """Test that content lives in the side store and metadata is columnar."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(10, 16).astype(np.float32)
+        metadata = [
+            {
+                "content": f"Chunk text {i}",
+                "chunk_id": 100 + i,
+                "doc_id": 7,
+                "page_number": None if i % 2 else i,
+                "doc_type": "policy",
+            }
+            for i in range(10)
+        ]
+        store.add_vectors(vectors, metadata)
+        store.save()
+
+        reloaded = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert "content" not in reloaded.metadata.columns
+        assert reloaded.metadata[4] == {
+            "chunk_id": 104,
+            "doc_id": 7,
+            "page_number": 4,
+            "doc_type": "policy",
+        }
+        assert "page_number" not in reloaded.metadata[3]
+
+        results = reloaded.search(vectors[4].tolist(), k=1, filters={"doc_type": "policy"})
+        assert results[0]["content"] == "Chunk text 4"
+        assert results[0]["metadata"]["chunk_id"] == 104
+
+    def test_service_evicts_over_memory_budget(self, vector_dir):
+        """Test that idle tenant stores are saved and evicted over budget."""
+        vectors = np.random.rand(50, embedding_service.dimension).astype(np.float32)
+        service = VectorStoreService(memory_budget_bytes=1, eviction_policy="lru")
+
+        store_a = service.get_store("tenant-a")
+        store_a.add_vectors(vectors, [{"content": f"A{i}", "doc_id": i} for i in range(50)])
+        assert store_a.memory_bytes >= vectors.nbytes
+
+        service.get_store("tenant-b")
+        assert [s["tenant"] for s in service.resident_stores()] == ["tenant-b"]
+        assert service.evictions == 1
+
+        # Evicted stores are saved first and reloaded on demand
+        reloaded = service.get_store("tenant-a")
+        assert reloaded is not store_a
+        assert reloaded.count == 50
+        assert reloaded.search(vectors[3].tolist(), k=1)[0]["content"] == "A3"
+
+    def test_search_many_matches_single_searches(self, vector_dir):
+        """Test that a batched search returns the same hits as single searches."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(40, 16).astype(np.float32)
+        store.add_vectors(vectors, [{"content": f"Doc {i}", "group": i % 2} for i in range(40)])
+
+        queries = vectors[[3, 8, 21]]
+        batched = store.search_many(queries, k=3, filters={"group": 1})
+        assert len(batched) == 3
+        for query, results in zip(queries, batched):
+            assert results == store.search(query.tolist(), k=3, filters={"group": 1})
+        assert batched[0][0]["content"] == "Doc 3"
+        assert all(r["metadata"]["group"] == 1 for r in batched[1])
+
+    def test_lexical_search_and_persistence(self, vector_dir):
+        """Test BM25 search over contents, with filters and after reload."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        contents = [
+            "NEFT charges are waived for online transfers",
+            "RTGS transfers above two lakh",
+            "Savings account opening requires KYC",
+            "NEFT NEFT timings and cut-off for branch transfers",
+        ]
+        store.add_vectors(
+            np.random.rand(4, 16).astype(np.float32),
+            [
+                {"content": c, "doc_type": "faq" if i < 2 else "policy"}
+                for i, c in enumerate(contents)
+            ],
+        )
+        store.save()
+
+        results = store.lexical_search("NEFT charges", k=2)
+        assert [r["id"] for r in results] == [0, 3]
+        assert store.lexical_index.is_keyword_query("what are NEFT charges", max_terms=3)
+        assert not store.lexical_index.is_keyword_query("NEFT gold loan", max_terms=3)
+
+        filtered = store.lexical_search("NEFT", k=5, filters={"doc_type": "policy"})
+        assert [r["id"] for r in filtered] == [3]
+
+        reloaded = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert reloaded.lexical_index.count == 4
+        assert reloaded.lexical_search("KYC")[0]["content"] == contents[2]
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that results ranked well in both lists come first."""
+        dense = [{"id": 1, "score": 0.9}, {"id": 2, "score": 0.8}, {"id": 3, "score": 0.7}]
+        lexical = [{"id": 2, "score": 12.0}, {"id": 3, "score": 5.0}]
+
+        fused = reciprocal_rank_fusion([dense, lexical], k=2)
+        assert [r["id"] for r in fused] == [2, 3]
+        assert fused[0]["score"] == pytest.approx(1 / 62 + 1 / 61)
+
+    def test_delete_tombstones_and_purge(self, vector_dir, monkeypatch):
+        """Test that deleted chunks disappear from searches, persist, and are purged."""
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_purge_ratio", 0.5)
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(20, 16).astype(np.float32)
+        store.add_vectors(
+            vectors,
+            [
+                {"content": f"Doc {i // 5} chunk", "doc_id": i // 5, "chunk_id": 100 + i}
+                for i in range(20)
+            ],
+        )
+        store.save()
+
+        assert store.delete({"doc_id": 1}) == 5
+        assert store.delete({"doc_id": 1}) == 0
+        assert store.count == 15
+        assert all(r["metadata"]["doc_id"] != 1 for r in store.search(vectors[6].tolist(), k=20))
+        assert store.lexical_search("Doc 1 chunk", k=20) != []
+        assert all(r["metadata"]["doc_id"] != 1 for r in store.lexical_search("Doc 1 chunk", k=20))
+        store.save()
+
+        reloaded = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert reloaded.count == 15
+        assert reloaded.search(vectors[6].tolist(), k=20, filters={"doc_id": 1}) == []
+
+        # Crossing the purge ratio drops deleted vectors and renumbers the rest
+        reloaded.delete({"chunk_id": list(range(100, 105)) + [110]})
+        reloaded.save()
+        assert reloaded.index.ntotal == 9
+        assert reloaded.segments.load_tombstones().size == 0
+
+        purged = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert purged.count == 9
+        assert purged.search(vectors[12].tolist(), k=1)[0]["metadata"]["chunk_id"] == 112
+        assert {r["metadata"]["doc_id"] for r in purged.lexical_search("chunk", k=20)} == {2, 3}
+
+    def test_searches_during_concurrent_ingestion(self, vector_dir, monkeypatch):
+        """Test that searches see consistent snapshots while vectors are added."""
+        import threading
+        from app.config import settings
+
+        monkeypatch.setattr(settings, "vector_tail_vectors", 50)
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(600, 16).astype(np.float32)
+        store.add_vectors(vectors[:100], [{"content": f"Doc {i}", "doc_id": i} for i in range(100)])
+
+        errors = []
+
+        def search_loop():
+            for i in range(200):
+                try:
+                    for result in store.search(
+                        vectors[i % 100].tolist(), k=5, filters={"doc_id": list(range(0, 600, 3))}
+                    ):
+                        assert result["content"] == f"Doc {result['metadata']['doc_id']}"
+                    assert store.lexical_search("Doc", k=3)
+                except Exception as e:
+                    errors.append(e)
+
+        readers = [threading.Thread(target=search_loop) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for start in range(100, 600, 20):
+            batch = range(start, start + 20)
+            store.add_vectors(
+                vectors[start:start + 20], [{"content": f"Doc {i}", "doc_id": i} for i in batch]
+            )
+        for reader in readers:
+            reader.join()
+
+        assert errors == []
+        assert store.count == 600
+        assert store.search(vectors[577].tolist(), k=1)[0]["metadata"]["doc_id"] == 577
+        store.save()
+        assert FAISSVectorStore(tenant="test-tenant", dimension=16).count == 600
+
+    def test_compressed_index_rescores_exactly(self, vector_dir, monkeypatch):
+        """Test that compressed indexes keep originals for exact re-scoring."""
+        from app.config import settings
+        from app.rag.index_factory import compression_of
+
+        monkeypatch.setattr(settings, "vector_compression", "sq8")
+        monkeypatch.setattr(settings, "vector_compression_min_vectors", 200)
+        monkeypatch.setattr(settings, "vector_tail_vectors", 50)
+        store = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        vectors = np.random.rand(400, 16).astype(np.float32)
+        store.add_vectors(vectors[:100], [{"content": f"Doc {i}", "doc_id": i} for i in range(100)])
+        assert compression_of(store.index) == "none"
+
+        store.add_vectors(
+            vectors[100:], [{"content": f"Doc {i}", "doc_id": i} for i in range(100, 400)]
+        )
+        store.save()
+        assert compression_of(store.index) == "sq8"
+        assert store.stats()["index_bytes"] < 400 * 16 * 4
+
+        # Near-duplicates are only separable by full-precision distances
+        for i in range(0, 400, 37):
+            assert store.search(vectors[i].tolist(), k=1)[0]["metadata"]["doc_id"] == i
+
+        reloaded = FAISSVectorStore(tenant="test-tenant", dimension=16)
+        assert reloaded.compression == "sq8"
+        assert compression_of(reloaded.index) == "sq8"
+        np.testing.assert_array_equal(reloaded.vectors, vectors)
+        assert reloaded.search(vectors[123].tolist(), k=1)[0]["score"] == 1.0
+
+    def test_reproject_to_fewer_dimensions(self, vector_dir):
+        """Test that a re-projected index accepts full-size vectors and persists its dimension."""
+        store = FAISSVectorStore(tenant="test-tenant", dimension=32)
+        vectors = np.random.rand(100, 32).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        store.add_vectors(vectors[:80], [{"content": f"Doc {i}", "doc_id": i} for i in range(80)])
+        store.save()
+
+        store.reproject(16, "pca")
+        assert store.index.d == 16
+        assert store.search(vectors[7].tolist(), k=1)[0]["metadata"]["doc_id"] == 7
+
+        # Full-size vectors are projected on the way in
+        store.add_vectors(
+            vectors[80:], [{"content": f"Doc {i}", "doc_id": i} for i in range(80, 100)]
+        )
+        store.save()
+
+        reloaded = FAISSVectorStore(tenant="test-tenant")
+        assert reloaded.dimension == 16
+        assert reloaded.segments.dimension == 16
+        assert reloaded.projection.method == "pca"
+        assert reloaded.search(vectors[90].tolist(), k=1)[0]["metadata"]["doc_id"] == 90
+        with pytest.raises(ValueError):
+            reloaded.search(np.random.rand(8).tolist())
+
+
+class TestRebuildIndex:
+    """Test rebuilding a tenant index from stored chunk embeddings."""
+
+    def test_rebuild_from_database(self, db_session, vector_dir):
+        """Test that a rebuild restores the index from the database and backfills embeddings."""
+        from app.models.database import KbChunk, KbDoc
+        from app.rag.embeddings import decode_embeddings, encode_embedding
+        from app.rag.vector_store import vector_store_service
+        from app.services.ingestion import ingestion_service
+
+        doc = KbDoc(
+            path="policy.md", filename="policy.md", doc_type="policy", tenant="rebuild-tenant"
+        )
+        db_session.add(doc)
+        db_session.flush()
+
+        texts = [
+            f"Policy section {i} on {topic}"
+            for i, topic in enumerate(["loans", "cards", "deposits", "fees"])
+        ]
+        chunks = [
+            KbChunk(
+                doc_id=doc.id,
+                content=text,
+                chunk_index=i,
+                chunk_metadata={"doc_id": doc.id},
+                embedding=encode_embedding(embedding_service.embed_text(text)) if i else None,
+            )
+            for i, text in enumerate(texts)
+        ]
+        db_session.add_all(chunks)
+        db_session.flush()
+
+        counts = ingestion_service.rebuild_index("rebuild-tenant", db_session, batch_size=3)
+        assert counts == {"chunks": 4, "embedded": 1}
+
+        chunk = db_session.query(KbChunk).filter(KbChunk.chunk_index == 0).one()
+        assert decode_embeddings([chunk.embedding]).shape == (1, embedding_service.dimension)
+
+        store = vector_store_service.get_store("rebuild-tenant")
+        assert store.count == 4
+        for i, text in enumerate(texts):
+            result = store.search(embedding_service.embed_text(text), k=1)[0]
+            assert result["metadata"]["chunk_id"] == chunks[i].id
+            assert result["content"] == text
+
+    def test_migrate_embeddings_resumes(self, db_session, vector_dir, monkeypatch):
+        """Test that an interrupted migration resumes and swaps in a new-model index."""
+        from app.models.database import KbChunk, KbDoc
+        from app.rag.embedding_backends import HashingEmbeddingBackend
+        from app.rag.embeddings import decode_embeddings, encode_embedding
+        from app.rag.vector_store import vector_store_service
+        from app.services.ingestion import ingestion_service
+
+        new_backend = embedding_service.backend
+        monkeypatch.setattr(
+            embedding_service, "backend", HashingEmbeddingBackend(dimension=64, ngram_range=(2, 4))
+        )
+
+        doc = KbDoc(path="faq.md", filename="faq.md", doc_type="faq", tenant="migrate-tenant")
+        db_session.add(doc)
+        db_session.flush()
+        texts = [
+            f"Question {i} about {topic}"
+            for i, topic in enumerate(["rates", "limits", "branches", "cheques", "wires"])
+        ]
+        vectors = embedding_service.embed_texts(texts)
+        chunks = [
+            KbChunk(doc_id=doc.id, content=text, chunk_index=i, embedding=encode_embedding(vector))
+            for i, (text, vector) in enumerate(zip(texts, vectors))
+        ]
+        db_session.add_all(chunks)
+        db_session.flush()
+        live = vector_store_service.get_store("migrate-tenant")
+        live.add_vectors(vectors, [ingestion_service._vector_metadata(chunk) for chunk in chunks])
+        live.save()
+        chunk_ids = [chunk.id for chunk in chunks]
+
+        monkeypatch.setattr(embedding_service, "backend", new_backend)
+        embed_texts = embedding_service.embed_texts
+        calls = []
+
+        def interrupted(texts):
+            calls.append(texts)
+            if len(calls) > 1:
+                raise RuntimeError("interrupted")
+            return embed_texts(texts)
+
+        monkeypatch.setattr(embedding_service, "embed_texts", interrupted)
+        with pytest.raises(RuntimeError):
+            ingestion_service.migrate_embeddings("migrate-tenant", db_session, batch_size=2)
+        assert vector_store_service.get_store("migrate-tenant").dimension == 64
+
+        monkeypatch.setattr(embedding_service, "embed_texts", embed_texts)
+        counts = ingestion_service.migrate_embeddings("migrate-tenant", db_session, batch_size=2)
+        assert counts == {"chunks": 5, "resumed": 2}
+
+        store = vector_store_service.get_store("migrate-tenant")
+        assert store.count == 5
+        assert store.dimension == embedding_service.dimension
+        assert store.embedding_model == new_backend.model_name
+        for chunk_id, text in zip(chunk_ids, texts):
+            assert (
+                store.search(embedding_service.embed_text(text), k=1)[0]["metadata"]["chunk_id"]
+                == chunk_id
+            )
+
+        embeddings = [
+            chunk.embedding for chunk in db_session.query(KbChunk).filter(KbChunk.doc_id == doc.id)
+        ]
+        assert decode_embeddings(embeddings).shape == (5, embedding_service.dimension)
+
+
+class TestIngestion:
+    """Test the streaming ingestion pipeline."""
+
+    def test_streams_document_in_batches(self, db_session, vector_dir, tmp_path, monkeypatch):
+        """Test that a document is indexed batch by batch and a failure removes its chunks."""
+        from app.config import settings
+        from app.models.database import KbChunk
+        from app.rag.vector_store import vector_store_service
+        from app.services.ingestion import ingestion_service
+
+        monkeypatch.setattr(settings, "ingest_batch_size", 3)
+        path = tmp_path / "handbook.md"
+        path.write_text(
+            "\n\n".join(
+                f"Section {i}. " + f"Rule {i} applies to account type {i}. " * 20 for i in range(8)
+            )
+        )
+
+        embed_texts = embedding_service.embed_texts
+        batches = []
+
+        def counting(texts):
+            batches.append(len(texts))
+            return embed_texts(texts)
+
+        monkeypatch.setattr(embedding_service, "embed_texts", counting)
+        doc, chunk_count = ingestion_service.ingest_document(str(path), "stream-tenant", db_session)
+
+        assert chunk_count > 6
+        assert max(batches) == 3 and sum(batches) == chunk_count
+        assert db_session.query(KbChunk).filter(KbChunk.doc_id == doc.id).count() == chunk_count
+        store = vector_store_service.get_store("stream-tenant")
+        assert store.count == chunk_count
+        assert not store.has_unsaved_changes
+
+        def failing(texts):
+            if len(batches) >= 2:
+                raise RuntimeError("embedding failed")
+            batches.append(len(texts))
+            return embed_texts(texts)
+
+        batches.clear()
+        monkeypatch.setattr(embedding_service, "embed_texts", failing)
+        with pytest.raises(RuntimeError):
+            ingestion_service.ingest_document(str(path), "stream-tenant", db_session)
+        assert store.count == chunk_count
+
+    def test_parallel_extraction_isolates_failures(
+        self, db_session, vector_dir, tmp_path, monkeypatch
+    ):
+        """Test that files extracted in a process pool are indexed in order, skipping a bad file."""
+        from pypdf import PdfWriter
+        from app.config import settings
+        from app.models.database import KbDoc
+        from app.services.ingestion import ingestion_service
+
+        monkeypatch.setattr(settings, "ingest_pages_per_task", 2)
+        writer = PdfWriter()
+        for _ in range(5):
+            writer.add_blank_page(width=200, height=200)
+        blank = tmp_path / "blank.pdf"
+        with open(blank, "wb") as f:
+            writer.write(f)
+        assert ingestion_service._page_ranges(str(blank)) == [(0, 2), (2, 4), (4, 6)]
+
+        paths = []
+        for name in ("fees", "limits", "cards"):
+            path = tmp_path / f"{name}.md"
+            path.write_text(f"Schedule of {name}. " * 60)
+            paths.append(str(path))
+        broken = tmp_path / "broken.pdf"
+        broken.write_bytes(b"not a pdf")
+        paths.insert(1, str(broken))
+
+        result = ingestion_service.ingest_documents(paths, "parallel-tenant", db_session, workers=2)
+
+        assert result.docs == 3
+        assert result.chunks > 3
+        assert list(result.failed) == ["broken.pdf"]
+        docs = (
+            db_session.query(KbDoc)
+            .filter(KbDoc.tenant == "parallel-tenant")
+            .order_by(KbDoc.id)
+            .all()
+        )
+        assert [doc.filename for doc in docs] == ["fees.md", "limits.md", "cards.md"]
+
+    def test_incremental_reingestion(self, db_session, vector_dir, tmp_path, monkeypatch):
+        """Test that re-ingestion skips unchanged files, diffs changed ones, prunes removed ones."""
+        from app.models.database import KbChunk, KbDoc
+        from app.rag.vector_store import vector_store_service
+        from app.services.ingestion import ingestion_service
+
+        paths = {}
+        for name in ("fees", "limits", "cards"):
+            paths[name] = tmp_path / f"{name}.md"
+            paths[name].write_text(
+                "\n\n".join(f"{name.title()} clause {i}. " * 30 for i in range(4))
+            )
+
+        result = ingestion_service.ingest_documents(
+            [str(p) for p in paths.values()], "sync-tenant", db_session
+        )
+        assert (result.added, result.updated, result.unchanged) == (3, 0, 0)
+        total = result.chunks
+
+        embedded = []
+        embed_texts = embedding_service.embed_texts
+        monkeypatch.setattr(
+            embedding_service,
+            "embed_texts",
+            lambda texts: embedded.extend(texts) or embed_texts(texts),
+        )
+
+        result = ingestion_service.ingest_documents(
+            [str(p) for p in paths.values()], "sync-tenant", db_session
+        )
+        assert (result.added, result.updated, result.unchanged, result.chunks) == (0, 0, 3, 0)
+        assert embedded == []
+
+        paths["fees"].write_text(
+            paths["fees"].read_text() + "\n\nNew overdraft fee schedule applies from March."
+        )
+        result = ingestion_service.ingest_documents(
+            [str(paths["fees"]), str(paths["limits"])],
+            "sync-tenant",
+            db_session,
+            prune=True,
+        )
+        assert (result.added, result.updated, result.unchanged, result.removed) == (0, 1, 1, 1)
+        assert result.chunks == len(embedded) < result.chunks_unchanged
+        assert any("overdraft" in text for text in embedded)
+
+        docs = db_session.query(KbDoc).filter(KbDoc.tenant == "sync-tenant").all()
+        assert sorted(doc.filename for doc in docs) == ["fees.md", "limits.md"]
+        chunks = (
+            db_session.query(KbChunk).filter(KbChunk.doc_id.in_([doc.id for doc in docs])).count()
+        )
+        assert vector_store_service.get_store("sync-tenant").count == chunks < total
+
+    def test_add_missing_columns(self):
+        """Test that columns added to a model are added to an existing table."""
+        from sqlalchemy import create_engine, inspect, text
+        from app.db import add_missing_columns
+
+        engine = create_engine("sqlite:///:memory:")
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE kb_docs (id INTEGER PRIMARY KEY, path VARCHAR(500))"))
+
+        add_missing_columns(engine)
+        columns = {column["name"] for column in inspect(engine).get_columns("kb_docs")}
+        assert {"source_path", "content_hash", "version"} <= columns
+        assert "filename" not in columns
+
+    def test_ingest_job_runs_in_background(self, vector_dir, tmp_path):
+        """Test that a queued job is ingested by a worker, reporting progress and result."""
+        import time
+        from sqlalchemy import create_engine
+        from sqlalchemy.orm import sessionmaker
+        from app.models.database import Base, KbDoc
+        from app.services.ingest_jobs import DatabaseJobQueue, IngestJobRunner
+
+        engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+
+        upload_dir = tmp_path / "uploads"
+        upload_dir.mkdir()
+        paths = []
+        for name in ["fees", "limits"]:
+            path = upload_dir / f"{name}.md"
+            path.write_text("\n\n".join(f"{name.title()} clause {i}. " * 30 for i in range(4)))
+            paths.append(str(path))
+        (upload_dir / "broken.pdf").write_bytes(b"not a pdf")
+        paths.append(str(upload_dir / "broken.pdf"))
+
+        runner = IngestJobRunner(DatabaseJobQueue(session_factory), session_factory, workers=1)
+        try:
+            job = runner.submit("job-1", "jobs-tenant", paths, upload_dir=str(upload_dir))
+            assert job["status"] in ("queued", "running")
+
+            deadline = time.monotonic() + 60
+            while runner.queue.get("job-1")["status"] in ("queued", "running"):
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+        finally:
+            runner.stop(timeout=10)
+
+        job = runner.queue.get("job-1")
+        assert job["status"] == "completed"
+        assert job["result"]["added"] == 2
+        assert list(job["result"]["failed"]) == ["broken.pdf"]
+        progress = job["progress"]
+        assert progress["files"] == progress["files_done"] == 3
+        assert progress["pages"] == 2
+        assert progress["chunks"] == progress["indexed"] == job["result"]["chunks"] > 0
+        assert progress["embedded"] <= progress["indexed"]
+        assert not upload_dir.exists()
+        with session_factory() as db:
+            assert db.query(KbDoc).filter(KbDoc.tenant == "jobs-tenant").count() == 2
+
+    def test_job_queue_requeues_stale_jobs(self):
+        """Test that jobs are claimed in order and stale running jobs are queued again."""
+        from datetime import datetime, timedelta
+        from app.services.ingest_jobs import MemoryJobQueue
+
+        queue = MemoryJobQueue()
+        queue.put({"id": "a", "tenant": "t", "request": {}})
+        queue.put({"id": "b", "tenant": "t", "request": {}})
+
+        assert queue.claim()["id"] == "a"
+        assert queue.requeue_stale(datetime.utcnow() - timedelta(minutes=10)) == 0
+        assert queue.requeue_stale(datetime.utcnow() + timedelta(seconds=1)) == 1
+        assert [queue.claim()["id"], queue.claim()["id"]] == ["b", "a"]
+        assert queue.claim() is None
+
+    def test_bulk_insert_returns_ids_in_order(self, db_session, monkeypatch):
+        """Test that bulk inserts return row ids in order, with and without RETURNING."""
+        from app.db import bulk_insert
+        from app.models.database import KbChunk, KbDoc
+
+        doc = KbDoc(path="bulk.md", filename="bulk.md", doc_type="faq", tenant="bulk-tenant")
+        db_session.add(doc)
+        db_session.flush()
+
+        rows = [
+            {"doc_id": doc.id, "content": f"Chunk {i}", "chunk_index": i, "chunk_metadata": {}}
+            for i in range(7)
+        ]
+        ids = bulk_insert(db_session, KbChunk, rows[:5], batch_size=2)
+
+        dialect = db_session.get_bind().dialect
+        monkeypatch.setattr(dialect, "insert_executemany_returning_sort_by_parameter_order", False)
+        ids += bulk_insert(db_session, KbChunk, rows[5:], batch_size=2)
+
+        assert len(set(ids)) == 7
+        stored = dict(db_session.query(KbChunk.id, KbChunk.chunk_index).all())
+        assert [stored[chunk_id] for chunk_id in ids] == list(range(7))
+        assert db_session.query(KbChunk).filter(KbChunk.created_at.is_(None)).count() == 0
+
+
+class TestDedup:
+    """Test near-duplicate chunk detection."""
+
+    def test_fingerprint_index_finds_near_duplicates(self):
+        """Test that SimHash matches reformatted text within the distance and not unrelated text."""
+        from app.rag.dedup import FingerprintIndex, hamming_distance, simhash
+
+        disclaimer = (
+            "Rates are subject to change without notice. This product is offered subject to "
+            "the terms and conditions of the bank. Please read all related documents carefully."
+        )
+        assert simhash(disclaimer) == simhash(disclaimer.upper().replace(". ", ".\n"))
+
+        index = FingerprintIndex(max_distance=3)
+        index.add(simhash(disclaimer), 1)
+        index.add(simhash("Savings accounts earn interest on the daily closing balance."), 2)
+        assert index.find(simhash("  " + disclaimer.lower())) == 1
+        assert (
+            index.find(simhash("Home loans are offered at floating rates linked to the repo rate."))
+            is None
+        )
+        assert hamming_distance(-1, 0) == 64
+
+    def test_duplicates_collapse_and_are_promoted(self, db_session, vector_dir, tmp_path):
+        """Test that repeated boilerplate is indexed once and survives deleting its first source."""
+        from app.models.database import KbChunk
+        from app.rag.vector_store import vector_store_service
+        from app.services.ingestion import ingestion_service
+
+        boilerplate = (
+            "This product is offered subject to the terms and conditions of the bank. " * 8
+        )
+        paths = []
+        for name, topic in (("savings", "interest on savings"), ("loans", "home loan eligibility")):
+            path = tmp_path / f"{name}.md"
+            body = f"Details of {topic} for {name} customers, section {{i}}. " * 10
+            path.write_text("\n\n".join([body.format(i=1), boilerplate, body.format(i=2)]))
+            paths.append(str(path))
+
+        result = ingestion_service.ingest_documents(paths, "dedup-tenant", db_session)
+        store = vector_store_service.get_store("dedup-tenant")
+        duplicates = db_session.query(KbChunk).filter(KbChunk.duplicate_of.isnot(None)).all()
+        assert len(duplicates) == 1
+        assert duplicates[0].embedding is None
+        assert store.count == result.chunks - 1
+
+        canonical_id = duplicates[0].duplicate_of
+        first_doc = db_session.get(KbChunk, canonical_id).doc_id
+        ingestion_service.delete_document(first_doc, "dedup-tenant", db_session)
+
+        promoted = db_session.get(KbChunk, duplicates[0].id)
+        assert promoted.duplicate_of is None and promoted.embedding is not None
+        hit = store.search(embedding_service.embed_text(boilerplate), k=1)[0]
+        assert hit["metadata"]["chunk_id"] == promoted.id
+        assert hit["metadata"]["filename"] == "loans.md"